@@ -0,0 +1,230 @@
+"""
+Asyncio companion to db.py for use inside an event loop.
+
+Every db function runs off the loop: writes go through a single dedicated
+writer thread (SQLite allows one writer at a time anyway) and reads run on
+a small thread pool. Each thread keeps its own connection via db.py.
+
+    async with adb.Database() as database:
+        lead_id = await database.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+        lead = await database.get_lead(lead_id)
+
+The module-level functions (adb.add_lead, adb.get_client_by_slug, ...)
+use a shared default Database created on first use.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+
+READ_WORKERS = 4
+MAX_PENDING_WRITES = 256        # callers wait once this many writes are queued
+MAX_PENDING_READS = 64          # same, for reads
+
+WRITE_FUNCTIONS = [
+    "add_lead",
+    "add_leads",
+    "update_lead_status",
+    "update_leads_status_bulk",
+    "merge_duplicate_leads",
+    "add_client",
+    "update_client",
+    "update_client_status",
+    "update_clients_bulk",
+    "update_clients_status_bulk",
+    "add_asset",
+    "remove_asset",
+    "archive_leads",
+    "restore_leads",
+]
+
+READ_FUNCTIONS = [
+    "get_lead",
+    "get_all_leads",
+    "get_leads_page",
+    "search_leads",
+    "find_duplicate_lead",
+    "find_duplicate_groups",
+    "get_client",
+    "get_client_by_slug",
+    "get_all_clients",
+    "get_clients_page",
+    "search_clients",
+    "get_asset",
+    "archive_stats",
+]
+
+
+def _call(state, func, args, kwargs):
+    """Run func on a worker thread, exposing its connection for interrupts."""
+    state["conn"] = db.get_connection()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        state["conn"] = None
+
+
+def _release(loop, slots):
+    """Free a queue slot from whichever thread finished (or cancelled) the call."""
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        pass    # the loop is closed; nothing is left waiting for the slot
+
+
+class Database:
+    """Async access to db.py backed by one writer thread and a reader pool.
+
+    Writes and reads each have a bound on calls queued or still running,
+    including cancelled calls a worker hasn't finished; past it, callers
+    wait, which pushes back on whoever is producing the work. Cancelling a
+    call that hasn't started yet drops it. Cancelling a read that is already
+    running interrupts its query. A write that has started always runs to
+    completion, so it is either committed or never happened.
+    """
+
+    def __init__(self, read_workers=READ_WORKERS, max_pending_writes=MAX_PENDING_WRITES,
+                 max_pending_reads=MAX_PENDING_READS):
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="adb-writer")
+        self._reader_threads = set()    # filled in by each reader thread as it starts
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="adb-reader",
+                                           initializer=self._reader_started)
+        self._write_slots = asyncio.Semaphore(max_pending_writes)
+        self._read_slots = asyncio.Semaphore(max_pending_reads)
+        self._closed = False
+
+    async def _run(self, executor, slots, interruptible, func, args, kwargs):
+        if self._closed:
+            raise RuntimeError("Database is closed")
+        await slots.acquire()
+        state = {"conn": None}
+        loop = asyncio.get_running_loop()
+        try:
+            work = executor.submit(_call, state, func, args, kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is held until the worker is done with the call, not just
+        # until the caller stops waiting: a cancelled call may still be running
+        work.add_done_callback(lambda _: _release(loop, slots))
+        try:
+            return await asyncio.wrap_future(work)
+        except asyncio.CancelledError:
+            conn = state["conn"]
+            if interruptible and conn is not None:
+                conn.interrupt()
+            raise
+
+    async def write(self, func, *args, **kwargs):
+        """Run any db function on the writer thread."""
+        return await self._run(self._writer, self._write_slots, False, func, args, kwargs)
+
+    async def read(self, func, *args, **kwargs):
+        """Run any read-only db function on the reader pool."""
+        return await self._run(self._readers, self._read_slots, True, func, args, kwargs)
+
+    async def close(self):
+        """Finish queued work and stop the worker threads."""
+        if self._closed:
+            return
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _reader_started(self):
+        self._reader_threads.add(threading.get_ident())
+
+    def _shutdown(self):
+        self._writer.submit(db.close_connection).result()
+        self._writer.shutdown(wait=True)
+        self._close_reader_connections()
+        self._readers.shutdown(wait=True)
+
+    def _close_reader_connections(self):
+        """Run db.close_connection once on every reader thread.
+
+        Each close waits at a barrier until there is one per thread, so no
+        thread can pick up two of them; if the pool started another thread
+        meanwhile, go round again.
+        """
+        closed = set()
+        while closed != self._reader_threads:
+            barrier = threading.Barrier(len(self._reader_threads))
+
+            def close(barrier=barrier):
+                barrier.wait()
+                db.close_connection()
+                closed.add(threading.get_ident())
+
+            for work in [self._readers.submit(close) for _ in range(barrier.parties)]:
+                work.result()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _writer_method(name):
+    func = getattr(db, name)
+
+    async def method(self, *args, **kwargs):
+        return await self.write(func, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = func.__doc__
+    return method
+
+
+def _reader_method(name):
+    func = getattr(db, name)
+
+    async def method(self, *args, **kwargs):
+        return await self.read(func, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = func.__doc__
+    return method
+
+
+for _name in WRITE_FUNCTIONS:
+    setattr(Database, _name, _writer_method(_name))
+for _name in READ_FUNCTIONS:
+    setattr(Database, _name, _reader_method(_name))
+
+
+# Shared default instance for the module-level functions
+_default = None
+
+
+def get_default():
+    """Return the shared Database, creating it on first use."""
+    global _default
+    if _default is None or _default._closed:
+        _default = Database()
+    return _default
+
+
+async def close():
+    """Close the shared Database, if one was created."""
+    global _default
+    if _default is not None:
+        await _default.close()
+        _default = None
+
+
+def _module_function(name):
+    async def function(*args, **kwargs):
+        return await getattr(get_default(), name)(*args, **kwargs)
+
+    function.__name__ = name
+    function.__doc__ = getattr(db, name).__doc__
+    return function
+
+
+for _name in WRITE_FUNCTIONS + READ_FUNCTIONS:
+    globals()[_name] = _module_function(_name)
+del _name
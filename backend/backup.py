@@ -0,0 +1,220 @@
+"""
+Online backups of the SQLite databases with the backup API.
+
+Copying the database file while something writes to it can produce a
+torn copy. sqlite3's backup API instead copies pages through SQLite's
+own locking, `step_pages` at a time. Between steps the source is
+unlocked and the copy sleeps for `sleep` seconds, so writers get a turn.
+If another connection writes mid-backup, SQLite restarts the copy from
+the first page. After MAX_RESTARTS restarts the rest is copied in one
+step instead, so a busy database still gets backed up.
+
+The copy is written next to its final name and renamed into place only
+once it is complete (and verified, if asked), so a backup directory
+never holds a partial backup. With compress, the finished copy is
+streamed through gzip.
+
+    stats = backup.create(compress=True, verify_copy=True)
+    backup.rotate(keep=7)
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import db
+
+BACKUP_PATH = Path(__file__).parent / "backups"
+
+STEP_PAGES = 1024               # pages copied per step (4MB at the default page size)
+STEP_SLEEP = 0.005              # seconds the source is left unlocked between steps
+MAX_RESTARTS = 3                # restarts caused by writers before copying in one step
+KEEP = 7                        # backups kept per database by rotate()
+COPY_CHUNK_SIZE = 1024 * 1024   # bytes per read when compressing/decompressing
+
+
+class BackupError(Exception):
+    """A backup could not be made or failed verification."""
+
+
+class _Restarted(Exception):
+    """Raised from the progress callback to abandon a stepped backup."""
+
+
+def _copy(source, target, step_pages, sleep, progress, stats):
+    """Back up `source` into `target` step by step, adding timings to stats.
+
+    lock_s is the time spent inside steps, when the source is locked for
+    reading; max_lock_s, the longest single step, bounds how long a writer
+    can be held up.
+    """
+    last_remaining = None
+    mark = time.perf_counter()
+
+    def on_step(status, remaining, total):
+        nonlocal last_remaining, mark
+        held = time.perf_counter() - mark
+        stats["steps"] += 1
+        stats["lock_s"] += held
+        stats["max_lock_s"] = max(stats["max_lock_s"], held)
+        stats["pages"] = total
+        # The copy went back to the first page: another connection wrote
+        if last_remaining is not None and remaining > last_remaining:
+            stats["restarts"] += 1
+            if stats["restarts"] > MAX_RESTARTS and step_pages > 0:
+                raise _Restarted
+        last_remaining = remaining
+        if progress:
+            progress(total - remaining, total)
+        if remaining and sleep:
+            time.sleep(sleep)
+            stats["sleep_s"] += sleep
+        mark = time.perf_counter()
+
+    source.backup(target, pages=step_pages, progress=on_step)
+
+
+def verify(path):
+    """Run PRAGMA integrity_check on a backup (.db or .db.gz).
+
+    Returns the problems found; an empty list means the copy is sound.
+    """
+    path = Path(path)
+    if path.suffix != ".gz":
+        return _integrity_check(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".verify-", suffix=".db")
+    try:
+        with gzip.open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return _integrity_check(tmp_path)
+    except (OSError, EOFError) as e:
+        return [f"can't decompress: {e}"]
+    finally:
+        os.unlink(tmp_path)
+
+
+def _integrity_check(path):
+    conn = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+    try:
+        rows = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        conn.close()
+    return [] if rows == ["ok"] else rows
+
+
+def _backup_name(source, target_dir, compress):
+    """A new, timestamped file name for a backup of `source`."""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    suffix = ".db.gz" if compress else ".db"
+    name = target_dir / f"{source.stem}-{stamp}{suffix}"
+    counter = 1
+    while name.exists():
+        name = target_dir / f"{source.stem}-{stamp}-{counter}{suffix}"
+        counter += 1
+    return name
+
+
+def create(source=None, target_dir=None, compress=False, verify_copy=False,
+           step_pages=STEP_PAGES, sleep=STEP_SLEEP, progress=None):
+    """Back up a database (default db.DB_PATH) into target_dir.
+
+    progress(pages_done, pages_total) is called after each step. Returns
+    stats: the backup's path and size, pages copied, steps, restarts,
+    seconds spent copying, locked, sleeping and in total, and whether it
+    was verified. Raises BackupError if the source is missing or the copy
+    fails verification; nothing is left in target_dir in that case.
+    """
+    source = Path(source or db.DB_PATH)
+    target_dir = Path(target_dir or BACKUP_PATH)
+    if not source.exists():
+        raise BackupError(f"No database at {source}")
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    fd, copy_path = tempfile.mkstemp(dir=target_dir, prefix=f".{source.stem}-", suffix=".db.tmp")
+    os.close(fd)
+    try:
+        stats = {"pages": 0, "steps": 0, "restarts": 0, "single_pass": step_pages <= 0,
+                 "lock_s": 0.0, "max_lock_s": 0.0, "sleep_s": 0.0}
+        try:
+            src = sqlite3.connect(f"file:{source.resolve()}?mode=ro", uri=True, timeout=db.BUSY_TIMEOUT)
+            dst = sqlite3.connect(copy_path)
+            try:
+                try:
+                    _copy(src, dst, step_pages, sleep, progress, stats)
+                except _Restarted:
+                    # Writers keep invalidating the copy: take it in one pass instead
+                    stats["single_pass"] = True
+                    _copy(src, dst, -1, 0, progress, stats)
+                page_size = dst.execute("PRAGMA page_size").fetchone()[0]
+                # A self-contained file: no -wal/-shm needed to open the backup
+                dst.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                dst.close()
+                src.close()
+        except sqlite3.Error as e:
+            raise BackupError(f"Backup of {source} failed: {e}") from e
+        stats["copy_s"] = time.perf_counter() - start
+        stats["bytes"] = stats["pages"] * page_size
+
+        stats["verified"] = False
+        if verify_copy:
+            problems = _integrity_check(copy_path)
+            if problems:
+                raise BackupError(f"Backup failed integrity_check: {'; '.join(problems[:5])}")
+            stats["verified"] = True
+
+        target = _backup_name(source, target_dir, compress)
+        if compress:
+            fd, packed_path = tempfile.mkstemp(dir=target_dir, prefix=f".{source.stem}-", suffix=".db.gz.tmp")
+            try:
+                with open(copy_path, "rb") as src_file, os.fdopen(fd, "wb") as raw:
+                    with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as packed:
+                        shutil.copyfileobj(src_file, packed, COPY_CHUNK_SIZE)
+                os.replace(packed_path, target)
+            except BaseException:
+                os.unlink(packed_path)
+                raise
+        else:
+            os.replace(copy_path, target)
+    finally:
+        if os.path.exists(copy_path):
+            os.unlink(copy_path)
+
+    stats["path"] = target
+    stats["size"] = target.stat().st_size
+    stats["elapsed_s"] = time.perf_counter() - start
+    return stats
+
+
+def list_backups(target_dir=None, stem=None):
+    """Backups in target_dir, oldest first; only those of `stem` if given."""
+    target_dir = Path(target_dir or BACKUP_PATH)
+    pattern = f"{stem}-*.db*" if stem else "*.db*"
+    return sorted((path for path in target_dir.glob(pattern)
+                   if path.name.endswith((".db", ".db.gz")) and not path.name.startswith(".")),
+                  key=lambda path: path.stat().st_mtime_ns)
+
+
+def rotate(target_dir=None, stem=None, keep=KEEP):
+    """Delete all but the newest `keep` backups of `stem` (default the main database).
+
+    keep of 0 or less keeps every backup.
+    """
+    stem = stem or Path(db.DB_PATH).stem
+    backups = list_backups(target_dir, stem)
+    # "website_builder-*" would also match website_builder_archive backups
+    backups = [path for path in backups if path.name[len(stem) + 1:][:1].isdigit()]
+    if keep <= 0:
+        return []
+    removed = backups[:-keep]
+    for path in removed:
+        path.unlink()
+    return removed
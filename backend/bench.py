@@ -0,0 +1,265 @@
+"""
+Benchmarks for the db layer and client config generation.
+
+Seeds a throwaway database with synthetic leads and clients, times the
+common operations at each requested size and returns the results as a
+JSON-serializable dict so runs can be compared.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import catalog
+import client_index
+import db
+import files
+import manage
+
+FIRST_NAMES = ["James", "Maria", "Robert", "Linda", "Michael", "Sarah", "David", "Karen", "Carlos", "Aisha"]
+LAST_NAMES = ["Smith", "Johnson", "Garcia", "Brown", "Lee", "Martinez", "Davis", "Wilson", "Nguyen", "Clark"]
+LEAD_STATUSES = ["new", "contacted", "qualified", "converted", "lost"]
+LEAD_SOURCES = ["landing_page", "referral", "import", "ads"]
+CLIENT_STATUSES = ["intake", "building", "review", "live"]
+SERVICES = ["Repairs", "Installation", "Maintenance", "Inspections", "Emergency Service", "Consulting"]
+
+# Business types used by generate_client_json's color schemes
+BUSINESS_TYPES = [t for t in manage.COLOR_SCHEMES if t != "default"]
+
+SEED_BATCH_SIZE = 10000
+
+
+def synthetic_leads(count, rng):
+    """Yield lead insert tuples for db.add_leads."""
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        yield (
+            first,
+            last,
+            f"{first.lower()}.{last.lower()}{i}@example.com",
+            f"555{i % 10000000:07d}",
+            f"https://{last.lower()}{i}.example.com" if rng.random() < 0.3 else None,
+            rng.choice(LEAD_SOURCES),
+        )
+
+
+def synthetic_clients(count, rng):
+    """Yield client insert tuples."""
+    for i in range(count):
+        business_type = rng.choice(BUSINESS_TYPES)
+        services = ", ".join(rng.sample(SERVICES, rng.randint(1, 4)))
+        yield (
+            f"bench-{business_type}-{i}",
+            f"{rng.choice(LAST_NAMES)} {business_type.title()} {i}",
+            business_type,
+            f"555{i % 10000000:07d}",
+            f"office{i}@example.com",
+            f"{i} Main St",
+            services,
+            rng.choice(CLIENT_STATUSES),
+        )
+
+
+def seed(leads, clients, rng):
+    """Fill the current database with synthetic leads and clients."""
+    for batch in manage.batched(synthetic_leads(leads, rng), SEED_BATCH_SIZE):
+        db.add_leads(batch)
+    with db.connection() as conn:
+        conn.executemany(
+            "UPDATE leads SET status = ? WHERE id = ?",
+            ((rng.choice(LEAD_STATUSES), lead_id) for lead_id in range(1, leads + 1)),
+        )
+    for batch in manage.batched(synthetic_clients(clients, rng), SEED_BATCH_SIZE):
+        with db.connection() as conn:
+            conn.executemany('''
+                INSERT INTO clients (slug, business_name, business_type, phone, email, address, services, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+
+
+def measure(func, args_list):
+    """Call func once per args tuple and summarize the latencies."""
+    latencies = []
+    start = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    return summarize(latencies, total)
+
+
+def summarize(latencies, total):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "ops": count,
+        "total_s": round(total, 6),
+        "ops_per_sec": round(count / total, 1) if total else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 4),
+        "p99_ms": round(latencies[min(count - 1, int(count * 0.99))] * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4),
+    }
+
+
+def measure_listing(func):
+    """Time one full listing and record its peak traced memory."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = func()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"rows": len(rows), "total_s": round(elapsed, 6), "peak_mb": round(peak / 2 ** 20, 3)}
+
+
+def compare_listing():
+    """Full lead listing as dicts (get_all_leads) vs. projected Lead rows."""
+    return {
+        "dicts_all_columns": measure_listing(db.get_all_leads),
+        "rows_all_columns": measure_listing(lambda: list(db.query_leads())),
+        "rows_list_columns": measure_listing(lambda: list(db.query_leads(manage.LEAD_LIST_COLUMNS))),
+    }
+
+
+def run_size(leads, clients, samples, rng, workdir):
+    """Seed a fresh database of the given size and time each operation."""
+    db.DB_PATH = workdir / f"bench-{leads}.db"
+    files.CLIENTS_JSON_PATH = workdir / f"clients-{leads}"
+    files.MANIFEST_PATH = workdir / f"manifest-{leads}.json"
+    client_index.INDEX_PATH = workdir / f"client-index-{leads}"
+    db.clear_client_cache()
+
+    t0 = time.perf_counter()
+    seed(leads, clients, rng)
+    result = {"leads": leads, "clients": clients, "seed_s": round(time.perf_counter() - t0, 3)}
+
+    client_ids = list(range(1, clients + 1))
+    slugs = [row["slug"] for row in db.get_all_clients()]
+    client_rows = [db.get_client(rng.choice(client_ids)) for _ in range(min(samples, clients))]
+    list_runs = max(1, min(20, 2000000 // max(leads, 1)))
+    generate_args = argparse.Namespace(force=False, workers=None, compact=False)
+
+    ops = {}
+    ops["add_lead"] = measure(db.add_lead, [
+        ("Bench", "Lead", f"bench{i}@example.com", f"555{i:07d}") for i in range(samples)
+    ])
+    ops["get_all_leads_status"] = measure(db.get_all_leads, [
+        (rng.choice(LEAD_STATUSES),) for _ in range(list_runs)
+    ])
+    db.clear_client_cache()
+    ops["get_client_by_slug"] = measure(db.get_client_by_slug, [
+        (rng.choice(slugs),) for _ in range(samples)
+    ])
+    result["client_cache"] = db.client_cache_stats()
+    ops["update_client"] = measure(lambda client_id: db.update_client(client_id, notes="bench"), [
+        (rng.choice(client_ids),) for _ in range(samples)
+    ])
+    ops["generate_client_json"] = measure(manage.generate_client_json, [
+        (client,) for client in client_rows
+    ])
+    with contextlib.redirect_stdout(io.StringIO()):
+        ops["generate_all"] = measure(manage.cmd_client_generate_all, [(generate_args,)])
+        ops["generate_all_noop"] = measure(manage.cmd_client_generate_all, [(generate_args,)])
+
+    result["operations"] = ops
+    result["lead_listing"] = compare_listing()
+    db.close_connection()
+    return result
+
+
+def synthetic_builds(count, vocabulary, rng):
+    """Catalog builds with random characteristics drawn from the catalog's vocabulary."""
+    sections = vocabulary["sectionTypes"]
+    for i in range(count):
+        yield {
+            "id": f"bench-build-{i}",
+            "clientName": f"Bench Client {i}",
+            "industry": rng.choice(vocabulary["industries"]),
+            "characteristics": {
+                **{name: rng.choice(vocabulary[key]) for name, (key, _) in catalog.FEATURES.items()},
+                "sections": rng.sample(sections, rng.randint(5, 11)),
+            },
+        }
+
+
+def pairwise_similarity(a, b):
+    """calculateSimilarity from src/lib/catalog.ts, for one pair of builds."""
+    score = sum(weight for name, (_, weight) in catalog.FEATURES.items() if a[name] == b[name])
+    sections_a, sections_b = set(a["sections"]), set(b["sections"])
+    score += catalog.SECTIONS_WEIGHT * len(sections_a & sections_b) / len(sections_a | sections_b)
+    return score / catalog.TOTAL_WEIGHT
+
+
+def run_catalog(builds, samples, rng):
+    """Time similarity queries against a synthetic catalog of `builds` builds."""
+    with open(catalog.CATALOG_PATH) as f:
+        data = json.load(f)
+    vocabulary = data["characteristics"]
+    candidates = [template["characteristics"] for template in data["templates"].values()]
+
+    build_list = list(synthetic_builds(builds, vocabulary, rng))
+    t0 = time.perf_counter()
+    engine = catalog.Catalog(build_list, vocabulary)
+    result = {"builds": builds, "numpy": catalog.np is not None,
+              "encode_s": round(time.perf_counter() - t0, 3)}
+    runs = max(1, min(samples, 50))
+    industries = vocabulary["industries"]
+    result["operations"] = {
+        # One pair at a time, as the TypeScript checkForDuplicates does
+        "pairwise_baseline": measure(lambda candidate: [
+            pairwise_similarity(candidate, build["characteristics"]) for build in build_list
+        ], [(rng.choice(candidates),) for _ in range(max(1, runs // 10))]),
+        "top_k": measure(engine.top_k, [(rng.choice(candidates), 5) for _ in range(runs)]),
+        "top_k_industry": measure(engine.top_k, [
+            (rng.choice(candidates), 5, rng.choice(industries)) for _ in range(runs)
+        ]),
+        "duplicates": measure(engine.duplicates, [(rng.choice(candidates),) for _ in range(runs)]),
+        "least_used": measure(engine.least_used, [(rng.choice(industries),) for _ in range(runs)]),
+    }
+    return result
+
+
+def run(sizes, client_ratio=0.1, samples=1000, seed_value=42, catalog_builds=0):
+    """Run the benchmark at each lead count in `sizes`.
+
+    Uses a temporary database and output directories; the real database,
+    src/data/clients and src/data/client-index are never touched.
+    """
+    rng = random.Random(seed_value)
+    saved = (db.DB_PATH, files.CLIENTS_JSON_PATH, files.MANIFEST_PATH, client_index.INDEX_PATH)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="website-builder-bench-") as tmp:
+            for size in sizes:
+                clients = max(1, int(size * client_ratio))
+                results.append(run_size(size, clients, samples, rng, Path(tmp)))
+    finally:
+        db.close_connection()
+        db.DB_PATH, files.CLIENTS_JSON_PATH, files.MANIFEST_PATH, client_index.INDEX_PATH = saved
+        db.clear_client_cache()
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "client_ratio": client_ratio,
+        "samples": samples,
+        "seed": seed_value,
+        "results": results,
+    }
+    if catalog_builds:
+        report["catalog"] = run_catalog(catalog_builds, samples, rng)
+    return report
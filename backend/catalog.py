@@ -0,0 +1,239 @@
+"""
+Similarity engine for generation/website-catalog.json.
+
+Scores match calculateSimilarity in src/lib/catalog.ts: weighted matches
+on layout (3), colorScheme (2), heroStyle (3), navigation (1) and
+primaryCTA (1), plus Jaccard overlap of the section sets (5), divided by
+the total weight. A score of 0.7 or more counts as a duplicate.
+
+The catalog is loaded once and encoded column-wise: one integer code per
+build for each characteristic, industry included, and a build x section
+matrix. Scoring a candidate against every build is then a handful of
+whole-column comparisons and one matrix-vector product. NumPy is used
+when it is installed; otherwise the same encoding is scored with integer
+bitsets in a single pass, giving identical results.
+
+    catalog = Catalog.load()
+    for build, score in catalog.top_k(characteristics, k=5):
+        ...
+"""
+
+import heapq
+import json
+from collections import Counter
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:             # optional - the pure-Python path scores the same
+    np = None
+
+CATALOG_PATH = Path(__file__).parent.parent / "generation" / "website-catalog.json"
+
+DUPLICATE_THRESHOLD = 0.7
+
+# Characteristic -> (vocabulary key in the catalog, weight)
+FEATURES = {
+    "layout": ("layouts", 3),
+    "colorScheme": ("colorSchemes", 2),
+    "heroStyle": ("heroStyles", 3),
+    "navigation": ("navigationStyles", 1),
+    "primaryCTA": ("ctaStyles", 1),
+}
+SECTIONS_WEIGHT = 5
+TOTAL_WEIGHT = sum(weight for _, weight in FEATURES.values()) + SECTIONS_WEIGHT
+
+
+def _bits(mask):
+    """Positions of the set bits in an integer."""
+    return [bit for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+
+class Catalog:
+    """Encoded builds from a catalog, ready for vectorized similarity queries."""
+
+    def __init__(self, builds, vocabulary):
+        self.builds = builds
+        self.vocabulary = {name: list(vocabulary.get(key, [])) for name, (key, _) in FEATURES.items()}
+        self.vocabulary["industry"] = list(vocabulary.get("industries", []))
+        self.sections = list(vocabulary.get("sectionTypes", []))
+        self._codes = {name: {value: i for i, value in enumerate(values)}
+                       for name, values in self.vocabulary.items()}
+        self._section_bits = {section: i for i, section in enumerate(self.sections)}
+
+        columns = {name: [] for name in self.vocabulary}
+        masks = []
+        for build in builds:
+            traits = build["characteristics"]
+            for name in FEATURES:
+                columns[name].append(self._code(name, traits.get(name)))
+            columns["industry"].append(self._code("industry", build.get("industry")))
+            masks.append(self._mask(traits.get("sections", ())))
+        self._columns = columns
+        self._masks = masks
+        self._section_counts = [mask.bit_count() for mask in masks]
+
+        if np is not None:
+            self._arrays = {name: np.array(values, dtype=np.int32) for name, values in columns.items()}
+            rows, cols = [], []
+            for row, mask in enumerate(masks):
+                bits = _bits(mask)
+                rows.extend([row] * len(bits))
+                cols.extend(bits)
+            matrix = np.zeros((len(builds), max(len(self.sections), 1)), dtype=np.float32)
+            matrix[rows, cols] = 1
+            self._matrix = matrix
+            self._sizes = np.array(self._section_counts, dtype=np.float32)
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH, include_templates=False):
+        """Load a catalog file. Templates are added as builds if include_templates."""
+        with open(path) as f:
+            data = json.load(f)
+        builds = list(data.get("builds", []))
+        if include_templates:
+            for template_id, template in data.get("templates", {}).items():
+                builds.append({"id": template_id, "clientName": template.get("name", template_id),
+                               "industry": None, "characteristics": template["characteristics"]})
+        return cls(builds, data.get("characteristics", {}))
+
+    def _code(self, name, value):
+        """Integer code for a value, extending the vocabulary with unseen ones."""
+        if value is None:
+            return -1
+        codes = self._codes[name]
+        if value not in codes:
+            codes[value] = len(self.vocabulary[name])
+            self.vocabulary[name].append(value)
+        return codes[value]
+
+    def _mask(self, sections):
+        mask = 0
+        for section in sections:
+            if section not in self._section_bits:
+                self._section_bits[section] = len(self.sections)
+                self.sections.append(section)
+            mask |= 1 << self._section_bits[section]
+        return mask
+
+    def _score(self, characteristics):
+        """Scores as a NumPy array, or a list without NumPy."""
+        candidate = {name: self._codes[name].get(characteristics.get(name), -2) for name in FEATURES}
+        mask = self._mask(characteristics.get("sections", ()))
+        size = mask.bit_count()
+
+        if np is not None:
+            score = np.zeros(len(self.builds))
+            for name, (_, weight) in FEATURES.items():
+                score += weight * (self._arrays[name] == candidate[name])
+            # Sections no build uses can't overlap; they only add to the union
+            vector = np.zeros(self._matrix.shape[1], dtype=np.float32)
+            vector[[bit for bit in _bits(mask) if bit < len(vector)]] = 1
+            overlap = (self._matrix @ vector).astype(np.float64)
+            union = self._sizes + size - overlap
+            score += SECTIONS_WEIGHT * np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+            return score / TOTAL_WEIGHT
+
+        score = [0] * len(self.builds)
+        for name, (_, weight) in FEATURES.items():
+            code = candidate[name]
+            score = [s + weight if value == code else s for s, value in zip(score, self._columns[name])]
+        result = []
+        for s, other, other_size in zip(score, self._masks, self._section_counts):
+            overlap = (other & mask).bit_count()
+            union = other_size + size - overlap
+            result.append((s + (SECTIONS_WEIGHT * overlap / union if union else 0)) / TOTAL_WEIGHT)
+        return result
+
+    def _in_industry(self, industry):
+        """Boolean array / set of build indexes in an industry; None means all."""
+        if industry is None:
+            return None
+        code = self._codes["industry"].get(industry, -2)
+        if np is not None:
+            return self._arrays["industry"] == code
+        return {i for i, value in enumerate(self._columns["industry"]) if value == code}
+
+    def scores(self, characteristics):
+        """Similarity (0-1) of the candidate to every build, in build order."""
+        score = self._score(characteristics)
+        return score.tolist() if np is not None else score
+
+    def top_k(self, characteristics, k=5, industry=None):
+        """The k most similar builds as (build, score), most similar first."""
+        score = self._score(characteristics)
+        allowed = self._in_industry(industry)
+        if np is not None:
+            if allowed is not None:
+                score = np.where(allowed, score, -1.0)
+            k = min(k, len(score))
+            if not k:
+                return []
+            # kth-largest score via partition; ties at the cut go to the lowest index
+            kth = np.partition(score, len(score) - k)[len(score) - k]
+            above = np.flatnonzero(score > kth)
+            top = np.concatenate([above, np.flatnonzero(score == kth)[:k - len(above)]])
+            top = top[np.lexsort((top, -score[top]))]
+            return [(self.builds[i], float(score[i])) for i in top if score[i] >= 0]
+        indexed = ((s, -i) for i, s in enumerate(score) if allowed is None or i in allowed)
+        return [(self.builds[-i], s) for s, i in heapq.nlargest(k, indexed)]
+
+    def duplicates(self, characteristics, threshold=DUPLICATE_THRESHOLD, industry=None):
+        """Builds scoring at or above threshold as (build, score), most similar first."""
+        score = self._score(characteristics)
+        allowed = self._in_industry(industry)
+        if np is not None:
+            hits = score >= threshold
+            if allowed is not None:
+                hits &= allowed
+            matches = [(float(score[i]), int(i)) for i in np.flatnonzero(hits)]
+        else:
+            matches = [(s, i) for i, s in enumerate(score)
+                       if s >= threshold and (allowed is None or i in allowed)]
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return [(self.builds[i], s) for s, i in matches]
+
+    def usage(self, industry=None):
+        """How often each value of each characteristic is used, including unused (0) ones."""
+        allowed = self._in_industry(industry)
+        usage = {}
+        if np is not None:
+            for name in FEATURES:
+                codes = self._arrays[name] if allowed is None else self._arrays[name][allowed]
+                counts = np.bincount(codes[codes >= 0], minlength=len(self.vocabulary[name]))
+                usage[name] = dict(zip(self.vocabulary[name], counts.tolist()))
+            matrix = self._matrix if allowed is None else self._matrix[allowed]
+            counts = matrix.sum(axis=0).astype(np.int64).tolist()
+            usage["sections"] = {section: counts[bit] if bit < len(counts) else 0
+                                 for bit, section in enumerate(self.sections)}
+            return usage
+
+        for name in FEATURES:
+            counts = Counter(code for i, code in enumerate(self._columns[name])
+                             if code >= 0 and (allowed is None or i in allowed))
+            usage[name] = {value: counts.get(code, 0) for code, value in enumerate(self.vocabulary[name])}
+        section_counts = Counter()
+        for i, mask in enumerate(self._masks):
+            if allowed is None or i in allowed:
+                section_counts.update(_bits(mask))
+        usage["sections"] = {section: section_counts.get(bit, 0) for bit, section in enumerate(self.sections)}
+        return usage
+
+    def least_used(self, industry=None, count=3):
+        """The `count` least-used values of each characteristic (ties in catalog order)."""
+        return {name: sorted(counts, key=counts.get)[:count]
+                for name, counts in self.usage(industry).items()}
+
+    def recommend(self, industry=None):
+        """Suggested characteristics for a new build, and the most-used ones to avoid."""
+        usage = self.usage(industry)
+        recommended, avoid = {}, {}
+        for name in FEATURES:
+            counts = usage[name]
+            if not counts:
+                continue
+            recommended[name] = min(counts, key=counts.get)
+            most_used = max(counts, key=counts.get)
+            if counts[most_used]:
+                avoid[name] = most_used
+        return {"recommended": recommended, "avoid": avoid}
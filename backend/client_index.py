@@ -0,0 +1,190 @@
+"""
+Packed index of the client configs in src/data/clients for the Next.js app.
+
+Reading the configs one file at a time costs an open per client on every
+build. The index keeps them in two files instead:
+
+- index.json: the slugs with summary fields for listing, and each
+  config's byte offset and length in the pack and its file's mtime and
+  size, so readers can tell when a file was edited in place
+- clients-<n>.jsonl: every config as one compact JSON line
+
+so listing is one small read and loading every config one sequential
+read (see src/lib/clients.ts). Updates are incremental: configs whose
+file changed since the last update are appended to the pack and then
+index.json is replaced atomically, so readers never see a half-written
+index and offsets they already hold stay valid. Once most of the pack is
+superseded it is rewritten under the next generation's name.
+
+    stats = client_index.update()
+"""
+
+import json
+import os
+from pathlib import Path
+
+import files
+
+INDEX_PATH = Path(__file__).parent.parent / "src" / "data" / "client-index"
+INDEX_VERSION = 1
+
+# Config fields copied into index.json for listing without the pack
+SUMMARY_FIELDS = ("name", "status", "template", "updatedAt")
+
+# Rewrite the pack once it holds this many times the bytes still in use
+COMPACT_RATIO = 2
+
+# Generations of pack kept after a rewrite, for readers still using the old index
+KEEP_PACKS = 2
+
+
+def load_index():
+    """Load index.json, or an empty index if there is none (or it's unreadable)."""
+    try:
+        with open(INDEX_PATH / "index.json") as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return index if index.get("version") == INDEX_VERSION else {}
+
+
+def _is_current(stat, entry):
+    """True if a config file's stat matches the one its entry was packed from."""
+    return entry["mtimeNs"] == str(stat.st_mtime_ns) and entry["size"] == stat.st_size
+
+
+def read_config(slug, index=None):
+    """Read one client config through the index; None if it isn't indexed.
+
+    A config edited since the index was written is read from its file.
+    """
+    index = index if index is not None else load_index()
+    for entry in index.get("clients", []):
+        if entry["slug"] == slug:
+            path = files.CLIENTS_JSON_PATH / f"{slug}.json"
+            try:
+                if not _is_current(path.stat(), entry):
+                    return json.loads(path.read_bytes())
+            except FileNotFoundError:
+                return None
+            with open(INDEX_PATH / index["pack"], "rb") as f:
+                f.seek(entry["offset"])
+                return json.loads(f.read(entry["length"]))
+    return None
+
+
+def _pack_name(generation):
+    return f"clients-{generation}.jsonl"
+
+
+def _pack_generations():
+    """Generation numbers of the pack files on disk."""
+    numbers = (path.stem.rpartition("-")[2] for path in INDEX_PATH.glob("clients-*.jsonl"))
+    return [int(number) for number in numbers if number.isdigit()]
+
+
+def _scan(clients_path, entries):
+    """Compare the config files to the index entries.
+
+    Returns (unchanged entries, {slug: (stat, config)} of changed files,
+    errors). A config that can't be read keeps its previous entry.
+    """
+    unchanged, changed, errors = {}, {}, []
+    for path in sorted(clients_path.glob("*.json")):
+        slug = path.stem
+        stat = path.stat()
+        previous = entries.get(slug)
+        if previous and _is_current(stat, previous):
+            unchanged[slug] = previous
+            continue
+        try:
+            changed[slug] = (stat, json.loads(path.read_bytes()))
+        except (OSError, json.JSONDecodeError) as e:
+            errors.append((slug, str(e)))
+            if previous:
+                unchanged[slug] = previous
+    return unchanged, changed, errors
+
+
+def _entry(slug, stat, config, offset, length):
+    entry = {"slug": slug}
+    entry.update({field: config.get(field) for field in SUMMARY_FIELDS})
+    entry.update({"offset": offset, "length": length,
+                  "mtimeNs": str(stat.st_mtime_ns), "size": stat.st_size})
+    return entry
+
+
+def update(force=False):
+    """Bring the index up to date with the config files.
+
+    Only changed configs are read and appended; pass force to rewrite the
+    pack from scratch. Returns counts of updated and removed configs,
+    whether the pack was rewritten, and any configs that couldn't be read.
+    """
+    clients_path = files.CLIENTS_JSON_PATH
+    INDEX_PATH.mkdir(parents=True, exist_ok=True)
+    # Read before scanning: a file written during the scan leaves the
+    # index marked stale rather than silently missing it
+    directory_mtime = str(clients_path.stat().st_mtime_ns) if clients_path.exists() else "0"
+
+    index = load_index()
+    pack = INDEX_PATH / index["pack"] if index else None
+    pack_size = pack.stat().st_size if pack and pack.exists() else 0
+    entries = {} if force else {entry["slug"]: entry for entry in index.get("clients", [])}
+    if any(entry["offset"] + entry["length"] > pack_size for entry in entries.values()):
+        entries = {}
+
+    unchanged, changed, errors = _scan(clients_path, entries)
+    removed = entries.keys() - unchanged.keys() - changed.keys()
+    stats = {"updated": len(changed), "removed": len(removed), "compacted": False, "errors": errors}
+    if index and not changed and not removed and index.get("directoryMtimeNs") == directory_mtime:
+        return stats
+
+    lines = {slug: json.dumps(config, separators=(",", ":")).encode("utf-8")
+             for slug, (_, config) in changed.items()}
+    appended = sum(len(line) + 1 for line in lines.values())
+    live = sum(entry["length"] + 1 for entry in unchanged.values()) + appended
+    if not entries or pack_size + appended > live * COMPACT_RATIO:
+        # Rewrite every config, in slug order, into the next generation's pack
+        old = pack.read_bytes() if unchanged else b""
+        # A new name, so readers holding the old index keep valid offsets
+        generation = max(_pack_generations(), default=0) + 1
+        pack = INDEX_PATH / _pack_name(generation)
+        data = bytearray()
+        new_entries = []
+        for slug in sorted(unchanged.keys() | changed.keys()):
+            if slug in changed:
+                stat, config = changed[slug]
+                line = lines[slug]
+                new_entries.append(_entry(slug, stat, config, len(data), len(line)))
+            else:
+                entry = unchanged[slug]
+                line = old[entry["offset"]:entry["offset"] + entry["length"]]
+                new_entries.append(dict(entry, offset=len(data)))
+            data += line + b"\n"
+        files.write_file_atomic(pack, bytes(data))
+        stats["compacted"] = True
+    else:
+        # Append: bytes already in the pack never move, so old offsets stay valid
+        generation = index["generation"]
+        new_entries = list(unchanged.values())
+        with open(pack, "ab") as f:
+            offset = f.tell()
+            for slug, line in lines.items():
+                stat, config = changed[slug]
+                new_entries.append(_entry(slug, stat, config, offset, len(line)))
+                f.write(line + b"\n")
+                offset += len(line) + 1
+            f.flush()
+            os.fsync(f.fileno())
+
+    new_entries.sort(key=lambda entry: entry["slug"])
+    index = {"version": INDEX_VERSION, "generation": generation, "pack": pack.name,
+             "directoryMtimeNs": directory_mtime, "clients": new_entries}
+    files.write_file_atomic(INDEX_PATH / "index.json", json.dumps(index, separators=(",", ":")).encode("utf-8"))
+
+    if stats["compacted"]:
+        for number in _pack_generations():
+            if number <= generation - KEEP_PACKS:
+                (INDEX_PATH / _pack_name(number)).unlink()
+    return stats
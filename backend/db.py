@@ -3,24 +3,446 @@ Database setup and models for the Website Builder lead management system.
 Uses SQLite for simplicity - no server setup needed.
 """
 
+import atexit
+import hashlib
+import json
+import logging
+import mmap
 import sqlite3
 import os
-from datetime import datetime
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
 from pathlib import Path
+from types import GeneratorType
 
 # Database file location
 DB_PATH = Path(__file__).parent / "website_builder.db"
 
-def get_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DB_PATH)
+# Cold storage for archived leads, ATTACHed as schema "archive" when used
+ARCHIVE_PATH = Path(__file__).parent / "website_builder_archive.db"
+ARCHIVE_BATCH_SIZE = 500        # leads moved per transaction
+ARCHIVE_STATUSES = ('converted', 'lost')    # terminal statuses, archived by default
+ARCHIVE_AFTER_DAYS = 365        # leads not updated for this long are archived by default
+
+# Connection tuning
+BUSY_TIMEOUT = 5.0              # seconds SQLite waits on a locked database
+BUSY_RETRIES = 5                # extra attempts when a write still hits SQLITE_BUSY
+BUSY_BACKOFF = 0.05             # base retry delay in seconds, doubled per attempt
+CACHE_SIZE_KB = 20000           # page cache per connection (~20MB)
+MMAP_SIZE = 256 * 1024 * 1024   # memory-map up to 256MB of the file
+
+# Client lookup cache - per process, so other writers are seen after the TTL
+CLIENT_CACHE_SIZE = 1024        # max clients held
+CLIENT_CACHE_TTL = 30.0         # seconds before a cached client is re-read
+
+# Content-addressed asset storage: each distinct file is stored once
+ASSET_STORE_PATH = Path(__file__).parent / "asset-store"
+HASH_CHUNK_SIZE = 1024 * 1024   # bytes hashed per step
+HASH_MMAP_THRESHOLD = 16 * 1024 * 1024  # files at least this big are memory-mapped
+
+# Opt-in profiling (set DB_PROFILE=1 or call enable_profiling())
+PROFILE_PATH = Path(__file__).parent / ".db-profile.json"
+SLOW_QUERY_MS = 100.0           # statements slower than this are logged with their query plan
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_schema_checked = set()
+_schema_lock = threading.Lock()    # one thread migrates a file; the rest wait for it
+
+_client_cache = OrderedDict()   # client id -> (expires_at, client dict)
+_client_slugs = {}              # slug -> client id, for entries in _client_cache
+_client_cache_lock = threading.Lock()
+_client_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_client_cache_generation = 0    # bumped by every invalidation
+
+def _connect(path):
+    """Open and tune a new SQLite connection."""
+    factory = _ProfiledConnection if _profile is not None else sqlite3.Connection
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, factory=factory)
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def get_connection():
+    """Get this thread's reusable database connection.
+
+    The connection is opened on first use and kept for the life of the
+    thread. It is reopened if DB_PATH changes or the process was forked.
+    """
+    key = (str(DB_PATH), os.getpid(), _profile is not None)
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "key", None) != key:
+        if conn is not None and _local.key[1] == key[1]:
+            conn.close()
+        conn = _connect(DB_PATH)
+        with _schema_lock:
+            if key[0] not in _schema_checked:
+                migrate(conn)
+                _schema_checked.add(key[0])
+        _local.conn = conn
+        _local.key = key
+        _local.depth = 0
+        _local.after_commit = []
+        _local.archive = None
     return conn
 
+def close_connection():
+    """Close this thread's connection, if one is open."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        if _local.key[1] == os.getpid():
+            conn.close()
+        _local.conn = None
+        _local.key = None
+        _local.depth = 0
+        _local.after_commit = []
+        _local.archive = None
+
+@contextmanager
+def connection(immediate=False):
+    """Context manager yielding this thread's connection.
+
+    Nested blocks share the same connection and transaction; the outermost
+    block commits on success and rolls back on error. Pass immediate=True to
+    take the write lock up front (BEGIN IMMEDIATE) for read-then-write work.
+    Callbacks registered with after_commit() run once the outermost block
+    has committed.
+    """
+    conn = get_connection()
+    outermost = _local.depth == 0
+    if outermost and immediate and not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    _local.depth += 1
+    try:
+        yield conn
+    except BaseException:
+        _local.depth -= 1
+        if outermost:
+            _local.after_commit = []
+            if conn.in_transaction:
+                conn.rollback()
+        raise
+    _local.depth -= 1
+    if outermost:
+        if conn.in_transaction:
+            conn.commit()
+        callbacks, _local.after_commit = _local.after_commit, []
+        for callback in callbacks:
+            callback()
+
+def after_commit(callback):
+    """Run callback() once this thread's open connection() block commits.
+
+    For work other connections must not see early, like dropping cached
+    rows: done before the commit, another thread could re-read and cache
+    the old row in between. Dropped if the block rolls back; run at once
+    outside any block.
+    """
+    if getattr(_local, "depth", 0):
+        _local.after_commit.append(callback)
+    else:
+        callback()
+
+def is_busy_error(error):
+    """True if an OperationalError means the database was locked or busy."""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def retry_on_busy(func):
+    """Retry a write with backoff when SQLite reports the database is busy.
+
+    Only the outermost call retries - inside a caller's transaction the error
+    propagates so the whole block can be rolled back.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or getattr(_local, "depth", 0) > 0 or attempt >= BUSY_RETRIES:
+                    raise
+                time.sleep(BUSY_BACKOFF * (2 ** attempt))
+                attempt += 1
+    return wrapper
+
+# Profiling
+_profile = None                 # None while disabled, so the fast path is one check
+_profile_lock = threading.Lock()
+
+def _new_profile():
+    return {"functions": {}, "statements": {}, "slow_queries": deque(maxlen=50)}
+
+def _record(table, key, elapsed, rows, calls=1, running=None):
+    stats = table.get(key)
+    if stats is None:
+        stats = table[key] = {"calls": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0}
+    stats["calls"] += calls
+    stats["total_s"] += elapsed
+    stats["rows"] += rows
+    running = elapsed if running is None else running
+    if running > stats["max_s"]:
+        stats["max_s"] = running
+
+def _log_slow_query(conn, key, sql, parameters, elapsed):
+    """Record a slow statement along with its EXPLAIN QUERY PLAN output."""
+    try:
+        explain = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters or ())
+        plan = [row[3] for row in explain.fetchall()]
+    except sqlite3.Error as e:
+        plan = [f"(no plan: {e})"]
+    profile = _profile
+    if profile is not None:
+        with _profile_lock:
+            profile["slow_queries"].append({
+                "statement": key,
+                "ms": round(elapsed * 1000, 3),
+                "plan": plan,
+                "at": datetime.now().isoformat(),
+            })
+    logger.warning("Slow query (%.1fms): %s\n  %s", elapsed * 1000, key, "\n  ".join(plan))
+
+class _ProfiledCursor(sqlite3.Cursor):
+    """Cursor that records statement latency and rows fetched.
+
+    A statement's latency covers execute() plus every fetch from its
+    results, so streamed scans are measured in full.
+    """
+
+    _sql = None
+
+    def _begin(self, sql, parameters):
+        self._sql = sql
+        self._key = ' '.join(sql.split())
+        self._parameters = parameters
+        self._elapsed = 0.0
+        self._slow_logged = False
+
+    def _account(self, elapsed, rows=0, calls=0):
+        profile = _profile
+        if profile is None or self._sql is None:
+            return
+        self._elapsed += elapsed
+        with _profile_lock:
+            _record(profile["statements"], self._key, elapsed, rows, calls, self._elapsed)
+        if (not self._slow_logged and self._elapsed * 1000 >= SLOW_QUERY_MS
+                and self._key.upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"))):
+            self._slow_logged = True
+            parameters = self._parameters if self._parameters is not None else ()
+            _log_slow_query(self.connection, self._key, self._sql, parameters, self._elapsed)
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._account(time.perf_counter() - start, calls=1)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql, None)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._account(time.perf_counter() - start, calls=1)
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._account(time.perf_counter() - start, 1)
+        return row
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._account(time.perf_counter() - start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._account(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._account(time.perf_counter() - start, len(rows))
+        return rows
+
+class _ProfiledConnection(sqlite3.Connection):
+    """Connection whose cursors are profiled; used only while profiling."""
+
+    def cursor(self, factory=_ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _record_call(name, elapsed, rows):
+    profile = _profile
+    if profile is not None:
+        with _profile_lock:
+            _record(profile["functions"], name, elapsed, rows)
+
+def _profiled_rows(name, rows, elapsed):
+    """Yield from a lazy result, timing only the work of producing each row.
+
+    The call is recorded once the caller finishes or abandons the iteration,
+    with the rows actually produced.
+    """
+    count = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            count += 1
+            yield row
+    finally:
+        rows.close()
+        _record_call(name, elapsed, count)
+
+def profiled(func):
+    """Record calls, latency and rows returned for a db function while profiling.
+
+    Generators (query_leads and the like) are timed and counted as they
+    are iterated, not when they are created.
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _profile is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if not isinstance(result, GeneratorType):
+                rows = len(result) if isinstance(result, (list, tuple)) else int(isinstance(result, dict))
+                _record_call(name, elapsed, rows)
+        if isinstance(result, GeneratorType):
+            return _profiled_rows(name, result, elapsed)
+        return result
+    return wrapper
+
+def enable_profiling(slow_query_ms=None):
+    """Start recording db function and statement statistics."""
+    global _profile, SLOW_QUERY_MS
+    if slow_query_ms is not None:
+        SLOW_QUERY_MS = slow_query_ms
+    if _profile is None:
+        _profile = _new_profile()
+
+def disable_profiling():
+    """Stop recording; the next connection opened is a plain one."""
+    global _profile
+    _profile = None
+
+def reset_profile():
+    """Clear recorded statistics, keeping profiling on if it was on."""
+    global _profile
+    if _profile is not None:
+        _profile = _new_profile()
+
+def get_profile():
+    """Return a JSON-serializable snapshot of the recorded statistics."""
+    profile = _profile or _new_profile()
+    with _profile_lock:
+        return {
+            "functions": {k: dict(v) for k, v in profile["functions"].items()},
+            "statements": {k: dict(v) for k, v in profile["statements"].items()},
+            "slow_queries": list(profile["slow_queries"]),
+            "client_cache": client_cache_stats(),
+        }
+
+def merge_profiles(base, other):
+    """Combine two profile snapshots (counters add, maxima take the larger)."""
+    merged = {"functions": {}, "statements": {}}
+    for section in ("functions", "statements"):
+        for source in (base.get(section, {}), other.get(section, {})):
+            for key, stats in source.items():
+                target = merged[section].setdefault(key, {"calls": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0})
+                target["calls"] += stats["calls"]
+                target["total_s"] += stats["total_s"]
+                target["rows"] += stats["rows"]
+                target["max_s"] = max(target["max_s"], stats["max_s"])
+    merged["slow_queries"] = (base.get("slow_queries", []) + other.get("slow_queries", []))[-50:]
+    merged["client_cache"] = other.get("client_cache") or base.get("client_cache")
+    return merged
+
+def load_profile(path=None):
+    """Load the profile saved by earlier processes, or an empty one."""
+    try:
+        with open(path or PROFILE_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"functions": {}, "statements": {}, "slow_queries": []}
+
+def save_profile(path=None):
+    """Merge this process's statistics into the saved profile file."""
+    if _profile is None:
+        return
+    path = Path(path or PROFILE_PATH)
+    merged = merge_profiles(load_profile(path), get_profile())
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(merged, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _prometheus_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def profile_to_prometheus(profile):
+    """Render a profile snapshot in the Prometheus text exposition format."""
+    lines = []
+    metrics = [
+        ("calls", "calls_total", "counter", "Number of calls"),
+        ("total_s", "seconds_total", "counter", "Cumulative latency in seconds"),
+        ("max_s", "max_seconds", "gauge", "Slowest single call in seconds"),
+        ("rows", "rows_total", "counter", "Rows returned"),
+    ]
+    for section, label in (("functions", "function"), ("statements", "statement")):
+        prefix = f"website_builder_db_{label}"
+        for field, suffix, kind, help_text in metrics:
+            lines.append(f"# HELP {prefix}_{suffix} {help_text} per db {label}.")
+            lines.append(f"# TYPE {prefix}_{suffix} {kind}")
+            for key, stats in sorted(profile.get(section, {}).items()):
+                lines.append(f'{prefix}_{suffix}{{{label}="{_prometheus_label(key)}"}} {stats[field]}')
+    return "\n".join(lines) + "\n"
+
 def init_db():
     """Initialize the database with required tables."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        migrate(conn)
+    print(f"Database initialized at: {DB_PATH}")
+
+def _create_tables(cursor):
+    """Create the base tables if they don't exist."""
 
     # Leads table - people who filled out the landing page form
     cursor.execute('''
@@ -73,111 +495,1202 @@ def init_db():
         )
     ''')
 
-    conn.commit()
-    conn.close()
-    print(f"Database initialized at: {DB_PATH}")
+# Timestamps are stored in UTC in the CURRENT_TIMESTAMP format, so values
+# written by SQLite defaults and by Python compare as equals
+def utc_now():
+    """Return the current UTC time as 'YYYY-MM-DD HH:MM:SS'."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
-# Lead functions
-def add_lead(first_name, last_name, email, phone, current_website=None, source="landing_page"):
-    """Add a new lead to the database."""
-    conn = get_connection()
-    cursor = conn.cursor()
+# Schema upgrades, applied in order. PRAGMA user_version records how many
+# have run, so existing database files are brought up to date on open.
+# Each is safe to re-run on a file it has already (partly) upgraded.
+def _add_column(cursor, table, column, kind):
+    """ALTER TABLE ... ADD COLUMN, unless the column already exists."""
+    existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    if column not in existing:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {kind}')
+
+def _migration_1_list_indexes(cursor):
+    """Indexes for status-filtered, newest-first listing and email lookups."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_status_created ON leads (status, created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_created ON leads (created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_email ON leads (email)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clients_status_created ON clients (status, created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clients_created ON clients (created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clients_lead_id ON clients (lead_id)')
+
+LEAD_SEARCH_COLUMNS = ('first_name', 'last_name', 'email', 'phone', 'notes', 'current_website')
+CLIENT_SEARCH_COLUMNS = ('business_name', 'business_type', 'services', 'address', 'notes')
+
+def _create_search_index(cursor, table, columns, schema='main'):
+    """Create an FTS5 index over `table` kept in sync by triggers."""
+    fts = f'{table}_fts'
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    old_values = ', '.join(f'old.{c}' for c in columns)
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.{fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id', prefix='2 3'
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {schema}.{table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {schema}.{table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {schema}.{table}_fts_update AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f"INSERT INTO {schema}.{fts} ({fts}) VALUES ('rebuild')")
+
+def _migration_2_search(cursor):
+    """Full-text search over leads and clients."""
+    _create_search_index(cursor, 'leads', LEAD_SEARCH_COLUMNS)
+    _create_search_index(cursor, 'clients', CLIENT_SEARCH_COLUMNS)
+
+def _migration_3_dedupe_keys(cursor):
+    """Normalized email/phone key columns for duplicate detection."""
+    _add_column(cursor, 'leads', 'email_key', 'TEXT')
+    _add_column(cursor, 'leads', 'phone_key', 'TEXT')
+    rows = cursor.execute('SELECT id, email, phone FROM leads').fetchall()
+    cursor.executemany(
+        'UPDATE leads SET email_key = ?, phone_key = ? WHERE id = ?',
+        ((normalize_email(email), normalize_phone(phone), lead_id) for lead_id, email, phone in rows),
+    )
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_email_key ON leads (email_key)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_phone_key ON leads (phone_key)')
+
+def _migration_4_updated_indexes(cursor):
+    """Indexes for incremental reads by updated_at.
+
+    updated_at held both CURRENT_TIMESTAMP ('YYYY-MM-DD HH:MM:SS') and
+    isoformat ('YYYY-MM-DDTHH:MM:SS.ffffff') values, so the index is on
+    datetime(updated_at), which normalizes both.
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_updated ON leads (datetime(updated_at), id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clients_updated ON clients (datetime(updated_at), id)')
+
+# Lead columns that are mirrored to Supabase by sync.py
+SYNC_COLUMNS = ('first_name', 'last_name', 'email', 'phone', 'current_website', 'source', 'status', 'notes')
+
+def _migration_5_sync_log(cursor):
+    """Change log for incremental sync of leads to Supabase (see sync.py).
+
+    Triggers append a sync_log entry for every lead insert, edit and
+    delete; a sync pushes the entries and removes them. Every existing lead
+    is logged once so the first sync copies it. remote_id is the lead's
+    UUID in Supabase, assigned on first push.
+    """
+    cols = ', '.join(SYNC_COLUMNS)
+    _add_column(cursor, 'leads', 'remote_id', 'TEXT')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_remote_id ON leads (remote_id)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            lead_id INTEGER NOT NULL,
+            remote_id TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS leads_sync_insert AFTER INSERT ON leads BEGIN
+            INSERT INTO sync_log (lead_id) VALUES (new.id);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS leads_sync_update AFTER UPDATE OF {cols} ON leads BEGIN
+            INSERT INTO sync_log (lead_id) VALUES (new.id);
+        END
+    ''')
+    # Deletes carry the remote id, since the row is gone by push time
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS leads_sync_delete AFTER DELETE ON leads
+        WHEN old.remote_id IS NOT NULL BEGIN
+            INSERT INTO sync_log (lead_id, remote_id) VALUES (old.id, old.remote_id);
+        END
+    ''')
+    cursor.execute('''
+        INSERT INTO sync_log (lead_id)
+        SELECT id FROM leads WHERE id NOT IN (SELECT lead_id FROM sync_log) ORDER BY id
+    ''')
+
+def _migration_6_asset_blobs(cursor):
+    """Content hashes on assets and a reference-counted blobs table.
+
+    Triggers keep blobs.refcount equal to the number of assets rows using
+    each hash; blobs at zero are removed by collect_asset_garbage().
+    """
+    _add_column(cursor, 'assets', 'content_hash', 'TEXT')
+    _add_column(cursor, 'assets', 'size', 'INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assets_client ON assets (client_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assets_hash ON assets (content_hash)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs (hash) WHERE refcount = 0')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS assets_blob_insert AFTER INSERT ON assets
+        WHEN new.content_hash IS NOT NULL BEGIN
+            INSERT INTO blobs (hash, size) VALUES (new.content_hash, new.size)
+                ON CONFLICT (hash) DO NOTHING;
+            UPDATE blobs SET refcount = refcount + 1 WHERE hash = new.content_hash;
+        END
+    ''')
     cursor.execute('''
-        INSERT INTO leads (first_name, last_name, email, phone, current_website, source)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (first_name, last_name, email, phone, current_website, source))
-    lead_id = cursor.lastrowid
+        CREATE TRIGGER IF NOT EXISTS assets_blob_delete AFTER DELETE ON assets
+        WHEN old.content_hash IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE hash = old.content_hash;
+        END
+    ''')
+
+# Summary tables kept current by triggers, so stats read a few buckets
+# instead of scanning leads and clients: summary -> (table, bucket columns)
+SUMMARY_TABLES = {
+    'lead_counts': ('leads', ('status', 'source')),
+    'client_counts': ('clients', ('status', 'tier')),
+}
+# Lead statuses in pipeline order; stats lists any others after these
+LEAD_FUNNEL = ('new', 'contacted', 'qualified', 'converted', 'lost')
+# weekly_counts has a column per table: rows created in the week starting
+# Monday. New clients are converted leads, so that column is conversions.
+WEEKLY_TABLES = ('leads', 'clients')
+
+def _week_expression(row):
+    return f"IFNULL(date({row}.created_at, 'weekday 0', '-6 days'), '')"
+
+def _skip_when(guard):
+    """Trigger WHEN clause that skips the trigger while `guard` holds a row."""
+    return f'WHEN NOT EXISTS (SELECT 1 FROM {guard})' if guard else ''
+
+def _create_counter(cursor, summary, table, columns, guard=None):
+    """A count per distinct combination of `columns`, maintained by triggers.
+
+    Inserts and deletes aren't counted while the `guard` table has a row.
+    """
+    cols = ', '.join(columns)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {summary} (
+            {', '.join(f"{c} TEXT NOT NULL" for c in columns)},
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({cols})
+        ) WITHOUT ROWID
+    ''')
+    new_keys = ', '.join(f"IFNULL(new.{c}, '')" for c in columns)
+    increment = f'''INSERT INTO {summary} ({cols}, count) VALUES ({new_keys}, 1)
+            ON CONFLICT ({cols}) DO UPDATE SET count = count + 1;'''
+    decrement = f'''UPDATE {summary} SET count = count - 1
+            WHERE {' AND '.join(f"{c} = IFNULL(old.{c}, '')" for c in columns)};'''
+    changed = ' OR '.join(f'old.{c} IS NOT new.{c}' for c in columns)
+    skip = _skip_when(guard)
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {summary}_insert AFTER INSERT ON {table} {skip} BEGIN {increment} END')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {summary}_delete AFTER DELETE ON {table} {skip} BEGIN {decrement} END')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {summary}_update AFTER UPDATE OF {cols} ON {table}
+        WHEN {changed} BEGIN {decrement} {increment} END
+    ''')
+
+def _create_weekly_counter(cursor, table, guard=None):
+    """Per-week count of rows created in `table`, kept in weekly_counts.<table>."""
+    column = table
+    increment = f'''INSERT INTO weekly_counts (week, {column}) VALUES ({_week_expression('new')}, 1)
+            ON CONFLICT (week) DO UPDATE SET {column} = {column} + 1;'''
+    decrement = f'''UPDATE weekly_counts SET {column} = {column} - 1
+            WHERE week = {_week_expression('old')};'''
+    skip = _skip_when(guard)
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS weekly_{table}_insert AFTER INSERT ON {table} {skip} BEGIN {increment} END')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS weekly_{table}_delete AFTER DELETE ON {table} {skip} BEGIN {decrement} END')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS weekly_{table}_update AFTER UPDATE OF created_at ON {table}
+        WHEN {_week_expression('old')} IS NOT {_week_expression('new')} BEGIN {decrement} {increment} END
+    ''')
+
+def _summary_source(table, columns, archived):
+    """FROM target for recounting `table`; with archived, archive.leads counts too."""
+    if not archived or table != 'leads':
+        return table
+    cols = ', '.join(columns)
+    return f'(SELECT {cols} FROM main.leads UNION ALL SELECT {cols} FROM archive.leads) AS {table}'
+
+def _expected_summaries(cursor, archived=False):
+    """Recompute every summary table from leads and clients: {summary: {key: counts}}.
+
+    Pass archived when the archive is attached, so archived leads are counted.
+    """
+    expected = {}
+    for summary, (table, columns) in SUMMARY_TABLES.items():
+        keys = ', '.join(f"IFNULL({c}, '')" for c in columns)
+        source = _summary_source(table, columns, archived)
+        rows = cursor.execute(f'SELECT {keys}, COUNT(*) FROM {source} GROUP BY {keys}')
+        expected[summary] = {tuple(row[:-1]): (row[-1],) for row in rows}
+    weekly = {}
+    for position, table in enumerate(WEEKLY_TABLES):
+        source = _summary_source(table, ('created_at',), archived)
+        for week, count in cursor.execute(f'SELECT {_week_expression(table)}, COUNT(*) FROM {source} GROUP BY 1'):
+            weekly.setdefault((week,), [0] * len(WEEKLY_TABLES))[position] = count
+    expected['weekly_counts'] = {key: tuple(counts) for key, counts in weekly.items()}
+    return expected
+
+def _current_summaries(cursor):
+    """The summary tables as stored, in the same shape as _expected_summaries."""
+    current = {}
+    for summary, (_, columns) in SUMMARY_TABLES.items():
+        rows = cursor.execute(f'SELECT * FROM {summary} WHERE count != 0')
+        current[summary] = {tuple(row[:len(columns)]): tuple(row[len(columns):]) for row in rows}
+    counts = ', '.join(WEEKLY_TABLES)
+    nonzero = ' OR '.join(f'{table} != 0' for table in WEEKLY_TABLES)
+    rows = cursor.execute(f'SELECT week, {counts} FROM weekly_counts WHERE {nonzero}')
+    current['weekly_counts'] = {(row[0],): tuple(row[1:]) for row in rows}
+    return current
+
+def _write_summaries(cursor, summaries):
+    for summary, rows in summaries.items():
+        cursor.execute(f'DELETE FROM {summary}')
+        for key, counts in rows.items():
+            values = key + counts
+            cursor.execute(f"INSERT INTO {summary} VALUES ({', '.join('?' * len(values))})", values)
+
+def _migration_7_summary_tables(cursor):
+    """Trigger-maintained counts behind `manage.py stats`."""
+    for summary, (table, columns) in SUMMARY_TABLES.items():
+        _create_counter(cursor, summary, table, columns)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS weekly_counts (
+            week TEXT PRIMARY KEY,
+            {', '.join(f'{table} INTEGER NOT NULL DEFAULT 0' for table in WEEKLY_TABLES)}
+        ) WITHOUT ROWID
+    ''')
+    for table in WEEKLY_TABLES:
+        _create_weekly_counter(cursor, table)
+    _write_summaries(cursor, _expected_summaries(cursor))
+
+# Moving leads to or from the archive isn't creating or deleting them, so
+# stats keep counting archived leads: while a move's transaction holds a row
+# in archive_moves, the lead counters skip its inserts and deletes.
+ARCHIVE_MOVES_GUARD = 'archive_moves'
+
+def _migration_8_archive_moves(cursor):
+    """Recreate the lead counter triggers so archive moves don't change stats."""
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {ARCHIVE_MOVES_GUARD} (active INTEGER PRIMARY KEY)')
+    triggers = [f'weekly_leads_{event}' for event in ('insert', 'delete', 'update')]
+    for summary, (table, _) in SUMMARY_TABLES.items():
+        if table == 'leads':
+            triggers += [f'{summary}_{event}' for event in ('insert', 'delete', 'update')]
+    for trigger in triggers:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    for summary, (table, columns) in SUMMARY_TABLES.items():
+        if table == 'leads':
+            _create_counter(cursor, summary, table, columns, guard=ARCHIVE_MOVES_GUARD)
+    _create_weekly_counter(cursor, 'leads', guard=ARCHIVE_MOVES_GUARD)
+
+def _migration_9_utc_updated_at(cursor):
+    """Convert updated_at values written as local isoformat to UTC.
+
+    Update functions used to store datetime.now().isoformat() while column
+    defaults store UTC, so `since` filters and archive cutoffs compared
+    times from two zones. SQLite's 'utc' modifier reads the value as local
+    time, the same zone Python wrote it in.
+    """
+    for table in ('leads', 'clients'):
+        cursor.execute(f"UPDATE {table} SET updated_at = datetime(updated_at, 'utc') WHERE updated_at LIKE '%T%'")
+
+MIGRATIONS = [
+    _migration_1_list_indexes,
+    _migration_2_search,
+    _migration_3_dedupe_keys,
+    _migration_4_updated_indexes,
+    _migration_5_sync_log,
+    _migration_6_asset_blobs,
+    _migration_7_summary_tables,
+    _migration_8_archive_moves,
+    _migration_9_utc_updated_at,
+]
+
+def migrate(conn):
+    """Create missing tables and apply any pending schema upgrades.
+
+    The whole upgrade is one BEGIN IMMEDIATE transaction: other connections,
+    in this process or another, wait for it and then find the schema
+    current, and an upgrade that fails leaves the file as it was.
+    """
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Re-read under the write lock: another connection may have upgraded
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < len(MIGRATIONS):
+            cursor = conn.cursor()
+            _create_tables(cursor)
+            for number, upgrade in enumerate(MIGRATIONS[version:], version + 1):
+                upgrade(cursor)
+                cursor.execute(f'PRAGMA user_version = {number}')
+    except BaseException:
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
-    return lead_id
 
-def get_lead(lead_id):
-    """Get a lead by ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM leads WHERE id = ?', (lead_id,))
-    lead = cursor.fetchone()
-    conn.close()
-    return dict(lead) if lead else None
+def _page_query(table, status, limit, after, select='*', archived=False):
+    """Build a keyset-paginated, newest-first query for leads or clients.
 
-def get_all_leads(status=None):
-    """Get all leads, optionally filtered by status."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    `after` is the id of the last row on the previous page; rows strictly
+    older than it (by created_at, then id) are returned. A limit of None
+    returns every remaining row. With archived, rows of archive.<table>
+    are merged in; the archive must already be attached.
+    """
+    schemas = ('main', 'archive') if archived else ('main',)
+    clauses = []
+    params = []
     if status:
-        cursor.execute('SELECT * FROM leads WHERE status = ? ORDER BY created_at DESC', (status,))
+        clauses.append('status = ?')
+        params.append(status)
+    if after is not None:
+        anchor = ' UNION ALL '.join(f'SELECT created_at, id FROM {schema}.{table} WHERE id = ?' for schema in schemas)
+        clauses.append(f'(created_at, id) < ({anchor})')
+        params.extend([after] * len(schemas))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    limit_clause = ' LIMIT ?' if limit is not None else ''
+    if limit is not None:
+        params.append(limit)
+    if not archived:
+        return f'SELECT {select} FROM {table} {where} ORDER BY created_at DESC, id DESC{limit_clause}', params
+
+    # Each file is read newest-first through its own index, then merged
+    if select == '*':
+        select = ', '.join(table_columns(table))
+    branches = ' UNION ALL '.join(f'''
+        SELECT * FROM (
+            SELECT {select}, created_at AS sort_created, id AS sort_id FROM {schema}.{table} {where}
+            ORDER BY created_at DESC, id DESC{limit_clause}
+        )''' for schema in schemas)
+    query = f'SELECT {select} FROM ({branches}) ORDER BY sort_created DESC, sort_id DESC{limit_clause}'
+    return query, params * len(schemas) + params[-1:] * (limit is not None)
+
+def _get_page(table, status, limit, after, archived=False):
+    query, params = _page_query(table, status, limit, after, archived=archived)
+    with connection() as conn:
+        return [dict(row) for row in conn.execute(query, params)]
+
+def _iter_pages(table, status, page_size, archived=False):
+    after = None
+    while True:
+        page = _get_page(table, status, page_size, after, archived)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1]['id']
+
+EXPORT_FETCH_SIZE = 1000       # rows pulled per fetchmany when streaming
+
+# Compact row models. Unlike the dicts returned by get_*, these are tuples
+# with named fields - no per-row key storage - and the query_* functions
+# can project just the columns a caller needs.
+LEAD_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone', 'current_website', 'source',
+               'status', 'notes', 'created_at', 'updated_at', 'email_key', 'phone_key', 'remote_id')
+CLIENT_FIELDS = ('id', 'lead_id', 'slug', 'business_name', 'business_type', 'phone', 'email',
+                 'address', 'services', 'status', 'tier', 'notes', 'created_at', 'updated_at')
+ASSET_FIELDS = ('id', 'client_id', 'asset_type', 'filename', 'filepath', 'uploaded_at', 'content_hash', 'size')
+
+Lead = namedtuple('Lead', LEAD_FIELDS)
+Client = namedtuple('Client', CLIENT_FIELDS)
+Asset = namedtuple('Asset', ASSET_FIELDS)
+
+_MODELS = {'leads': Lead, 'clients': Client, 'assets': Asset}
+
+@lru_cache(maxsize=64)
+def row_model(table, columns=None):
+    """Return the row model for a table, or a same-named one with only `columns`."""
+    model = _MODELS[table]
+    if columns is None or tuple(columns) == model._fields:
+        return model
+    unknown = [c for c in columns if c not in model._fields]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+    return namedtuple(model.__name__, columns)
+
+def _iter_models(model, query, params, fetch_size=EXPORT_FETCH_SIZE):
+    """Lazily run a query, yielding model instances fetch_size rows at a time."""
+    cursor = get_connection().execute(query, params)
+    cursor.row_factory = None
+    make = model._make
+    while True:
+        batch = cursor.fetchmany(fetch_size)
+        if not batch:
+            return
+        yield from map(make, batch)
+
+def _query_models(table, columns, status, limit, after, archived=False):
+    model = row_model(table, tuple(columns) if columns else None)
+    query, params = _page_query(table, status, limit, after, ', '.join(model._fields), archived)
+    return _iter_models(model, query, params)
+
+def table_columns(table):
+    """Return the column names of a table, in order."""
+    with connection() as conn:
+        return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+def stream_rows(table, columns=None, since=None, fetch_size=EXPORT_FETCH_SIZE):
+    """Stream rows from leads or clients without loading them all.
+
+    Returns (column_names, iterator of row tuples). Rows are fetched
+    fetch_size at a time. With `since`, only rows updated at or after that
+    timestamp are returned, oldest change first, so the last row's
+    updated_at can be the next run's `since`. updated_at is compared to the
+    second, so the comparison is inclusive: a row updated later in the
+    same second as the last one exported is picked up next run, at the
+    cost of rows from that second being exported again. Incremental
+    consumers should upsert by id.
+    """
+    if table not in ('leads', 'clients'):
+        raise ValueError(f"Can't stream table: {table}")
+    available = table_columns(table)
+    columns = list(columns or available)
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+
+    select = ', '.join(columns)
+    if since:
+        query = f'SELECT {select} FROM {table} WHERE datetime(updated_at) >= datetime(?) ORDER BY datetime(updated_at), id'
+        params = (since,)
+    else:
+        query = f'SELECT {select} FROM {table} ORDER BY id'
+        params = ()
+
+    def rows():
+        # Not wrapped in connection(): a suspended generator must not hold
+        # this thread's transaction depth open for other callers
+        cursor = get_connection().execute(query, params)
+        cursor.row_factory = None
+        while True:
+            batch = cursor.fetchmany(fetch_size)
+            if not batch:
+                return
+            yield from batch
+
+    return columns, rows()
+
+def _match_expression(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def _search(table, text, limit, columns=None, archived=False):
+    expression = _match_expression(text)
+    if not expression:
+        return []
+    model = row_model(table, tuple(columns)) if columns else None
+    if archived:
+        names = model._fields if model else table_columns(table)
+        select = ', '.join(f'{table}.{c}' for c in names)
+        # Aliases keep the column references the same for both files
+        branches = ' UNION ALL '.join(f'''
+            SELECT {select}, {table}_fts.rank AS search_rank
+            FROM {schema}.{table}_fts AS {table}_fts
+            JOIN {schema}.{table} AS {table} ON {table}.id = {table}_fts.rowid
+            WHERE {table}_fts.{table}_fts MATCH ?''' for schema in ('main', 'archive'))
+        query = f"SELECT {', '.join(names)} FROM ({branches}) ORDER BY search_rank LIMIT ?"
+        params = (expression, expression, limit)
     else:
-        cursor.execute('SELECT * FROM leads ORDER BY created_at DESC')
-    leads = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return leads
+        select = ', '.join(f'{table}.{c}' for c in model._fields) if model else f'{table}.*'
+        query = f'''
+            SELECT {select} FROM {table}_fts
+            JOIN {table} ON {table}.id = {table}_fts.rowid
+            WHERE {table}_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        '''
+        params = (expression, limit)
+    if model:
+        return list(_iter_models(model, query, params))
+    with connection() as conn:
+        return [dict(row) for row in conn.execute(query, params)]
+
+# Lead functions
+class DuplicateLeadError(ValueError):
+    """Raised by add_lead when a lead with the same email or phone exists."""
+
+    def __init__(self, lead_id):
+        super().__init__(f"Lead {lead_id} already has this email or phone")
+        self.lead_id = lead_id
+
+def normalize_email(email):
+    """Key used to match duplicate emails (trimmed, lowercased)."""
+    email = (email or '').strip().lower()
+    return email or None
+
+def normalize_phone(phone):
+    """Key used to match duplicate phones (digits only, no US country code)."""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits or None
+
+@profiled
+def find_duplicate_lead(email, phone):
+    """Return the id of the oldest lead sharing this email or phone, or None."""
+    email_key = normalize_email(email)
+    phone_key = normalize_phone(phone)
+    with connection() as conn:
+        row = conn.execute('''
+            SELECT id FROM leads WHERE email_key = ?
+            UNION
+            SELECT id FROM leads WHERE phone_key = ?
+            ORDER BY id LIMIT 1
+        ''', (email_key, phone_key)).fetchone()
+    return row[0] if row else None
+
+@profiled
+@retry_on_busy
+def add_lead(first_name, last_name, email, phone, current_website=None, source="landing_page", on_duplicate="allow"):
+    """Add a new lead to the database.
+
+    on_duplicate controls what happens when a lead with the same email or
+    phone already exists: "allow" inserts anyway, "reject" raises
+    DuplicateLeadError, and "merge" fills in the existing lead's missing
+    website and returns its id instead of inserting.
+    """
+    # The duplicate check is read-then-write, so take the write lock first
+    # or two callers could both miss each other and insert
+    with connection(immediate=on_duplicate != "allow") as conn:
+        if on_duplicate != "allow":
+            existing_id = find_duplicate_lead(email, phone)
+            if existing_id is not None:
+                if on_duplicate == "reject":
+                    raise DuplicateLeadError(existing_id)
+                conn.execute('''
+                    UPDATE leads SET current_website = COALESCE(current_website, ?), updated_at = ?
+                    WHERE id = ?
+                ''', (current_website, utc_now(), existing_id))
+                return existing_id
+        cursor = conn.execute('''
+            INSERT INTO leads (first_name, last_name, email, phone, current_website, source, email_key, phone_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (first_name, last_name, email, phone, current_website, source,
+              normalize_email(email), normalize_phone(phone)))
+        return cursor.lastrowid
+
+@profiled
+@retry_on_busy
+def add_leads(leads):
+    """Add many leads in a single transaction.
+
+    leads is a sequence of (first_name, last_name, email, phone,
+    current_website, source) tuples. Returns the number of rows inserted.
+    """
+    with connection() as conn:
+        cursor = conn.executemany('''
+            INSERT INTO leads (first_name, last_name, email, phone, current_website, source, email_key, phone_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ((*lead, normalize_email(lead[2]), normalize_phone(lead[3])) for lead in leads))
+        return cursor.rowcount
+
+@profiled
+def get_lead(lead_id, include_archived=False):
+    """Get a lead by ID.
+
+    With include_archived, a lead that has been moved to the archive is
+    returned too, with its archived_at.
+    """
+    with connection() as conn:
+        lead = conn.execute('SELECT * FROM leads WHERE id = ?', (lead_id,)).fetchone()
+    if lead is None and include_archived and attach_archive():
+        with connection() as conn:
+            lead = conn.execute('SELECT * FROM archive.leads WHERE id = ?', (lead_id,)).fetchone()
+    return dict(lead) if lead else None
+
+@profiled
+def get_all_leads(status=None, include_archived=False):
+    """Get all leads, optionally filtered by status (and including archived ones)."""
+    if include_archived and attach_archive():
+        return _get_page('leads', status, None, None, archived=True)
+    with connection() as conn:
+        if status:
+            cursor = conn.execute('SELECT * FROM leads WHERE status = ? ORDER BY created_at DESC, id DESC', (status,))
+        else:
+            cursor = conn.execute('SELECT * FROM leads ORDER BY created_at DESC, id DESC')
+        return [dict(row) for row in cursor.fetchall()]
+
+@profiled
+def get_leads_page(status=None, limit=50, after=None, include_archived=False):
+    """Get one page of leads, newest first.
 
+    Pass the id of the last lead from the previous page as `after` to get
+    the next page. Cost is proportional to the page, not the table. With
+    include_archived, archived leads are listed in the same order.
+    """
+    return _get_page('leads', status, limit, after, include_archived and attach_archive())
+
+def iter_leads(status=None, page_size=500, include_archived=False):
+    """Iterate over all leads, newest first, fetching one page at a time."""
+    return _iter_pages('leads', status, page_size, include_archived and attach_archive())
+
+@profiled
+def query_leads(columns=None, status=None, limit=None, after=None, include_archived=False):
+    """Lazily iterate leads newest first as compact Lead rows.
+
+    Only `columns` are fetched (default: all). status, limit, after and
+    include_archived work as in get_leads_page.
+    """
+    return _query_models('leads', columns, status, limit, after, include_archived and attach_archive())
+
+def search_leads(text, limit=20, columns=None, include_archived=False):
+    """Full-text search leads by name, email, phone, notes or website.
+
+    Each word matches as a prefix; results are ordered best match first.
+    Returns dicts, or Lead rows with just `columns` if given. With
+    include_archived, archived leads are searched too.
+    """
+    return _search('leads', text, limit, columns, include_archived and attach_archive())
+
+@profiled
+@retry_on_busy
 def update_lead_status(lead_id, status, notes=None):
     """Update a lead's status."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    if notes:
-        cursor.execute('''
-            UPDATE leads SET status = ?, notes = ?, updated_at = ?
-            WHERE id = ?
-        ''', (status, notes, datetime.now().isoformat(), lead_id))
-    else:
-        cursor.execute('''
-            UPDATE leads SET status = ?, updated_at = ?
+    with connection() as conn:
+        if notes:
+            conn.execute('''
+                UPDATE leads SET status = ?, notes = ?, updated_at = ?
+                WHERE id = ?
+            ''', (status, notes, utc_now(), lead_id))
+        else:
+            conn.execute('''
+                UPDATE leads SET status = ?, updated_at = ?
+                WHERE id = ?
+            ''', (status, utc_now(), lead_id))
+
+def _filter_clause(filters, allowed):
+    """Build a WHERE clause from {column: value} filters.
+
+    created_after/created_before become a created_at range; other keys must
+    be in `allowed` and match exactly. None values are ignored.
+    """
+    clauses = []
+    params = []
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if key == 'created_after':
+            clauses.append('created_at >= ?')
+        elif key == 'created_before':
+            clauses.append('created_at < ?')
+        elif key in allowed:
+            clauses.append(f'{key} = ?')
+        else:
+            raise ValueError(f"Unknown filter: {key}")
+        params.append(value)
+    return ' AND '.join(clauses), params
+
+@profiled
+@retry_on_busy
+def update_leads_status_bulk(new_status, ids=None, notes=None, **filters):
+    """Set the status of many leads in one transaction.
+
+    Pass a list of lead ids, filters (status, source, created_after,
+    created_before), or both to update only the listed leads that match.
+    Filters alone run as a single set-based UPDATE. At least one is
+    required. Returns the number of leads changed.
+    """
+    where, params = _filter_clause(filters, ('status', 'source'))
+    now = utc_now()
+    note_sql = ', notes = ?' if notes else ''
+    note_params = [notes] if notes else []
+    with connection() as conn:
+        if ids is not None:
+            extra = f' AND {where}' if where else ''
+            cursor = conn.executemany(
+                f'UPDATE leads SET status = ?{note_sql}, updated_at = ? WHERE id = ?{extra}',
+                [(new_status, *note_params, now, lead_id, *params) for lead_id in ids],
+            )
+            return max(cursor.rowcount, 0)
+        if not where:
+            raise ValueError("Pass ids or at least one filter")
+        cursor = conn.execute(
+            f'UPDATE leads SET status = ?{note_sql}, updated_at = ? WHERE {where}',
+            [new_status, *note_params, now, *params],
+        )
+        return cursor.rowcount
+
+# Lead deduplication
+@profiled
+def find_duplicate_groups():
+    """Group leads that share an email or phone key.
+
+    Candidates come from GROUP BY over the indexed key columns, and groups
+    linked through either key are joined with a union-find, so the cost
+    scales with the number of duplicates rather than pairs of leads.
+    Returns a list of id lists, each ordered oldest lead first.
+    """
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    with connection() as conn:
+        for column in ('email_key', 'phone_key'):
+            cursor = conn.execute(f'''
+                SELECT group_concat(id) FROM leads
+                WHERE {column} IS NOT NULL
+                GROUP BY {column} HAVING count(*) > 1
+            ''')
+            for (ids,) in cursor:
+                ids = [int(i) for i in ids.split(',')]
+                for lead_id in ids:
+                    parent.setdefault(lead_id, lead_id)
+                root = find(ids[0])
+                for lead_id in ids[1:]:
+                    other = find(lead_id)
+                    if other != root:
+                        parent[other] = root
+
+        groups = {}
+        for lead_id in parent:
+            groups.setdefault(find(lead_id), []).append(lead_id)
+
+        # Order each group oldest first (created_at, then id)
+        created = {}
+        ids = list(parent)
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            placeholders = ','.join('?' * len(chunk))
+            created.update(conn.execute(
+                f'SELECT id, created_at FROM leads WHERE id IN ({placeholders})', chunk
+            ).fetchall())
+
+    return [sorted(group, key=lambda i: (created[i] or '', i)) for group in groups.values()]
+
+def _fetch_leads_by_id(conn, ids):
+    """Return {id: row} for the given lead ids, queried in chunks."""
+    rows = {}
+    ids = list(ids)
+    for start in range(0, len(ids), 900):
+        chunk = ids[start:start + 900]
+        placeholders = ','.join('?' * len(chunk))
+        for row in conn.execute(f'SELECT * FROM leads WHERE id IN ({placeholders})', chunk):
+            rows[row['id']] = row
+    return rows
+
+@profiled
+@retry_on_busy
+def merge_duplicate_leads(groups=None):
+    """Merge each group of duplicate leads into its oldest lead.
+
+    The oldest lead keeps its created_at and status; notes from the others
+    are appended, blank fields are filled from them, and clients pointing at
+    a merged lead are re-pointed. Everything runs in one transaction.
+    Returns the number of leads removed.
+    """
+    if groups is None:
+        groups = find_duplicate_groups()
+    if not groups:
+        return 0
+
+    now = utc_now()
+    survivors = []
+    repoints = []
+    with connection(immediate=True) as conn:
+        rows = _fetch_leads_by_id(conn, (lead_id for group in groups for lead_id in group))
+        for group in groups:
+            group = [lead_id for lead_id in group if lead_id in rows]
+            if len(group) < 2:
+                continue
+            survivor = rows[group[0]]
+            repoints.extend((survivor['id'], lead_id) for lead_id in group[1:])
+
+            notes = []
+            for lead_id in group:
+                note = (rows[lead_id]['notes'] or '').strip()
+                if note and note not in notes:
+                    notes.append(note)
+
+            def first_with(column):
+                for lead_id in group:
+                    if rows[lead_id][column]:
+                        return rows[lead_id]
+                return survivor
+
+            email_row = first_with('email_key')
+            phone_row = first_with('phone_key')
+            merged = ('\n'.join(notes) or None, first_with('current_website')['current_website'],
+                      email_row['email'], email_row['email_key'], phone_row['phone'], phone_row['phone_key'])
+            current = (survivor['notes'], survivor['current_website'], survivor['email'],
+                       survivor['email_key'], survivor['phone'], survivor['phone_key'])
+            if merged != current:
+                survivors.append((*merged, now, survivor['id']))
+
+        conn.executemany('''
+            UPDATE leads SET notes = ?, current_website = ?, email = ?, email_key = ?,
+                phone = ?, phone_key = ?, updated_at = ?
             WHERE id = ?
-        ''', (status, datetime.now().isoformat(), lead_id))
-    conn.commit()
-    conn.close()
+        ''', survivors)
+        conn.executemany('UPDATE clients SET lead_id = ? WHERE lead_id = ?', repoints)
+        conn.executemany('DELETE FROM leads WHERE id = ?', ((lead_id,) for _, lead_id in repoints))
+        after_commit(clear_client_cache)
+
+    return len(repoints)
+
+# Lead archive. Old leads move to a separate file (ARCHIVE_PATH) so the
+# hot database stays small; the archive is ATTACHed only when it's used.
+def attach_archive(create=False):
+    """Attach ARCHIVE_PATH to this thread's connection as schema "archive".
+
+    Returns False if there is no archive file yet, unless create. Must be
+    called outside a transaction - SQLite can't ATTACH inside one.
+    """
+    conn = get_connection()
+    path = str(Path(ARCHIVE_PATH).resolve())
+    if _local.archive == path:
+        return True
+    if not create and not os.path.exists(path):
+        return False
+    if _local.archive is not None:
+        conn.execute('DETACH DATABASE archive')
+    conn.execute('ATTACH DATABASE ? AS archive', (path,))
+    _local.archive = path
+    _migrate_archive(conn)
+    return True
+
+def _migrate_archive(conn):
+    """Create archive.leads like leads, or add columns leads has gained since."""
+    columns = [(row[1], row[2]) for row in conn.execute('PRAGMA main.table_info(leads)')]
+    existing = {row[1] for row in conn.execute('PRAGMA archive.table_info(leads)')}
+    with connection() as conn:
+        if existing:
+            for name, kind in columns:
+                if name not in existing:
+                    conn.execute(f'ALTER TABLE archive.leads ADD COLUMN {name} {kind}')
+            # sync.pull looks archived leads up by remote_id
+            conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_leads_remote_id ON leads (remote_id)')
+            return
+        conn.execute('PRAGMA archive.journal_mode = WAL')
+        definitions = ', '.join(f"{name} {kind}{' PRIMARY KEY' if name == 'id' else ''}" for name, kind in columns)
+        conn.execute(f'CREATE TABLE IF NOT EXISTS archive.leads ({definitions}, archived_at TIMESTAMP)')
+        conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_leads_status_created ON leads (status, created_at, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_leads_created ON leads (created_at, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_leads_remote_id ON leads (remote_id)')
+        _create_search_index(conn, 'leads', LEAD_SEARCH_COLUMNS, schema='archive')
+
+def _archive_filter(before, statuses):
+    """WHERE clause for leads to archive: not updated since `before`, or in `statuses`."""
+    clauses, params = [], []
+    if before:
+        clauses.append('datetime(updated_at) < datetime(?)')
+        params.append(before)
+    if statuses:
+        clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if not clauses:
+        raise ValueError("Pass a cutoff and/or statuses to archive by")
+    # Once sync.py is in use, leads with unpushed changes wait for the next push
+    return f'''({' OR '.join(clauses)})
+        AND NOT (EXISTS (SELECT 1 FROM sync_state) AND id IN (SELECT lead_id FROM sync_log))''', params
+
+@retry_on_busy
+def _archive_batch(where, params, columns, batch_size):
+    with connection(immediate=True) as conn:
+        ids = [row[0] for row in conn.execute(f'SELECT id FROM main.leads WHERE {where} LIMIT ?', (*params, batch_size))]
+        if not ids:
+            return 0
+        marks = ','.join('?' * len(ids))
+        last_seq = conn.execute('SELECT IFNULL(MAX(seq), 0) FROM sync_log').fetchone()[0]
+        # The two files commit separately; a lead left in both by a crash
+        # between them is still in leads, so the next run replaces its copy
+        conn.execute(f'INSERT INTO {ARCHIVE_MOVES_GUARD} VALUES (1)')
+        conn.execute(f'DELETE FROM archive.leads WHERE id IN ({marks})', ids)
+        conn.execute(f'''
+            INSERT INTO archive.leads ({columns}, archived_at)
+            SELECT {columns}, CURRENT_TIMESTAMP FROM main.leads WHERE id IN ({marks})
+        ''', ids)
+        conn.execute(f'DELETE FROM main.leads WHERE id IN ({marks})', ids)
+        # Archiving isn't deleting: drop the deletes the sync trigger just logged
+        conn.execute('DELETE FROM sync_log WHERE seq > ?', (last_seq,))
+        conn.execute(f'DELETE FROM {ARCHIVE_MOVES_GUARD}')
+    return len(ids)
+
+@profiled
+def archive_leads(before=None, statuses=(), batch_size=ARCHIVE_BATCH_SIZE, dry_run=False, progress=None):
+    """Move leads not updated since `before`, or in `statuses`, to the archive.
+
+    Each batch of batch_size leads is copied to archive.leads and deleted
+    from leads in one transaction, so other writers wait for at most one
+    batch. Archived leads still count towards stats but no longer towards
+    duplicate checks. progress(count) is called after each batch. Returns the
+    number of leads archived, or with dry_run the number that would be.
+    """
+    where, params = _archive_filter(before, statuses)
+    if dry_run:
+        with connection() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM leads WHERE {where}', params).fetchone()[0]
+    attach_archive(create=True)
+    columns = ', '.join(table_columns('leads'))
+    archived = 0
+    while True:
+        moved = _archive_batch(where, params, columns, batch_size)
+        if not moved:
+            return archived
+        archived += moved
+        if progress:
+            progress(archived)
+
+@profiled
+@retry_on_busy
+def restore_leads(ids):
+    """Move archived leads back into leads. Returns how many were restored.
+
+    A lead in leads with the same remote_id as a restored one is a second
+    copy of it (pulled from Supabase while it was archived): the restored
+    lead takes its clients, and its synced fields if they are newer, and
+    the copy is removed.
+    """
+    ids = list(ids)
+    if not ids or not attach_archive():
+        return 0
+    columns = ', '.join(table_columns('leads'))
+    synced = ', '.join(SYNC_COLUMNS)
+    restored = 0
+    with connection(immediate=True) as conn:
+        last_seq = conn.execute('SELECT IFNULL(MAX(seq), 0) FROM sync_log').fetchone()[0]
+        for start in range(0, len(ids), ARCHIVE_BATCH_SIZE):
+            batch = ids[start:start + ARCHIVE_BATCH_SIZE]
+            marks = ','.join('?' * len(batch))
+            copies = conn.execute(f'''
+                SELECT main.leads.id, archive.leads.id,
+                       datetime(main.leads.updated_at) > datetime(archive.leads.updated_at)
+                FROM archive.leads
+                JOIN main.leads ON main.leads.remote_id = archive.leads.remote_id
+                WHERE archive.leads.id IN ({marks}) AND main.leads.id != archive.leads.id
+            ''', batch).fetchall()
+            newer = []
+            for copy_id, lead_id, copy_is_newer in copies:
+                if copy_is_newer:
+                    values = conn.execute(
+                        f'SELECT {synced}, email_key, phone_key, updated_at FROM main.leads WHERE id = ?', (copy_id,)
+                    ).fetchone()
+                    newer.append((*values, lead_id))
+                conn.execute('UPDATE clients SET lead_id = ? WHERE lead_id = ?', (lead_id, copy_id))
+                # Outside the archive_moves guard: the copy was counted in stats
+                conn.execute('DELETE FROM main.leads WHERE id = ?', (copy_id,))
+            if copies:
+                after_commit(clear_client_cache)
+            conn.execute(f'INSERT INTO {ARCHIVE_MOVES_GUARD} VALUES (1)')
+            cursor = conn.execute(f'''
+                INSERT INTO main.leads ({columns})
+                SELECT {columns} FROM archive.leads
+                WHERE id IN ({marks}) AND id NOT IN (SELECT id FROM main.leads)
+            ''', batch)
+            restored += cursor.rowcount
+            conn.execute(f'DELETE FROM archive.leads WHERE id IN ({marks})', batch)
+            conn.execute(f'DELETE FROM {ARCHIVE_MOVES_GUARD}')
+            # Applied once the lead is back in leads, so stats follow the change
+            conn.executemany(f'''
+                UPDATE main.leads SET ({synced}, email_key, phone_key, updated_at) = ({', '.join('?' * (len(SYNC_COLUMNS) + 3))})
+                WHERE id = ?
+            ''', newer)
+        # The remote lead lives on in the restored row: drop the deletes the
+        # sync trigger logged for the removed copies
+        conn.execute('DELETE FROM sync_log WHERE seq > ? AND remote_id IS NOT NULL', (last_seq,))
+    return restored
+
+def archive_stats():
+    """Lead counts and file sizes of the hot database and the archive."""
+    archived = attach_archive()
+    with connection() as conn:
+        def size(schema):
+            page_size = conn.execute(f'PRAGMA {schema}.page_size').fetchone()[0]
+            pages = conn.execute(f'PRAGMA {schema}.page_count').fetchone()[0]
+            free = conn.execute(f'PRAGMA {schema}.freelist_count').fetchone()[0]
+            return pages * page_size, free * page_size
+
+        stats = {'leads': conn.execute('SELECT COUNT(*) FROM main.leads').fetchone()[0]}
+        stats['bytes'], stats['free_bytes'] = size('main')
+        stats['archived_leads'], stats['archive_bytes'], stats['oldest_archived'] = 0, 0, None
+        if archived:
+            stats['archived_leads'], stats['oldest_archived'] = conn.execute(
+                'SELECT COUNT(*), MIN(created_at) FROM archive.leads'
+            ).fetchone()
+            stats['archive_bytes'] = size('archive')[0]
+    return stats
+
+def vacuum():
+    """Rebuild the hot database file so pages freed by archiving go back to the OS."""
+    get_connection().execute('VACUUM main')
+
+# Client cache
+def _cache_lookup(client_id=None, slug=None):
+    """Return a cached client by id or slug, or None on a miss.
+
+    Always misses inside a connection() block: this thread's uncommitted
+    writes only invalidate the cache after commit, so a cached row could
+    be older than what the block itself just wrote.
+    """
+    if getattr(_local, "depth", 0):
+        return None
+    with _client_cache_lock:
+        if slug is not None:
+            client_id = _client_slugs.get(slug)
+        entry = _client_cache.get(client_id) if client_id is not None else None
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                _cache_discard(client_id)
+            _client_cache_stats["misses"] += 1
+            return None
+        _client_cache.move_to_end(client_id)
+        _client_cache_stats["hits"] += 1
+        return dict(entry[1])
+
+def _cache_store(conn, client, generation):
+    """Cache a client row read outside of any open write transaction.
+
+    generation is _client_cache_generation from before the row was read; if
+    anything was invalidated since, the row may predate that write, so it
+    isn't cached.
+    """
+    if client is None or conn.in_transaction or CLIENT_CACHE_SIZE <= 0:
+        return
+    with _client_cache_lock:
+        if generation != _client_cache_generation:
+            return
+        _cache_discard(client['id'])
+        _client_cache[client['id']] = (time.monotonic() + CLIENT_CACHE_TTL, dict(client))
+        _client_slugs[client['slug']] = client['id']
+        while len(_client_cache) > CLIENT_CACHE_SIZE:
+            _cache_discard(next(iter(_client_cache)))
+            _client_cache_stats["evictions"] += 1
+
+def _cache_discard(client_id):
+    entry = _client_cache.pop(client_id, None)
+    if entry is not None and _client_slugs.get(entry[1]['slug']) == client_id:
+        del _client_slugs[entry[1]['slug']]
+
+def invalidate_client(client_id=None, slug=None):
+    """Drop a client from the lookup cache by id and/or slug."""
+    global _client_cache_generation
+    with _client_cache_lock:
+        _client_cache_generation += 1
+        if slug is not None and slug in _client_slugs:
+            _cache_discard(_client_slugs.pop(slug))
+        if client_id is not None:
+            _cache_discard(client_id)
+
+def clear_client_cache():
+    """Empty the client lookup cache."""
+    global _client_cache_generation
+    with _client_cache_lock:
+        _client_cache_generation += 1
+        _client_cache.clear()
+        _client_slugs.clear()
+
+def client_cache_stats():
+    """Return hit/miss/eviction counters and the current cache size."""
+    with _client_cache_lock:
+        return dict(_client_cache_stats, size=len(_client_cache))
 
 # Client functions
+@profiled
+@retry_on_busy
 def add_client(slug, business_name, business_type=None, lead_id=None, phone=None, email=None, address=None, services=None):
     """Add a new client to the database."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO clients (slug, business_name, business_type, lead_id, phone, email, address, services)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (slug, business_name, business_type, lead_id, phone, email, address, services))
-    client_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.execute('''
+            INSERT INTO clients (slug, business_name, business_type, lead_id, phone, email, address, services)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (slug, business_name, business_type, lead_id, phone, email, address, services))
+        client_id = cursor.lastrowid
+        after_commit(lambda: invalidate_client(client_id, slug))
     return client_id
 
+@profiled
 def get_client(client_id):
-    """Get a client by ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM clients WHERE id = ?', (client_id,))
-    client = cursor.fetchone()
-    conn.close()
-    return dict(client) if client else None
+    """Get a client by ID (served from the lookup cache when possible)."""
+    client = _cache_lookup(client_id=client_id)
+    if client is not None:
+        return client
+    generation = _client_cache_generation
+    with connection() as conn:
+        row = conn.execute('SELECT * FROM clients WHERE id = ?', (client_id,)).fetchone()
+        client = dict(row) if row else None
+        _cache_store(conn, client, generation)
+    return client
 
+@profiled
 def get_client_by_slug(slug):
-    """Get a client by slug."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM clients WHERE slug = ?', (slug,))
-    client = cursor.fetchone()
-    conn.close()
-    return dict(client) if client else None
+    """Get a client by slug (served from the lookup cache when possible)."""
+    client = _cache_lookup(slug=slug)
+    if client is not None:
+        return client
+    generation = _client_cache_generation
+    with connection() as conn:
+        row = conn.execute('SELECT * FROM clients WHERE slug = ?', (slug,)).fetchone()
+        client = dict(row) if row else None
+        _cache_store(conn, client, generation)
+    return client
 
+@profiled
 def get_all_clients(status=None):
     """Get all clients, optionally filtered by status."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    if status:
-        cursor.execute('SELECT * FROM clients WHERE status = ? ORDER BY created_at DESC', (status,))
-    else:
-        cursor.execute('SELECT * FROM clients ORDER BY created_at DESC')
-    clients = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return clients
+    with connection() as conn:
+        if status:
+            cursor = conn.execute('SELECT * FROM clients WHERE status = ? ORDER BY created_at DESC, id DESC', (status,))
+        else:
+            cursor = conn.execute('SELECT * FROM clients ORDER BY created_at DESC, id DESC')
+        return [dict(row) for row in cursor.fetchall()]
+
+@profiled
+def get_clients_page(status=None, limit=50, after=None):
+    """Get one page of clients, newest first.
+
+    Pass the id of the last client from the previous page as `after` to get
+    the next page.
+    """
+    return _get_page('clients', status, limit, after)
+
+def iter_clients(status=None, page_size=500):
+    """Iterate over all clients, newest first, fetching one page at a time."""
+    return _iter_pages('clients', status, page_size)
+
+@profiled
+def query_clients(columns=None, status=None, limit=None, after=None):
+    """Lazily iterate clients newest first as compact Client rows.
 
+    Only `columns` are fetched (default: all). status, limit and after
+    work as in get_clients_page.
+    """
+    return _query_models('clients', columns, status, limit, after)
+
+def search_clients(text, limit=20, columns=None):
+    """Full-text search clients by name, type, services, address or notes.
+
+    Each word matches as a prefix; results are ordered best match first.
+    Returns dicts, or Client rows with just `columns` if given.
+    """
+    return _search('clients', text, limit, columns)
+
+@profiled
+@retry_on_busy
 def update_client(client_id, **kwargs):
     """Update client fields."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
     # Build UPDATE query dynamically
     fields = []
     values = []
@@ -188,19 +1701,293 @@ def update_client(client_id, **kwargs):
 
     if fields:
         fields.append("updated_at = ?")
-        values.append(datetime.now().isoformat())
+        values.append(utc_now())
         values.append(client_id)
 
         query = f"UPDATE clients SET {', '.join(fields)} WHERE id = ?"
-        cursor.execute(query, values)
-        conn.commit()
-
-    conn.close()
+        with connection() as conn:
+            conn.execute(query, values)
+            after_commit(lambda: invalidate_client(client_id))
 
+@profiled
 def update_client_status(client_id, status):
     """Update a client's status."""
     update_client(client_id, status=status)
 
-# Initialize database when module is imported
-if not DB_PATH.exists():
-    init_db()
+CLIENT_COLUMNS = ('lead_id', 'slug', 'business_name', 'business_type', 'phone', 'email',
+                  'address', 'services', 'status', 'tier', 'notes')
+
+@profiled
+@retry_on_busy
+def update_clients_bulk(changes):
+    """Apply many update_client changes in one transaction.
+
+    changes is an iterable of (client_id, {field: value}) pairs; as with
+    update_client, None values are skipped. Rows changing the same set of
+    fields share one executemany. Returns the number of clients changed.
+    """
+    now = utc_now()
+    groups = {}
+    for client_id, fields in changes:
+        fields = {key: value for key, value in fields.items() if value is not None}
+        if not fields:
+            continue
+        unknown = set(fields) - set(CLIENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown client fields: {', '.join(sorted(unknown))}")
+        columns = tuple(sorted(fields))
+        groups.setdefault(columns, []).append((*(fields[c] for c in columns), now, client_id))
+
+    changed = 0
+    with connection() as conn:
+        for columns, rows in groups.items():
+            assignments = ', '.join(f'{c} = ?' for c in columns)
+            cursor = conn.executemany(f'UPDATE clients SET {assignments}, updated_at = ? WHERE id = ?', rows)
+            changed += max(cursor.rowcount, 0)
+        after_commit(clear_client_cache)
+    return changed
+
+@profiled
+@retry_on_busy
+def update_clients_status_bulk(new_status, ids=None, **filters):
+    """Set the status of many clients in one transaction.
+
+    Pass a list of client ids, filters (status, tier, business_type,
+    created_after, created_before), or both to update only the listed
+    clients that match. Returns the number of clients changed.
+    """
+    where, params = _filter_clause(filters, ('status', 'tier', 'business_type'))
+    now = utc_now()
+    with connection() as conn:
+        if ids is not None:
+            extra = f' AND {where}' if where else ''
+            cursor = conn.executemany(
+                f'UPDATE clients SET status = ?, updated_at = ? WHERE id = ?{extra}',
+                [(new_status, now, client_id, *params) for client_id in ids],
+            )
+            changed = max(cursor.rowcount, 0)
+        elif where:
+            changed = conn.execute(
+                f'UPDATE clients SET status = ?, updated_at = ? WHERE {where}',
+                [new_status, now, *params],
+            ).rowcount
+        else:
+            raise ValueError("Pass ids or at least one filter")
+        after_commit(clear_client_cache)
+    return changed
+
+# Pipeline stats
+def get_pipeline_stats(weeks=12):
+    """Lead and client counts from the summary tables.
+
+    Reads only the summary buckets, so the cost doesn't grow with the
+    number of leads or clients. weekly lists the last `weeks` weeks with
+    new leads or clients (conversions), newest first. Archived leads are
+    included.
+    """
+    with connection() as conn:
+        lead_rows = conn.execute('SELECT status, source, count FROM lead_counts WHERE count != 0').fetchall()
+        client_rows = conn.execute('SELECT status, tier, count FROM client_counts WHERE count != 0').fetchall()
+        weekly = conn.execute('''
+            SELECT week, leads, clients FROM weekly_counts
+            WHERE leads != 0 OR clients != 0
+            ORDER BY week DESC LIMIT ?
+        ''', (weeks,)).fetchall()
+
+    def totals(rows, index, order=()):
+        counts = {}
+        for row in rows:
+            counts[row[index]] = counts.get(row[index], 0) + row[2]
+        rank = {key: i for i, key in enumerate(order)}
+        return dict(sorted(counts.items(), key=lambda item: (rank.get(item[0], len(rank)), -item[1])))
+
+    return {
+        'leads': {
+            'total': sum(row[2] for row in lead_rows),
+            'by_status': totals(lead_rows, 0, LEAD_FUNNEL),
+            'by_source': totals(lead_rows, 1),
+            'by_status_source': [tuple(row) for row in lead_rows],
+        },
+        'clients': {
+            'total': sum(row[2] for row in client_rows),
+            'by_status': totals(client_rows, 0),
+            'by_tier': totals(client_rows, 1),
+            'by_status_tier': [tuple(row) for row in client_rows],
+        },
+        'weekly': [dict(row) for row in weekly],
+    }
+
+def pipeline_to_prometheus(stats):
+    """Render get_pipeline_stats() output as Prometheus gauges."""
+    lines = []
+    for table, bucket, key in (('leads', 'source', 'by_status_source'), ('clients', 'tier', 'by_status_tier')):
+        name = f'website_builder_{table}'
+        lines.append(f'# HELP {name} Number of {table} per status and {bucket}.')
+        lines.append(f'# TYPE {name} gauge')
+        for status, value, count in stats[table][key]:
+            lines.append(f'{name}{{status="{_prometheus_label(status)}",{bucket}="{_prometheus_label(value)}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+@profiled
+@retry_on_busy
+def rebuild_stats():
+    """Recompute the summary tables from scratch and report any drift.
+
+    Returns {summary table: number of buckets that were wrong}; all zeros
+    means the triggers had kept them exact. Archived leads are counted.
+    """
+    archived = attach_archive()
+    with connection(immediate=True) as conn:
+        cursor = conn.cursor()
+        expected = _expected_summaries(cursor, archived)
+        current = _current_summaries(cursor)
+        drift = {
+            summary: sum(1 for key in rows.keys() | current[summary].keys()
+                         if rows.get(key) != current[summary].get(key))
+            for summary, rows in expected.items()
+        }
+        _write_summaries(cursor, expected)
+    return drift
+
+# Asset functions
+def hash_file(path):
+    """Return (sha256 hex digest, size) of a file, read HASH_CHUNK_SIZE at a time.
+
+    Files of HASH_MMAP_THRESHOLD bytes or more are memory-mapped instead of
+    read, so large images are hashed without copying them through Python.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= HASH_MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for start in range(0, size, HASH_CHUNK_SIZE):
+                        digest.update(view[start:start + HASH_CHUNK_SIZE])
+                finally:
+                    view.release()
+        else:
+            buffer = bytearray(HASH_CHUNK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+    return digest.hexdigest(), size
+
+def blob_path(content_hash):
+    """Where the blob with this hash is stored."""
+    return ASSET_STORE_PATH / content_hash[:2] / content_hash
+
+def _stage_blob(source_path, target):
+    """Copy source_path to a temporary file next to target; returns its path."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, staged = tempfile.mkstemp(dir=target.parent, prefix='.upload-')
+    os.close(fd)
+    shutil.copyfile(source_path, staged)
+    return staged
+
+@profiled
+@retry_on_busy
+def add_asset(client_id, source_path, asset_type, filename=None):
+    """Store a file for a client and record it in assets; returns the asset id.
+
+    The file is stored once under its content hash, however many clients
+    or assets share it - a file already in the store is not copied again.
+    """
+    source_path = Path(source_path)
+    content_hash, size = hash_file(source_path)
+    target = blob_path(content_hash)
+    # Copy outside the write lock; only the rename happens inside it
+    staged = None if target.exists() else _stage_blob(source_path, target)
+    try:
+        with connection(immediate=True) as conn:
+            cursor = conn.execute('''
+                INSERT INTO assets (client_id, asset_type, filename, filepath, content_hash, size)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (client_id, asset_type, filename or source_path.name,
+                  str(target.relative_to(ASSET_STORE_PATH)), content_hash, size))
+            # Checked again under the write lock, which collect_asset_garbage
+            # also holds while deleting blobs
+            if not target.exists():
+                os.replace(staged or _stage_blob(source_path, target), target)
+                staged = None
+            return cursor.lastrowid
+    finally:
+        if staged:
+            os.unlink(staged)
+
+def get_asset(asset_id):
+    """Get an asset by ID."""
+    with connection() as conn:
+        row = conn.execute('SELECT * FROM assets WHERE id = ?', (asset_id,)).fetchone()
+        return dict(row) if row else None
+
+def query_assets(client_id=None, columns=None):
+    """Lazily iterate assets (optionally for one client) as compact Asset rows."""
+    model = row_model('assets', tuple(columns) if columns else None)
+    query = f"SELECT {', '.join(model._fields)} FROM assets"
+    params = ()
+    if client_id is not None:
+        query += ' WHERE client_id = ?'
+        params = (client_id,)
+    return _iter_models(model, query + ' ORDER BY id', params)
+
+@profiled
+@retry_on_busy
+def remove_asset(asset_id):
+    """Delete an asset row; its blob is freed by the next garbage collection."""
+    with connection() as conn:
+        return conn.execute('DELETE FROM assets WHERE id = ?', (asset_id,)).rowcount > 0
+
+def asset_store_stats():
+    """Logical (per-asset) vs stored (deduplicated) bytes and blob counts."""
+    with connection() as conn:
+        assets, logical = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM assets WHERE content_hash IS NOT NULL'
+        ).fetchone()
+        blobs, stored, unreferenced = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(*) FILTER (WHERE refcount <= 0) FROM blobs'
+        ).fetchone()
+    return {'assets': assets, 'logical_bytes': logical, 'blobs': blobs,
+            'stored_bytes': stored, 'unreferenced_blobs': unreferenced}
+
+@profiled
+@retry_on_busy
+def collect_asset_garbage(dry_run=False):
+    """Delete blobs no asset references, plus stray files left in the store.
+
+    Returns (blobs removed, bytes freed). Stray files are leftovers of
+    interrupted uploads or blobs whose row was removed by hand.
+    """
+    removed, freed = 0, 0
+    with connection(immediate=True) as conn:
+        rows = conn.execute('SELECT hash, size FROM blobs WHERE refcount <= 0').fetchall()
+        known = {content_hash for content_hash, in conn.execute('SELECT hash FROM blobs')}
+        stale_uploads = time.time() - 3600
+        if not dry_run:
+            conn.executemany('DELETE FROM blobs WHERE hash = ?', ((content_hash,) for content_hash, _ in rows))
+        for content_hash, size in rows:
+            removed += 1
+            freed += size
+            if not dry_run:
+                blob_path(content_hash).unlink(missing_ok=True)
+        if ASSET_STORE_PATH.exists():
+            for path in ASSET_STORE_PATH.glob('*/*'):
+                if not path.is_file() or path.name in known:
+                    continue
+                # A recent .upload- file may belong to an upload in progress
+                if path.name.startswith('.upload-') and path.stat().st_mtime > stale_uploads:
+                    continue
+                removed += 1
+                freed += path.stat().st_size
+                if not dry_run:
+                    path.unlink()
+    return removed, freed
+
+# Tables are created and upgraded lazily by the first get_connection() call
+if os.environ.get("DB_PROFILE"):
+    enable_profiling()
+    atexit.register(save_profile)
@@ -0,0 +1,65 @@
+"""
+File locations and atomic writes shared by manage.py, render.py and
+client_index.py.
+
+The library modules import this rather than the manage.py CLI script, so
+running `python manage.py ...` never loads a second copy of manage.
+Callers read the paths as files.CLIENTS_JSON_PATH at call time, so
+pointing one of them elsewhere (as bench.py and the tests do) redirects
+every module at once.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+# Path to the Next.js client configs
+CLIENTS_JSON_PATH = Path(__file__).parent.parent / "src" / "data" / "clients"
+
+# Tracks which client configs generate-all has written, and from what data
+MANIFEST_PATH = Path(__file__).parent / ".generate-manifest.json"
+
+
+_new_file_mode = None
+
+
+def new_file_mode():
+    """The mode open() gives a new file: 0o666 less the process umask."""
+    global _new_file_mode
+    if _new_file_mode is None:
+        # umask can only be read by setting it; do it once, not per write
+        umask = os.umask(0o022)
+        os.umask(umask)
+        _new_file_mode = 0o666 & ~umask
+    return _new_file_mode
+
+
+def write_file_atomic(filepath, data):
+    """Write bytes to a file only if its contents would change.
+
+    The new contents go to a temp file in the same directory, which is
+    synced and then renamed over the target, so readers never see a
+    partially written file and a crash can't leave an empty one. The file
+    gets the usual umask-based mode, not mkstemp's owner-only 0600.
+    Returns True if the file was written.
+    """
+    filepath = Path(filepath)
+    try:
+        with open(filepath, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), new_file_mode())
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
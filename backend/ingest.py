@@ -0,0 +1,160 @@
+"""
+Group-commit writer for high-rate lead ingestion.
+
+Instead of one transaction (and fsync) per db.add_lead call, callers hand
+their writes to a GroupCommitWriter. A single background thread collects
+them and commits up to `max_batch` writes at a time, waiting at most
+`max_delay` seconds for a batch to fill. Each caller gets a Future that
+resolves to its result once the batch containing it has committed.
+
+    with GroupCommitWriter() as writer:
+        future = writer.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+        lead_id = future.result()
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import db
+
+MAX_BATCH = 500                 # writes per transaction
+MAX_DELAY = 0.01                # seconds to wait for a batch to fill
+MAX_QUEUED = 10000              # callers block once this many writes are waiting
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Coalesce lead inserts and status updates into shared transactions.
+
+    Each write runs inside its own savepoint, so one bad row fails only its
+    own Future. close() (also run at interpreter exit) flushes everything
+    still queued and checkpoints the WAL so the data is on disk.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_delay=MAX_DELAY, max_queued=MAX_QUEUED):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._closed = False
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, func, *args, **kwargs):
+        """Queue any db write function; returns a Future for its result."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitWriter is closed")
+            future = Future()
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def add_lead(self, first_name, last_name, email, phone, current_website=None,
+                 source="landing_page", on_duplicate="allow"):
+        """Queue db.add_lead; the Future resolves to the new lead id."""
+        return self.submit(db.add_lead, first_name, last_name, email, phone,
+                           current_website, source, on_duplicate)
+
+    def update_lead_status(self, lead_id, status, notes=None):
+        """Queue db.update_lead_status; the Future resolves to None."""
+        return self.submit(db.update_lead_status, lead_id, status, notes)
+
+    def close(self):
+        """Flush queued writes, make them durable and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+        # Anything still queued was submitted before close() took the lock
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.max_batch):
+            self._commit(leftover[start:start + self.max_batch])
+
+        try:
+            db.get_connection().execute("PRAGMA wal_checkpoint(FULL)")
+        finally:
+            db.close_connection()
+
+    def _commit(self, batch):
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self._apply(batch)
+        except Exception as e:
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for (future, *_), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    @db.retry_on_busy
+    def _apply(self, batch):
+        results = []
+        with db.connection(immediate=True) as conn:
+            for _, func, args, kwargs in batch:
+                conn.execute("SAVEPOINT group_commit_item")
+                try:
+                    value = func(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if db.is_busy_error(e):
+                        raise
+                    conn.execute("ROLLBACK TO group_commit_item")
+                    results.append((False, e))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO group_commit_item")
+                    results.append((False, e))
+                else:
+                    results.append((True, value))
+                conn.execute("RELEASE group_commit_item")
+        return results
@@ -8,31 +8,111 @@ Usage:
 Commands:
     init                    Initialize the database
     lead add               Add a new lead
+    lead import <file>     Bulk import leads from CSV or JSONL
     lead list              List all leads
+    lead search <query>    Full-text search leads
+    lead dedupe            Merge leads sharing an email or phone
+    lead export            Stream leads to JSONL/CSV (optionally compressed)
     lead show <id>         Show a specific lead
     lead status <id> <status>  Update lead status
+    lead status <status> --ids 1,2,3 | --where status=new
+                           Update many leads at once
     client add             Add a new client (interactive)
     client list            List all clients
+    client search <query>  Full-text search clients
     client show <id>       Show a specific client
+    client status <id> <status>  Update client status (or --ids/--where)
     client generate <id>   Generate JSON config for a client
     client generate-all    Generate JSON configs for all clients
+                           (both also update the packed index in src/data/client-index)
+    client render          Render static HTML previews (changed clients only)
+    client export          Stream clients to JSONL/CSV (optionally compressed)
+    asset add <client> <files>  Store client files (deduplicated by content)
+    asset list [--client]  List assets and store usage
+    asset remove <id>      Remove an asset
+    asset gc               Delete stored files no asset uses
+    archive run            Move old/closed leads to the archive database
+    archive restore <ids>  Move archived leads back
+    archive status         Show hot and archived lead counts
+    catalog check          Check a proposed design against the website catalog
+    catalog recommend      Suggest least-used design characteristics
+    backup create          Online backup (--gzip, --verify, --keep N rotation)
+    backup verify <file>   Run integrity_check on a backup
+    backup list            List backups
+    bench                  Benchmark the db layer on synthetic data
+    sync                   Push/pull lead changes to Supabase (incremental)
+    stats                  Show lead funnel, client and weekly conversion counts
+    stats --rebuild        Recompute the summary counts and check them for drift
+    stats --profile        Show db timings recorded with DB_PROFILE=1
+    shell                  Interactive prompt in one warm process
+    serve [--stdio]        Answer commands over a Unix socket or stdin
+
+serve reads one command per line, either as plain text ("lead list --limit 5")
+or as JSON (["lead", "list"] or {"argv": [...]}), and answers each with one
+JSON line: {"ok": true, "exit": 0, "output": "..."}.
+
+sync reads SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY from the environment.
+
+Set DB_PROFILE=1 to record per-function and per-statement db timings for a
+command; they are added to backend/.db-profile.json when it exits.
 """
 
 import argparse
+import contextlib
+import csv
+import hashlib
+import io
+import itertools
 import json
 import os
 import re
+import shlex
 import sys
+import time
+from functools import partial
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
 import db
+import files
+from files import write_file_atomic
 
-# Path to the Next.js client configs
-CLIENTS_JSON_PATH = Path(__file__).parent.parent / "src" / "data" / "clients"
+# Default socket for `manage.py serve`
+SOCKET_PATH = Path(__file__).parent / ".manage.sock"
+
+# Commands that prompt for input and so can't run under `serve`
+INTERACTIVE_COMMANDS = {("lead", "add"), ("client", "add")}
+
+# Below this many changed clients, generate-all skips the process pool
+PARALLEL_THRESHOLD = 50
+
+# Rows per transaction when bulk importing leads
+IMPORT_BATCH_SIZE = 5000
+
+# Columns the list/search tables display; only these are fetched
+LEAD_LIST_COLUMNS = ('id', 'first_name', 'last_name', 'email', 'status', 'created_at')
+CLIENT_LIST_COLUMNS = ('id', 'business_name', 'business_type', 'status', 'slug')
+ASSET_LIST_COLUMNS = ('id', 'client_id', 'asset_type', 'filename', 'size', 'content_hash')
+
+# Default colors based on business type
+COLOR_SCHEMES = {
+    "plumber": {"primary": "#2563eb", "secondary": "#1e40af", "accent": "#fbbf24"},
+    "electrician": {"primary": "#f59e0b", "secondary": "#d97706", "accent": "#1f2937"},
+    "hvac": {"primary": "#0891b2", "secondary": "#0e7490", "accent": "#f97316"},
+    "landscaping": {"primary": "#16a34a", "secondary": "#15803d", "accent": "#84cc16"},
+    "cleaning": {"primary": "#06b6d4", "secondary": "#0891b2", "accent": "#f0abfc"},
+    "restaurant": {"primary": "#dc2626", "secondary": "#b91c1c", "accent": "#fbbf24"},
+    "salon": {"primary": "#ec4899", "secondary": "#db2777", "accent": "#fbbf24"},
+    "auto": {"primary": "#1f2937", "secondary": "#111827", "accent": "#ef4444"},
+    "legal": {"primary": "#1e3a5f", "secondary": "#0f172a", "accent": "#c9a227"},
+    "medical": {"primary": "#0ea5e9", "secondary": "#0284c7", "accent": "#22c55e"},
+    "default": {"primary": "#2563eb", "secondary": "#1e40af", "accent": "#fbbf24"},
+}
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
 
 
 def slugify(text):
@@ -44,25 +124,81 @@ def slugify(text):
     return text
 
 
+def batched(iterable, size):
+    """Yield lists of up to `size` items from an iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_lead_rows(stream, fmt):
+    """Yield (line_number, row_dict) pairs from a CSV or JSONL stream.
+
+    A JSONL line that isn't valid JSON is yielded with a ValueError in place
+    of its row, so the caller can skip it and carry on.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                row = ValueError(f"invalid JSON ({e.msg})")
+            yield line_number, row
+
+
+def normalize_lead(row, default_source="import"):
+    """Validate and normalize an imported lead row into an insert tuple.
+
+    Accepts either first_name/last_name or a single name column.
+    Raises ValueError if a required field is missing or invalid.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("row is not an object")
+
+    def field(name):
+        value = row.get(name)
+        return str(value).strip() if value is not None else ""
+
+    first_name = field("first_name")
+    last_name = field("last_name")
+    if not first_name and field("name"):
+        first_name, _, last_name = field("name").partition(" ")
+        last_name = last_name.strip()
+
+    email = field("email").lower()
+    phone = re.sub(r'[^\d+]', '', field("phone"))
+
+    if not first_name:
+        raise ValueError("missing first_name")
+    if not EMAIL_RE.match(email):
+        raise ValueError(f"invalid email {email!r}")
+    if not phone:
+        raise ValueError("missing phone")
+
+    return (
+        first_name,
+        last_name,
+        email,
+        phone,
+        field("current_website") or None,
+        field("source") or default_source,
+    )
+
+
 def generate_client_json(client):
     """Generate a JSON config file for the Next.js preview system."""
-    # Default colors based on business type
-    color_schemes = {
-        "plumber": {"primary": "#2563eb", "secondary": "#1e40af", "accent": "#fbbf24"},
-        "electrician": {"primary": "#f59e0b", "secondary": "#d97706", "accent": "#1f2937"},
-        "hvac": {"primary": "#0891b2", "secondary": "#0e7490", "accent": "#f97316"},
-        "landscaping": {"primary": "#16a34a", "secondary": "#15803d", "accent": "#84cc16"},
-        "cleaning": {"primary": "#06b6d4", "secondary": "#0891b2", "accent": "#f0abfc"},
-        "restaurant": {"primary": "#dc2626", "secondary": "#b91c1c", "accent": "#fbbf24"},
-        "salon": {"primary": "#ec4899", "secondary": "#db2777", "accent": "#fbbf24"},
-        "auto": {"primary": "#1f2937", "secondary": "#111827", "accent": "#ef4444"},
-        "legal": {"primary": "#1e3a5f", "secondary": "#0f172a", "accent": "#c9a227"},
-        "medical": {"primary": "#0ea5e9", "secondary": "#0284c7", "accent": "#22c55e"},
-        "default": {"primary": "#2563eb", "secondary": "#1e40af", "accent": "#fbbf24"},
-    }
-
     business_type = (client.get('business_type') or 'default').lower()
-    colors = color_schemes.get(business_type, color_schemes['default'])
+    colors = COLOR_SCHEMES.get(business_type, COLOR_SCHEMES['default'])
 
     # Parse services if stored as comma-separated string
     services_raw = client.get('services') or ''
@@ -125,27 +261,102 @@ def generate_client_json(client):
             }
         },
         "createdAt": client.get('created_at', datetime.now().isoformat()),
-        "updatedAt": datetime.now().isoformat()
+        "updatedAt": client.get('updated_at') or datetime.now().isoformat()
     }
 
     return config
 
 
-def save_client_json(client):
-    """Save a client's JSON config to the Next.js data directory."""
+def dump_json(data, compact=False):
+    """Serialize data to JSON bytes, indented unless compact."""
+    if compact:
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+def save_client_json(client, compact=False, output_dir=None):
+    """Save a client's JSON config to output_dir (default the Next.js data directory).
+
+    The file is replaced atomically and left untouched if nothing changed.
+    Pass compact=True to write it without indentation.
+    """
     config = generate_client_json(client)
 
     # Ensure directory exists
-    CLIENTS_JSON_PATH.mkdir(parents=True, exist_ok=True)
+    output_dir = Path(output_dir or files.CLIENTS_JSON_PATH)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
     # Save JSON file
-    filepath = CLIENTS_JSON_PATH / f"{client['slug']}.json"
-    with open(filepath, 'w') as f:
-        json.dump(config, f, indent=2)
+    filepath = output_dir / f"{client['slug']}.json"
+    write_file_atomic(filepath, dump_json(config, compact))
 
     return filepath
 
 
+def client_fingerprint(client):
+    """Hash a client row so generate-all can tell when its config is stale."""
+    payload = json.dumps(client, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def load_manifest():
+    """Load the generate-all manifest ({slug: {id, updated_at, hash}})."""
+    try:
+        with open(files.MANIFEST_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest):
+    """Atomically write the generate-all manifest."""
+    write_file_atomic(files.MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def manifest_entry(client, compact=False):
+    # The format is part of the entry, so switching --compact on or off rewrites the configs
+    return {
+        "id": client['id'],
+        "updated_at": client.get('updated_at'),
+        "hash": client_fingerprint(client),
+        "format": "compact" if compact else "indented",
+    }
+
+
+def print_leads(leads):
+    """Print Lead rows (with at least LEAD_LIST_COLUMNS) as a table.
+
+    Returns the number of rows printed and the last row, so callers can
+    stream an iterator straight through without building a list.
+    """
+    count, lead = 0, None
+    for lead in leads:
+        if not count:
+            print(f"\n{'ID':<5} {'Name':<25} {'Email':<30} {'Status':<12} {'Created':<20}")
+            print("-" * 95)
+        count += 1
+        name = f"{lead.first_name} {lead.last_name}"
+        created = lead.created_at[:16] if lead.created_at else ''
+        print(f"{lead.id:<5} {name:<25} {lead.email:<30} {lead.status:<12} {created:<20}")
+    return count, lead
+
+
+def print_clients(clients):
+    """Print Client rows (with at least CLIENT_LIST_COLUMNS) as a table.
+
+    Returns the number of rows printed and the last row.
+    """
+    count, client = 0, None
+    for client in clients:
+        if not count:
+            print(f"\n{'ID':<5} {'Business Name':<30} {'Type':<15} {'Status':<12} {'Slug':<25}")
+            print("-" * 90)
+        count += 1
+        btype = client.business_type or 'N/A'
+        print(f"{client.id:<5} {client.business_name:<30} {btype:<15} {client.status:<12} {client.slug:<25}")
+    return count, client
+
+
 # CLI Commands
 def cmd_init(args):
     """Initialize the database."""
@@ -164,30 +375,189 @@ def cmd_lead_add(args):
     current_website = input("Current Website (optional): ").strip() or None
     source = input("Source [landing_page]: ").strip() or "landing_page"
 
-    lead_id = db.add_lead(first_name, last_name, email, phone, current_website, source)
+    try:
+        lead_id = db.add_lead(first_name, last_name, email, phone, current_website, source, on_duplicate="reject")
+    except db.DuplicateLeadError as e:
+        print(f"\n✗ A lead with this email or phone already exists. ID: {e.lead_id}")
+        return
     print(f"\n✓ Lead added successfully! ID: {lead_id}")
 
 
+def cmd_lead_import(args):
+    """Bulk import leads from a CSV or JSONL file (or stdin)."""
+    fmt = args.format
+    if not fmt:
+        fmt = "jsonl" if args.file.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+    if args.file == "-":
+        stream = sys.stdin
+    else:
+        stream = open(args.file, newline='', encoding='utf-8')
+
+    imported = 0
+    skipped = 0
+    start = time.perf_counter()
+
+    def valid_rows():
+        nonlocal skipped
+        for line_number, row in read_lead_rows(stream, fmt):
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                yield normalize_lead(row, args.source)
+            except ValueError as e:
+                skipped += 1
+                if skipped <= 10:
+                    print(f"  Skipping line {line_number}: {e}", file=sys.stderr)
+
+    try:
+        for batch in batched(valid_rows(), args.batch_size):
+            imported += db.add_leads(batch)
+            elapsed = time.perf_counter() - start
+            print(f"  {imported:,} leads imported ({imported / elapsed:,.0f} rows/s)", file=sys.stderr)
+    except (ValueError, csv.Error) as e:
+        # The file itself can't be read on (bad encoding, malformed CSV)
+        elapsed = time.perf_counter() - start
+        print(f"\n✗ Import stopped: {e}")
+        print(f"  {imported:,} leads imported in {elapsed:.2f}s before it stopped ({skipped:,} skipped).")
+        sys.exit(1)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✓ Imported {imported:,} leads in {elapsed:.2f}s ({skipped:,} skipped).")
+
+
+def open_export_stream(output, compress):
+    """Open a text stream for an export, compressing if asked."""
+    raw = sys.stdout.buffer if output == "-" else open(output, "wb")
+    if compress == "gzip":
+        import gzip
+        binary = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    elif compress == "xz":
+        import lzma
+        binary = lzma.LZMAFile(raw, mode="wb")
+    else:
+        binary = raw
+    return raw, io.TextIOWrapper(binary, encoding="utf-8", newline="")
+
+
+def export_table(table, args):
+    """Stream a table to JSONL or CSV with constant memory."""
+    output = args.output
+    name = output.lower()
+    compress = args.compress
+    if compress is None:
+        compress = "gzip" if name.endswith(".gz") else "xz" if name.endswith(".xz") else "none"
+    fmt = args.format or ("csv" if ".csv" in name else "jsonl")
+    columns = [c.strip() for c in args.columns.split(",")] if args.columns else None
+
+    try:
+        names, rows = db.stream_rows(table, columns, args.since)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return
+
+    start = time.perf_counter()
+    count = 0
+    last_updated = None
+    updated_index = names.index("updated_at") if "updated_at" in names else None
+    raw, stream = open_export_stream(output, compress)
+    try:
+        if fmt == "csv":
+            writer = csv.writer(stream)
+            writer.writerow(names)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+                if updated_index is not None:
+                    last_updated = row[updated_index]
+        else:
+            for row in rows:
+                stream.write(json.dumps(dict(zip(names, row)), ensure_ascii=False))
+                stream.write("\n")
+                count += 1
+                if updated_index is not None:
+                    last_updated = row[updated_index]
+    finally:
+        stream.flush()
+        if raw is sys.stdout.buffer:
+            stream.detach()
+            raw.flush()
+        else:
+            stream.close()
+            raw.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Exported {count:,} {table} in {elapsed:.2f}s", file=sys.stderr)
+    if args.since is not None and last_updated:
+        # Inclusive, so rows from that second come again; import by id to dedupe
+        print(f"  Next incremental export: --since '{last_updated}'", file=sys.stderr)
+
+
+def cmd_lead_export(args):
+    """Export leads to JSONL or CSV."""
+    export_table("leads", args)
+
+
+def cmd_client_export(args):
+    """Export clients to JSONL or CSV."""
+    export_table("clients", args)
+
+
 def cmd_lead_list(args):
     """List all leads."""
-    leads = db.get_all_leads(args.status if hasattr(args, 'status') else None)
+    status = args.status if hasattr(args, 'status') else None
+    limit = args.limit or (50 if args.after else None)
+    leads = db.query_leads(LEAD_LIST_COLUMNS, status, limit, args.after, include_archived=args.archived)
 
-    if not leads:
+    count, last = print_leads(leads)
+    if not count:
         print("No leads found.")
         return
 
-    print(f"\n{'ID':<5} {'Name':<25} {'Email':<30} {'Status':<12} {'Created':<20}")
-    print("-" * 95)
+    if args.limit and count == args.limit:
+        print(f"\nNext page: --after {last.id}")
 
-    for lead in leads:
-        name = f"{lead['first_name']} {lead['last_name']}"
-        created = lead['created_at'][:16] if lead['created_at'] else ''
-        print(f"{lead['id']:<5} {name:<25} {lead['email']:<30} {lead['status']:<12} {created:<20}")
+
+def cmd_lead_search(args):
+    """Full-text search leads."""
+    leads = db.search_leads(args.query, args.limit, LEAD_LIST_COLUMNS, include_archived=args.archived)
+
+    if not leads:
+        print("No matching leads.")
+        return
+
+    print_leads(leads)
+
+
+def cmd_lead_dedupe(args):
+    """Find and merge duplicate leads."""
+    start = time.perf_counter()
+    groups = db.find_duplicate_groups()
+
+    if not groups:
+        print("No duplicate leads found.")
+        return
+
+    duplicates = sum(len(group) - 1 for group in groups)
+    print(f"Found {len(groups):,} groups ({duplicates:,} duplicate leads) in {time.perf_counter() - start:.2f}s.")
+
+    if args.dry_run:
+        for group in groups[:20]:
+            print(f"  Keep #{group[0]}, merge {', '.join(f'#{i}' for i in group[1:])}")
+        if len(groups) > 20:
+            print(f"  ... and {len(groups) - 20:,} more groups")
+        return
+
+    removed = db.merge_duplicate_leads(groups)
+    print(f"✓ Merged {removed:,} duplicate leads in {time.perf_counter() - start:.2f}s.")
 
 
 def cmd_lead_show(args):
     """Show a specific lead."""
-    lead = db.get_lead(args.id)
+    lead = db.get_lead(args.id, include_archived=True)
 
     if not lead:
         print(f"Lead {args.id} not found.")
@@ -203,12 +573,59 @@ def cmd_lead_show(args):
     print(f"Notes: {lead['notes'] or 'N/A'}")
     print(f"Created: {lead['created_at']}")
     print(f"Updated: {lead['updated_at']}")
+    if lead.get('archived_at'):
+        print(f"Archived: {lead['archived_at']} (restore with: archive restore {lead['id']})")
+
+
+def parse_status_target(args, parser):
+    """Read a status command's positionals and --ids/--where options.
+
+    Single updates take `<id> <status>`; bulk updates take just `<status>`
+    plus --ids and/or --where. Returns (id, status, ids, filters), with id
+    None for bulk updates.
+    """
+    bulk = args.ids is not None or bool(args.where)
+    if bulk != (args.status is None):
+        parser.error("expected <id> <status>, or <status> with --ids/--where")
+
+    filters = {}
+    for condition in args.where or []:
+        key, sep, value = condition.partition("=")
+        if not sep:
+            parser.error(f"--where expects KEY=VALUE, got {condition!r}")
+        filters[key.strip().replace("-", "_")] = value.strip()
+
+    if not bulk:
+        try:
+            return int(args.target), args.status, None, filters
+        except ValueError:
+            parser.error(f"invalid id: {args.target!r}")
+
+    ids = None
+    if args.ids is not None:
+        try:
+            ids = [int(i) for i in args.ids.split(",") if i.strip()]
+        except ValueError:
+            parser.error("--ids expects comma-separated numbers")
+    return None, args.target, ids, filters
+
+
+def cmd_lead_status(args, parser):
+    """Update the status of one lead, or many with --ids/--where."""
+    lead_id, status, ids, filters = parse_status_target(args, parser)
+    notes = args.notes if hasattr(args, 'notes') else None
+
+    if lead_id is not None:
+        db.update_lead_status(lead_id, status, notes)
+        print(f"✓ Lead {lead_id} status updated to: {status}")
+        return
 
-
-def cmd_lead_status(args):
-    """Update a lead's status."""
-    db.update_lead_status(args.id, args.status, args.notes if hasattr(args, 'notes') else None)
-    print(f"✓ Lead {args.id} status updated to: {args.status}")
+    try:
+        changed = db.update_leads_status_bulk(status, ids=ids, notes=notes, **filters)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return
+    print(f"✓ {changed:,} leads updated to: {status}")
 
 
 def cmd_client_add(args):
@@ -221,7 +638,7 @@ def cmd_client_add(args):
 
     lead = None
     if lead_id:
-        lead = db.get_lead(lead_id)
+        lead = db.get_lead(lead_id, include_archived=True)
         if lead:
             print(f"  Found lead: {lead['first_name']} {lead['last_name']} ({lead['email']})")
 
@@ -261,18 +678,28 @@ def cmd_client_add(args):
 
 def cmd_client_list(args):
     """List all clients."""
-    clients = db.get_all_clients(args.status if hasattr(args, 'status') else None)
+    status = args.status if hasattr(args, 'status') else None
+    limit = args.limit or (50 if args.after else None)
+    clients = db.query_clients(CLIENT_LIST_COLUMNS, status, limit, args.after)
 
-    if not clients:
+    count, last = print_clients(clients)
+    if not count:
         print("No clients found.")
         return
 
-    print(f"\n{'ID':<5} {'Business Name':<30} {'Type':<15} {'Status':<12} {'Slug':<25}")
-    print("-" * 90)
+    if args.limit and count == args.limit:
+        print(f"\nNext page: --after {last.id}")
 
-    for client in clients:
-        btype = client['business_type'] or 'N/A'
-        print(f"{client['id']:<5} {client['business_name']:<30} {btype:<15} {client['status']:<12} {client['slug']:<25}")
+
+def cmd_client_search(args):
+    """Full-text search clients."""
+    clients = db.search_clients(args.query, args.limit, CLIENT_LIST_COLUMNS)
+
+    if not clients:
+        print("No matching clients.")
+        return
+
+    print_clients(clients)
 
 
 def cmd_client_show(args):
@@ -300,6 +727,35 @@ def cmd_client_show(args):
     print(f"\nPreview URL: http://localhost:5000/preview/{client['slug']}")
 
 
+def cmd_client_status(args, parser):
+    """Update the status of one client, or many with --ids/--where."""
+    client_id, status, ids, filters = parse_status_target(args, parser)
+
+    if client_id is not None:
+        db.update_client_status(client_id, status)
+        print(f"✓ Client {client_id} status updated to: {status}")
+        return
+
+    try:
+        changed = db.update_clients_status_bulk(status, ids=ids, **filters)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return
+    print(f"✓ {changed:,} clients updated to: {status}")
+
+
+def update_client_index(force=False):
+    """Refresh the packed client index the Next.js app reads configs through."""
+    import client_index
+
+    stats = client_index.update(force=force)
+    for slug, error in stats["errors"]:
+        print(f"✗ {slug}: {error}")
+    if stats["updated"] or stats["removed"]:
+        how = "rewritten" if stats["compacted"] else "appended"
+        print(f"✓ Client index: {stats['updated']} updated, {stats['removed']} removed ({how})")
+
+
 def cmd_client_generate(args):
     """Generate JSON config for a client."""
     client = db.get_client(args.id)
@@ -308,27 +764,677 @@ def cmd_client_generate(args):
         print(f"Client {args.id} not found.")
         return
 
-    filepath = save_client_json(client)
+    filepath = save_client_json(client, args.compact)
+    manifest = load_manifest()
+    manifest[client['slug']] = manifest_entry(client, args.compact)
+    save_manifest(manifest)
     print(f"✓ JSON config saved to: {filepath}")
+    update_client_index()
     print(f"  Preview URL: http://localhost:5000/preview/{client['slug']}")
 
 
 def cmd_client_generate_all(args):
-    """Generate JSON configs for all clients."""
+    """Generate JSON configs for new and changed clients.
+
+    A manifest records each generated client's updated_at, content hash and
+    output format, so unchanged clients are skipped. Configs for clients that no longer
+    exist are removed. Pass --force to regenerate everything.
+    """
     clients = db.get_all_clients()
+    manifest = {} if args.force else load_manifest()
 
-    if not clients:
+    current = {}
+    stale = []
+    for client in clients:
+        entry = manifest_entry(client, args.compact)
+        current[client['slug']] = entry
+        previous = manifest.get(client['slug'])
+        if (previous != entry
+                or not (files.CLIENTS_JSON_PATH / f"{client['slug']}.json").exists()):
+            stale.append(client)
+
+    # Only remove files this command created - hand-written configs are never in the manifest
+    removed = 0
+    for slug in manifest.keys() - current.keys():
+        filepath = files.CLIENTS_JSON_PATH / f"{slug}.json"
+        if filepath.exists():
+            filepath.unlink()
+            removed += 1
+            print(f"✗ Removed {filepath}")
+
+    # The directory is passed explicitly: pool workers started with spawn or
+    # forkserver re-import files.py and wouldn't see a redirected path
+    save = partial(save_client_json, compact=args.compact, output_dir=files.CLIENTS_JSON_PATH)
+    if len(stale) >= PARALLEL_THRESHOLD and args.workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            chunksize = max(1, len(stale) // ((args.workers or os.cpu_count() or 1) * 4))
+            paths = list(pool.map(save, stale, chunksize=chunksize))
+    else:
+        paths = [save(client) for client in stale]
+
+    for client, filepath in zip(stale, paths):
+        print(f"✓ {client['business_name']} -> {filepath}")
+
+    if stale or removed or manifest != current:
+        save_manifest(current)
+    update_client_index(force=args.force)
+
+    if not clients and not removed:
         print("No clients found.")
         return
 
-    for client in clients:
-        filepath = save_client_json(client)
-        print(f"✓ {client['business_name']} -> {filepath}")
+    unchanged = len(clients) - len(stale)
+    print(f"\n✓ Generated {len(stale)} client configs ({unchanged} unchanged, {removed} removed).")
+
+
+def cmd_client_render(args):
+    """Render static HTML previews from the client JSON configs.
+
+    A manifest records the hash of each config and of the template it was
+    rendered with, so only previews whose inputs changed are rendered
+    again. Pass --force to render everything.
+    """
+    import render
+
+    if args.template:
+        try:
+            render.template_path(args.template)
+        except ValueError as e:
+            print(f"✗ {e}")
+            return
+
+    manifest = {} if args.force else render.load_render_manifest()
+    template_hashes = {}
+    current = {}
+    stale = []
+    for config_path in sorted(files.CLIENTS_JSON_PATH.glob("*.json")):
+        slug = config_path.stem
+        data = config_path.read_bytes()
+        try:
+            name = args.template or json.loads(data).get("template", "service-business")
+            template_file = render.template_path(name)
+        except (ValueError, json.JSONDecodeError) as e:
+            print(f"✗ {slug}: {e}")
+            # Leave the last good preview in place
+            if slug in manifest:
+                current[slug] = manifest[slug]
+            continue
+        if template_file not in template_hashes:
+            template_hashes[template_file] = render.template_fingerprint(template_file)
+        entry = {
+            "config": hashlib.sha1(data).hexdigest(),
+            "template": template_file.name,
+            "template_hash": template_hashes[template_file],
+        }
+        current[slug] = entry
+        output = render.PREVIEWS_PATH / f"{slug}.html"
+        if manifest.get(slug) != entry or not output.exists():
+            stale.append((str(config_path), str(template_file), str(output)))
+
+    removed = 0
+    for slug in manifest.keys() - current.keys():
+        filepath = render.PREVIEWS_PATH / f"{slug}.html"
+        if filepath.exists():
+            filepath.unlink()
+            removed += 1
+            print(f"✗ Removed {filepath}")
+
+    render.PREVIEWS_PATH.mkdir(parents=True, exist_ok=True)
+    if len(stale) >= PARALLEL_THRESHOLD and args.workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            chunksize = max(1, len(stale) // ((args.workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(render.render_client, stale, chunksize=chunksize))
+    else:
+        results = [render.render_client(task) for task in stale]
+
+    for filepath, _ in results:
+        print(f"✓ {filepath}")
+
+    if stale or removed or manifest != current:
+        render.save_render_manifest(current)
+
+    if not current and not removed:
+        print("No client configs found. Run 'client generate-all' first.")
+        return
+
+    unchanged = len(current) - len(stale)
+    print(f"\n✓ Rendered {len(stale)} previews ({unchanged} unchanged, {removed} removed).")
+
+
+def format_size(size):
+    """Human-readable byte count."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def tty_progress(describe):
+    """A progress callback redrawing describe(*args) on one stderr line.
+
+    None when stderr isn't a terminal, so piped output stays clean.
+    """
+    if not sys.stderr.isatty():
+        return None
+
+    def progress(*args):
+        print(f"\r  {describe(*args)}", end="", file=sys.stderr, flush=True)
+    return progress
+
+
+def cmd_asset_add(args):
+    """Store files for a client in the content-addressed asset store."""
+    client = db.get_client(args.client_id)
+    if not client:
+        print(f"✗ Client {args.client_id} not found.")
+        return
+
+    for path in args.files:
+        if not os.path.isfile(path):
+            print(f"✗ Not a file: {path}")
+            continue
+        asset_id = db.add_asset(client["id"], path, args.type)
+        asset = db.get_asset(asset_id)
+        print(f"✓ Asset {asset_id}: {asset['filename']} ({format_size(asset['size'])}, {asset['content_hash'][:12]})")
+
+
+def cmd_asset_list(args):
+    """List assets, optionally for one client, with store usage."""
+    count = 0
+    for asset in db.query_assets(args.client, ASSET_LIST_COLUMNS):
+        if not count:
+            print(f"\n{'ID':<6} {'Client':<7} {'Type':<10} {'Filename':<30} {'Size':>10}  {'Hash':<12}")
+            print("-" * 82)
+        count += 1
+        content_hash = (asset.content_hash or "")[:12]
+        print(f"{asset.id:<6} {asset.client_id:<7} {asset.asset_type:<10} {asset.filename:<30} "
+              f"{format_size(asset.size or 0):>10}  {content_hash:<12}")
+    if not count:
+        print("No assets found.")
+
+    stats = db.asset_store_stats()
+    print(f"\n{stats['assets']} assets ({format_size(stats['logical_bytes'])}) stored as "
+          f"{stats['blobs']} blobs ({format_size(stats['stored_bytes'])}), "
+          f"{stats['unreferenced_blobs']} unreferenced")
+
+
+def cmd_asset_remove(args):
+    """Remove an asset; its file is deleted by gc once nothing uses it."""
+    if db.remove_asset(args.id):
+        print(f"✓ Asset {args.id} removed")
+    else:
+        print(f"✗ Asset {args.id} not found.")
+
+
+def cmd_asset_gc(args):
+    """Delete stored files no asset references."""
+    removed, freed = db.collect_asset_garbage(dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"✓ {verb} {removed} unreferenced blobs ({format_size(freed)})")
+
+
+def cmd_archive_run(args):
+    """Move old and closed leads to the archive database."""
+    statuses = [s.strip() for s in args.status.split(",") if s.strip()] if args.status else []
+    days = args.older_than
+    if days is None and not statuses:
+        days, statuses = db.ARCHIVE_AFTER_DAYS, list(db.ARCHIVE_STATUSES)
+    before = None
+    if days is not None:
+        before = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    rules = []
+    if before:
+        rules.append(f"not updated in {days} days")
+    if statuses:
+        rules.append(f"status {', '.join(statuses)}")
+    print(f"Archiving leads: {' or '.join(rules)}")
+
+    start = time.perf_counter()
+    progress = tty_progress(lambda count: f"{count:,} leads archived")
+    count = db.archive_leads(before, statuses, batch_size=args.batch_size, dry_run=args.dry_run, progress=progress)
+    if progress and count:
+        print(file=sys.stderr)
+
+    if args.dry_run:
+        print(f"✓ Would archive {count:,} leads.")
+        return
+    print(f"✓ Archived {count:,} leads to {db.ARCHIVE_PATH} in {time.perf_counter() - start:.2f}s.")
+    if args.vacuum:
+        db.vacuum()
+        print("✓ Compacted the main database.")
+
+
+def cmd_archive_restore(args):
+    """Move archived leads back to the main database."""
+    restored = db.restore_leads(args.ids)
+    print(f"✓ Restored {restored} of {len(args.ids)} leads.")
+
+
+def cmd_archive_status(args):
+    """Show hot and archived lead counts and file sizes."""
+    stats = db.archive_stats()
+    free = f" ({format_size(stats['free_bytes'])} free - reclaim with: archive run --vacuum)" if stats['free_bytes'] else ""
+    print(f"Main:    {stats['leads']:,} leads, {format_size(stats['bytes'])}{free}")
+    print(f"Archive: {stats['archived_leads']:,} leads, {format_size(stats['archive_bytes'])}"
+          + (f", oldest created {stats['oldest_archived']}" if stats['oldest_archived'] else ""))
+
+
+def catalog_candidate(args):
+    """Build the characteristics to check from --like and the per-field options."""
+    import catalog
+
+    characteristics = {}
+    if args.like:
+        with open(args.catalog or catalog.CATALOG_PATH) as f:
+            templates = json.load(f).get("templates", {})
+        if args.like not in templates:
+            raise ValueError(f"Unknown template: {args.like} (choose from {', '.join(templates)})")
+        characteristics = dict(templates[args.like]["characteristics"])
+    for name, value in (("layout", args.layout), ("colorScheme", args.color_scheme),
+                        ("heroStyle", args.hero_style), ("navigation", args.navigation),
+                        ("primaryCTA", args.cta)):
+        if value:
+            characteristics[name] = value
+    if args.sections:
+        characteristics["sections"] = [s.strip() for s in args.sections.split(",") if s.strip()]
+    missing = [name for name in (*catalog.FEATURES, "sections") if name not in characteristics]
+    if missing:
+        raise ValueError(f"Missing characteristics: {', '.join(missing)} (pass them or use --like)")
+    return characteristics
+
+
+def cmd_catalog_check(args):
+    """Check a proposed build against the catalog for near-duplicates."""
+    import catalog
+
+    engine = catalog.Catalog.load(args.catalog or catalog.CATALOG_PATH, include_templates=args.include_templates)
+    try:
+        characteristics = catalog_candidate(args)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return
+
+    if not engine.builds:
+        print("✓ Catalog has no builds yet - any design is unique. (--include-templates compares against templates)")
+        return
+
+    top = engine.top_k(characteristics, args.top, args.industry)
+    print(f"\n{'Match':>6}  {'Build':<28} {'Client':<28} {'Industry':<15}")
+    print("-" * 80)
+    for build, score in top:
+        print(f"{score:>6.0%}  {build['id']:<28} {build.get('clientName', ''):<28} {build.get('industry') or '-':<15}")
+
+    duplicates = engine.duplicates(characteristics, args.threshold, args.industry)
+    if not duplicates:
+        best = top[0][1] if top else 0
+        print(f"\n✓ Unique: closest build is {best:.0%} similar (threshold {args.threshold:.0%}).")
+        return
+
+    print(f"\n✗ Too similar to {len(duplicates)} builds (threshold {args.threshold:.0%}).")
+    print("  Least-used options to vary:")
+    for name, values in engine.least_used(args.industry).items():
+        if name in catalog.FEATURES and characteristics[name] not in values:
+            print(f"    {name}: {', '.join(values)}")
+
+
+def cmd_catalog_recommend(args):
+    """Suggest the least-used characteristics for a new build."""
+    import catalog
+
+    engine = catalog.Catalog.load(args.catalog or catalog.CATALOG_PATH, include_templates=args.include_templates)
+    scope = args.industry or "all industries"
+    result = engine.recommend(args.industry)
+    usage = engine.usage(args.industry)
+
+    print(f"\nRecommendations for {scope} ({sum(usage['layout'].values())} builds):")
+    for name, value in result["recommended"].items():
+        avoid = result["avoid"].get(name)
+        note = f"   (avoid {avoid}, used {usage[name][avoid]}x)" if avoid else ""
+        print(f"  {name:<12} {value}{note}")
 
-    print(f"\n✓ Generated {len(clients)} client configs.")
+    print("\nLeast used:")
+    for name, values in engine.least_used(args.industry, args.count).items():
+        counts = ", ".join(f"{value} ({usage[name][value]})" for value in values)
+        print(f"  {name:<12} {counts}")
 
 
-def main():
+def cmd_bench(args):
+    """Benchmark db operations on a throwaway database and print JSON."""
+    import bench
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = bench.run(sizes, client_ratio=args.client_ratio, samples=args.samples, seed_value=args.seed,
+                       catalog_builds=args.catalog_builds)
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+        print(f"✓ Benchmark results saved to: {args.output}")
+    else:
+        print(output)
+
+
+def cmd_sync(args):
+    """Push local lead changes to Supabase and pull remote ones."""
+    import sync
+
+    if args.status:
+        for key, value in sync.status().items():
+            print(f"{key.replace('_', ' ').capitalize() + ':':<18} {value if value is not None else '-'}")
+        return
+
+    def progress(direction, totals):
+        counts = ", ".join(f"{count} {name}" for name, count in totals.items())
+        print(f"  {direction}: {counts}", flush=True)
+
+    try:
+        client = sync.SupabaseClient.from_env(args.url)
+        if not args.pull_only:
+            totals = sync.push(client, args.batch_size, progress)
+            print(f"✓ Pushed {totals['upserted']} leads, {totals['deleted']} deletes")
+            if totals["skipped"]:
+                print(f"  Skipped {totals['skipped']} leads with a status Supabase doesn't accept "
+                      f"({', '.join(sync.REMOTE_STATUSES)}); update their status to push them.")
+        if not args.push_only:
+            totals = sync.pull(client, args.batch_size, progress)
+            print(f"✓ Pulled {totals['fetched']} leads ({totals['applied']} applied)")
+    except sync.SyncError as e:
+        print(f"✗ Sync stopped: {e}")
+        print("  Progress so far is saved; run sync again to resume.")
+        sys.exit(1)
+
+
+def cmd_backup_create(args):
+    """Back up the database online, step by step."""
+    import backup
+
+    sources = [Path(db.DB_PATH)]
+    if args.archive and Path(db.ARCHIVE_PATH).exists():
+        sources.append(Path(db.ARCHIVE_PATH))
+
+    progress = tty_progress(lambda done, total: f"{done:,}/{total:,} pages ({done / total:.0%})")
+
+    for source in sources:
+        try:
+            stats = backup.create(source, args.output, compress=args.gzip, verify_copy=args.verify,
+                                  step_pages=args.step_pages or backup.STEP_PAGES,
+                                  sleep=backup.STEP_SLEEP if args.sleep is None else args.sleep,
+                                  progress=progress)
+        except (backup.BackupError, OSError) as e:
+            if progress:
+                print(file=sys.stderr)
+            print(f"✗ Backup of {source.name} failed: {e}")
+            sys.exit(1)
+        if progress:
+            print(file=sys.stderr)
+
+        size = format_size(stats["size"])
+        if args.gzip:
+            size += f", {stats['size'] / max(stats['bytes'], 1):.0%} of {format_size(stats['bytes'])}"
+        print(f"✓ Backed up {source.name} to {stats['path']} ({size})")
+        how = "in one pass after writers restarted it" if stats["single_pass"] and stats["restarts"] else \
+            f"{stats['restarts']} restarts"
+        print(f"  {stats['pages']:,} pages in {stats['steps']:,} step{'s' if stats['steps'] != 1 else ''} ({how}), {stats['elapsed_s']:.2f}s total")
+        if stats["lock_s"]:
+            print(f"  Throughput: {format_size(stats['bytes'] / stats['lock_s'])}/s copying, "
+                  f"{format_size(stats['bytes'] / stats['copy_s'])}/s with pauses")
+        print(f"  Writer stall: longest step {stats['max_lock_s'] * 1000:.1f}ms, "
+              f"{stats['lock_s'] * 1000:.0f}ms locked in total, {stats['sleep_s'] * 1000:.0f}ms yielded")
+        if stats["verified"]:
+            print("  ✓ integrity_check ok")
+
+        if args.keep:
+            for path in backup.rotate(args.output, source.stem, args.keep):
+                print(f"✗ Removed old backup {path.name}")
+
+
+def cmd_backup_verify(args):
+    """Run integrity_check on a backup."""
+    import backup
+
+    problems = backup.verify(args.file)
+    if problems:
+        print(f"✗ {args.file} failed integrity_check:")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"✓ {args.file} passed integrity_check")
+
+
+def cmd_backup_list(args):
+    """List backups, oldest first."""
+    import backup
+
+    backups = backup.list_backups(args.output)
+    if not backups:
+        print("No backups found.")
+        return
+    for path in backups:
+        modified = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M")
+        print(f"{modified}  {format_size(path.stat().st_size):>10}  {path.name}")
+
+
+def print_profile(profile):
+    """Print recorded db timings as tables, slowest total first."""
+    for section, title in (("functions", "Function"), ("statements", "Statement")):
+        entries = sorted(profile.get(section, {}).items(), key=lambda item: -item[1]["total_s"])
+        if not entries:
+            continue
+        print(f"\n{title:<60} {'Calls':>8} {'Total ms':>10} {'Max ms':>9} {'Rows':>9}")
+        print("-" * 100)
+        for key, stats in entries:
+            label = key if len(key) <= 60 else key[:57] + "..."
+            print(f"{label:<60} {stats['calls']:>8} {stats['total_s'] * 1000:>10.1f} "
+                  f"{stats['max_s'] * 1000:>9.1f} {stats['rows']:>9}")
+
+    for slow in profile.get("slow_queries", []):
+        print(f"\nSlow query ({slow['ms']}ms at {slow['at']}): {slow['statement']}")
+        for step in slow["plan"]:
+            print(f"  {step}")
+
+
+def print_pipeline(stats):
+    """Print lead/client counts and weekly activity from db.get_pipeline_stats()."""
+    leads, clients = stats["leads"], stats["clients"]
+    for title, counts, total in (("Lead status", leads["by_status"], leads["total"]),
+                                 ("Lead source", leads["by_source"], leads["total"]),
+                                 ("Client status", clients["by_status"], clients["total"]),
+                                 ("Client tier", clients["by_tier"], clients["total"])):
+        print(f"\n{title:<30} {'Count':>8} {'Share':>7}")
+        print("-" * 47)
+        for key, count in counts.items():
+            print(f"{key or '-':<30} {count:>8} {count / total:>7.1%}")
+        print(f"{'Total':<30} {total:>8}")
+
+    if stats["weekly"]:
+        print(f"\n{'Week of':<12} {'New leads':>10} {'New clients':>12} {'Rate':>7}")
+        print("-" * 44)
+        for week in stats["weekly"]:
+            rate = f"{week['clients'] / week['leads']:.1%}" if week["leads"] else "-"
+            print(f"{week['week'] or '-':<12} {week['leads']:>10} {week['clients']:>12} {rate:>7}")
+
+
+def cmd_stats(args):
+    """Show lead/client pipeline counts, or recorded db profiling data."""
+    if args.rebuild:
+        drift = db.rebuild_stats()
+        if any(drift.values()):
+            details = ", ".join(f"{table}: {count}" for table, count in drift.items() if count)
+            print(f"✗ Summary tables had drifted and were rebuilt ({details} buckets fixed).")
+        else:
+            print("✓ Summary tables are consistent with leads and clients.")
+        return
+
+    if not args.profile:
+        if args.reset:
+            print("Nothing to reset. --reset clears the timings shown by --profile.")
+            return
+        stats = db.get_pipeline_stats(weeks=args.weeks)
+        if args.format == "json":
+            print(json.dumps(stats, indent=2))
+        elif args.format == "prometheus":
+            print(db.pipeline_to_prometheus(stats), end="")
+        else:
+            print_pipeline(stats)
+        return
+
+    if args.reset:
+        db.PROFILE_PATH.unlink(missing_ok=True)
+        print("✓ Profile data cleared.")
+        return
+
+    profile = db.load_profile()
+    if args.format == "json":
+        print(json.dumps(profile, indent=2))
+    elif args.format == "prometheus":
+        print(db.profile_to_prometheus(profile), end="")
+    elif not profile.get("functions") and not profile.get("statements"):
+        print("No profile data recorded. Run commands with DB_PROFILE=1 first.")
+    else:
+        print_profile(profile)
+
+
+def parse_command_line(line):
+    """Split a shell/serve request into argv (plain text or JSON)."""
+    line = line.strip()
+    if line.startswith(("[", "{")):
+        request = json.loads(line)
+        if isinstance(request, dict):
+            request = request.get("argv") or shlex.split(request.get("command", ""))
+        return [str(arg) for arg in request]
+    return shlex.split(line)
+
+
+def execute(argv, parsers, interactive=True):
+    """Run one command in this process; returns its exit code.
+
+    argparse errors and --help normally exit the process - here they just
+    end the command.
+    """
+    try:
+        args = parsers["main"].parse_args(argv)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+
+    command = (args.command, getattr(args, f"{args.command}_command", None))
+    if args.command in ("shell", "serve"):
+        print(f"'{args.command}' can't be run from inside shell or serve.")
+        return 1
+    uses_stdio = getattr(args, "file", None) == "-" or getattr(args, "output", None) == "-"
+    if not interactive and (command in INTERACTIVE_COMMANDS or uses_stdio):
+        print(f"'{' '.join(argv)}' needs the terminal (interactive input or stdin/stdout) and can't run under serve.")
+        return 1
+
+    try:
+        run(args, parsers)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    return 0
+
+
+def cmd_shell(args, parsers):
+    """Interactive prompt that runs commands without restarting Python."""
+    import importlib
+
+    try:
+        # Loading readline is enough to give input() line editing and history
+        importlib.import_module("readline")
+    except ImportError:
+        pass
+
+    print("Website Builder shell. Type a command (e.g. 'lead list'), 'help', or 'exit'.")
+    while True:
+        try:
+            line = input("manage> ")
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        line = line.strip()
+        if not line:
+            continue
+        if line in ("exit", "quit"):
+            break
+        if line == "help":
+            parsers["main"].print_help()
+            continue
+        try:
+            execute(parse_command_line(line), parsers)
+        except KeyboardInterrupt:
+            print("\nInterrupted.")
+        except Exception as e:
+            print(f"Error: {e}")
+    db.close_connection()
+
+
+def handle_request(line, parsers):
+    """Run one serve request line and return its JSON response line."""
+    output = io.StringIO()
+    try:
+        argv = parse_command_line(line)
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            code = execute(argv, parsers, interactive=False)
+        response = {"ok": code == 0, "exit": code, "output": output.getvalue()}
+    except Exception as e:
+        response = {"ok": False, "exit": 1, "output": output.getvalue(), "error": str(e)}
+    return json.dumps(response) + "\n"
+
+
+def cmd_serve(args, parsers):
+    """Answer commands from stdin or a Unix socket, one JSON line per command."""
+    if args.stdio:
+        for line in sys.stdin:
+            if line.strip():
+                sys.stdout.write(handle_request(line, parsers))
+                sys.stdout.flush()
+        return
+
+    import signal
+    import socket
+    import socketserver
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("Unix sockets aren't available on this platform; use 'serve --stdio'.")
+        return
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode("utf-8")
+                if line.strip():
+                    self.wfile.write(handle_request(line, parsers).encode("utf-8"))
+                    self.wfile.flush()
+
+    # Let a plain kill run the cleanup below
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    socket_path = Path(args.socket)
+    socket_path.unlink(missing_ok=True)
+    with socketserver.UnixStreamServer(str(socket_path), Handler) as server:
+        print(f"Listening on {socket_path} (Ctrl+C to stop)", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
+            db.close_connection()
+
+
+def non_negative_int(value):
+    """argparse type for counts where 0 is meaningful but negatives aren't."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
+
+
+def build_parser():
+    """Build the argument parsers; returns them keyed by command group."""
     parser = argparse.ArgumentParser(description="Website Builder Management CLI")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
@@ -340,16 +1446,43 @@ def main():
     lead_subparsers = lead_parser.add_subparsers(dest="lead_command")
 
     lead_subparsers.add_parser("add", help="Add a new lead")
+    lead_import = lead_subparsers.add_parser("import", help="Bulk import leads from CSV or JSONL")
+    lead_import.add_argument("file", help="Path to a .csv or .jsonl file, or - for stdin")
+    lead_import.add_argument("--format", choices=["csv", "jsonl"], help="Input format (default: from file extension)")
+    lead_import.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Rows per transaction")
+    lead_import.add_argument("--source", default="import", help="Source for rows without one")
+
     lead_list = lead_subparsers.add_parser("list", help="List all leads")
     lead_list.add_argument("--status", help="Filter by status")
+    lead_list.add_argument("--limit", type=int, help="Show at most this many leads")
+    lead_list.add_argument("--after", type=int, help="Show leads older than this lead ID")
+    lead_list.add_argument("--archived", action="store_true", help="Include archived leads")
+
+    lead_search = lead_subparsers.add_parser("search", help="Full-text search leads")
+    lead_search.add_argument("query", help="Words to match (prefixes allowed)")
+    lead_search.add_argument("--limit", type=int, default=20, help="Maximum results")
+    lead_search.add_argument("--archived", action="store_true", help="Search archived leads too")
+
+    lead_dedupe = lead_subparsers.add_parser("dedupe", help="Merge leads sharing an email or phone")
+    lead_dedupe.add_argument("--dry-run", action="store_true", help="Only report duplicate groups")
+
+    lead_export = lead_subparsers.add_parser("export", help="Stream leads to JSONL or CSV")
+    lead_export.add_argument("--output", "-o", default="-", help="Output file (default: stdout); .gz/.xz compresses")
+    lead_export.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from file name, else jsonl)")
+    lead_export.add_argument("--compress", choices=["none", "gzip", "xz"], help="Compression (default: from file name)")
+    lead_export.add_argument("--columns", help="Comma-separated columns to include (default: all)")
+    lead_export.add_argument("--since", help="Only leads updated at or after this timestamp")
 
     lead_show = lead_subparsers.add_parser("show", help="Show a lead")
     lead_show.add_argument("id", type=int, help="Lead ID")
 
     lead_status = lead_subparsers.add_parser("status", help="Update lead status")
-    lead_status.add_argument("id", type=int, help="Lead ID")
-    lead_status.add_argument("status", help="New status")
+    lead_status.add_argument("target", metavar="id", help="Lead ID (or the new status with --ids/--where)")
+    lead_status.add_argument("status", nargs="?", help="New status")
     lead_status.add_argument("--notes", help="Optional notes")
+    lead_status.add_argument("--ids", help="Comma-separated lead IDs to update")
+    lead_status.add_argument("--where", action="append", metavar="KEY=VALUE",
+                             help="Filter on status, source, created_after or created_before (repeatable)")
 
     # client commands
     client_parser = subparsers.add_parser("client", help="Client management")
@@ -358,46 +1491,261 @@ def main():
     client_subparsers.add_parser("add", help="Add a new client")
     client_list = client_subparsers.add_parser("list", help="List all clients")
     client_list.add_argument("--status", help="Filter by status")
+    client_list.add_argument("--limit", type=int, help="Show at most this many clients")
+    client_list.add_argument("--after", type=int, help="Show clients older than this client ID")
+
+    client_search = client_subparsers.add_parser("search", help="Full-text search clients")
+    client_search.add_argument("query", help="Words to match (prefixes allowed)")
+    client_search.add_argument("--limit", type=int, default=20, help="Maximum results")
+
+    client_export = client_subparsers.add_parser("export", help="Stream clients to JSONL or CSV")
+    client_export.add_argument("--output", "-o", default="-", help="Output file (default: stdout); .gz/.xz compresses")
+    client_export.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from file name, else jsonl)")
+    client_export.add_argument("--compress", choices=["none", "gzip", "xz"], help="Compression (default: from file name)")
+    client_export.add_argument("--columns", help="Comma-separated columns to include (default: all)")
+    client_export.add_argument("--since", help="Only clients updated at or after this timestamp")
 
     client_show = client_subparsers.add_parser("show", help="Show a client")
     client_show.add_argument("id", type=int, help="Client ID")
 
+    client_status = client_subparsers.add_parser("status", help="Update client status")
+    client_status.add_argument("target", metavar="id", help="Client ID (or the new status with --ids/--where)")
+    client_status.add_argument("status", nargs="?", help="New status")
+    client_status.add_argument("--ids", help="Comma-separated client IDs to update")
+    client_status.add_argument("--where", action="append", metavar="KEY=VALUE",
+                               help="Filter on status, tier, business_type, created_after or created_before (repeatable)")
+
     client_generate = client_subparsers.add_parser("generate", help="Generate client JSON")
     client_generate.add_argument("id", type=int, help="Client ID")
-
-    client_subparsers.add_parser("generate-all", help="Generate all client JSONs")
-
-    args = parser.parse_args()
-
+    client_generate.add_argument("--compact", action="store_true", help="Write JSON without indentation")
+
+    client_generate_all = client_subparsers.add_parser("generate-all", help="Generate all client JSONs")
+    client_generate_all.add_argument("--force", action="store_true", help="Regenerate every client, not just changed ones")
+    client_generate_all.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    client_generate_all.add_argument("--compact", action="store_true", help="Write JSON without indentation")
+
+    client_render = client_subparsers.add_parser("render", help="Render static HTML previews from client JSON")
+    client_render.add_argument("--force", action="store_true", help="Render every client, not just changed ones")
+    client_render.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    client_render.add_argument("--template", help="Template for every client (default: each config's template)")
+
+    # asset commands
+    asset_parser = subparsers.add_parser("asset", help="Client asset storage")
+    asset_subparsers = asset_parser.add_subparsers(dest="asset_command")
+
+    asset_add = asset_subparsers.add_parser("add", help="Store files for a client")
+    asset_add.add_argument("client_id", type=int, help="Client ID")
+    asset_add.add_argument("files", nargs="+", help="Files to store")
+    asset_add.add_argument("--type", default="image", help="Asset type (default: image)")
+
+    asset_list = asset_subparsers.add_parser("list", help="List assets and store usage")
+    asset_list.add_argument("--client", type=int, help="Only this client's assets")
+
+    asset_remove = asset_subparsers.add_parser("remove", help="Remove an asset")
+    asset_remove.add_argument("id", type=int, help="Asset ID")
+
+    asset_gc = asset_subparsers.add_parser("gc", help="Delete stored files no asset uses")
+    asset_gc.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+
+    # archive commands
+    archive_parser = subparsers.add_parser("archive", help="Move old leads to the archive database")
+    archive_subparsers = archive_parser.add_subparsers(dest="archive_command")
+
+    archive_run = archive_subparsers.add_parser("run", help="Archive old and closed leads")
+    archive_run.add_argument("--older-than", type=int, metavar="DAYS", help="Archive leads not updated in DAYS days")
+    archive_run.add_argument("--status", help="Archive leads with these statuses (comma-separated)")
+    archive_run.add_argument("--batch-size", type=int, default=db.ARCHIVE_BATCH_SIZE, help="Leads moved per transaction")
+    archive_run.add_argument("--dry-run", action="store_true", help="Only count the leads that would move")
+    archive_run.add_argument("--vacuum", action="store_true", help="Compact the main database afterwards")
+
+    archive_restore = archive_subparsers.add_parser("restore", help="Move archived leads back")
+    archive_restore.add_argument("ids", type=int, nargs="+", help="Lead IDs")
+
+    archive_subparsers.add_parser("status", help="Show hot and archived lead counts")
+
+    # catalog commands
+    catalog_parser = subparsers.add_parser("catalog", help="Website catalog similarity checks")
+    catalog_subparsers = catalog_parser.add_subparsers(dest="catalog_command")
+
+    catalog_check = catalog_subparsers.add_parser("check", help="Check a proposed build for near-duplicates")
+    catalog_check.add_argument("--like", help="Start from a template's characteristics (e.g. 03-clean-minimal-service)")
+    catalog_check.add_argument("--layout", help="Layout (e.g. split-hero)")
+    catalog_check.add_argument("--color-scheme", help="Color scheme (e.g. light-teal)")
+    catalog_check.add_argument("--hero-style", help="Hero style")
+    catalog_check.add_argument("--navigation", help="Navigation style")
+    catalog_check.add_argument("--cta", help="Primary CTA style")
+    catalog_check.add_argument("--sections", help="Comma-separated section types")
+    catalog_check.add_argument("--industry", help="Only compare against builds in this industry")
+    catalog_check.add_argument("--threshold", type=float, default=0.7, help="Duplicate threshold (default: 0.7)")
+    catalog_check.add_argument("--top", type=int, default=5, help="Closest builds to show")
+
+    catalog_recommend = catalog_subparsers.add_parser("recommend", help="Suggest least-used characteristics")
+    catalog_recommend.add_argument("--industry", help="Only consider builds in this industry")
+    catalog_recommend.add_argument("--count", type=int, default=3, help="Least-used values to list per characteristic")
+
+    for catalog_command in (catalog_check, catalog_recommend):
+        catalog_command.add_argument("--include-templates", action="store_true", help="Treat the templates as builds too")
+        catalog_command.add_argument("--catalog", help="Catalog file (default: generation/website-catalog.json)")
+
+    # bench command
+    bench_parser = subparsers.add_parser("bench", help="Benchmark the db layer on synthetic data")
+    bench_parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated lead counts")
+    bench_parser.add_argument("--client-ratio", type=float, default=0.1, help="Clients per lead")
+    bench_parser.add_argument("--samples", type=int, default=1000, help="Timed calls per operation")
+    bench_parser.add_argument("--seed", type=int, default=42, help="Random seed for synthetic data")
+    bench_parser.add_argument("--output", help="Write JSON results to this file")
+    bench_parser.add_argument("--catalog-builds", type=int, default=100000,
+                              help="Synthetic catalog size for the similarity benchmark (0 to skip)")
+
+    # sync command
+    sync_parser = subparsers.add_parser("sync", help="Sync leads with Supabase")
+    sync_direction = sync_parser.add_mutually_exclusive_group()
+    sync_direction.add_argument("--push-only", action="store_true", help="Only send local changes")
+    sync_direction.add_argument("--pull-only", action="store_true", help="Only fetch remote changes")
+    sync_direction.add_argument("--status", action="store_true", help="Show pending changes and checkpoints")
+    sync_parser.add_argument("--url", help="Supabase (or PostgREST) URL (default: $SUPABASE_URL)")
+    sync_parser.add_argument("--batch-size", type=int, default=500, help="Rows per request")
+
+    # backup commands
+    backup_parser = subparsers.add_parser("backup", help="Online database backups")
+    backup_subparsers = backup_parser.add_subparsers(dest="backup_command")
+
+    backup_create = backup_subparsers.add_parser("create", help="Back up the database without blocking writers")
+    backup_create.add_argument("--gzip", action="store_true", help="Compress the backup")
+    backup_create.add_argument("--verify", action="store_true", help="Run integrity_check on the copy")
+    backup_create.add_argument("--keep", type=non_negative_int, default=7, help="Backups to keep per database (0 keeps all)")
+    backup_create.add_argument("--step-pages", type=int, help="Pages copied per step (default: 1024)")
+    backup_create.add_argument("--sleep", type=float, help="Seconds to pause between steps (default: 0.005)")
+    backup_create.add_argument("--archive", action="store_true", help="Also back up the lead archive database")
+
+    backup_verify = backup_subparsers.add_parser("verify", help="Run integrity_check on a backup")
+    backup_verify.add_argument("file", help="Backup file (.db or .db.gz)")
+
+    backup_list = backup_subparsers.add_parser("list", help="List backups")
+
+    for backup_command in (backup_create, backup_list):
+        backup_command.add_argument("--output", help="Backup directory (default: backend/backups)")
+
+    # shell and serve commands
+    subparsers.add_parser("shell", help="Interactive prompt that keeps one warm process")
+    serve_parser = subparsers.add_parser("serve", help="Answer commands from a Unix socket or stdin")
+    serve_parser.add_argument("--socket", default=str(SOCKET_PATH), help="Unix socket path to listen on")
+    serve_parser.add_argument("--stdio", action="store_true", help="Read commands from stdin instead of a socket")
+
+    # stats command
+    stats_parser = subparsers.add_parser("stats", help="Show statistics")
+    stats_parser.add_argument("--profile", action="store_true", help="Show recorded db timings")
+    stats_parser.add_argument("--format", choices=["table", "json", "prometheus"], default="table", help="Output format")
+    stats_parser.add_argument("--reset", action="store_true", help="Clear recorded db timings")
+    stats_parser.add_argument("--rebuild", action="store_true",
+                              help="Recompute the summary tables from scratch and report any drift")
+    stats_parser.add_argument("--weeks", type=int, default=12, help="Weeks of activity to show (default: 12)")
+
+    return {"main": parser, "lead": lead_parser, "client": client_parser, "asset": asset_parser,
+            "archive": archive_parser, "backup": backup_parser, "catalog": catalog_parser, "lead status": lead_status,
+            "client status": client_status}
+
+
+def run(args, parsers):
+    """Run the command selected by parsed arguments."""
     # Route to appropriate command
     if args.command == "init":
         cmd_init(args)
     elif args.command == "lead":
         if args.lead_command == "add":
             cmd_lead_add(args)
+        elif args.lead_command == "import":
+            cmd_lead_import(args)
         elif args.lead_command == "list":
             cmd_lead_list(args)
+        elif args.lead_command == "search":
+            cmd_lead_search(args)
+        elif args.lead_command == "dedupe":
+            cmd_lead_dedupe(args)
+        elif args.lead_command == "export":
+            cmd_lead_export(args)
         elif args.lead_command == "show":
             cmd_lead_show(args)
         elif args.lead_command == "status":
-            cmd_lead_status(args)
+            cmd_lead_status(args, parsers["lead status"])
         else:
-            lead_parser.print_help()
+            parsers["lead"].print_help()
     elif args.command == "client":
         if args.client_command == "add":
             cmd_client_add(args)
         elif args.client_command == "list":
             cmd_client_list(args)
+        elif args.client_command == "search":
+            cmd_client_search(args)
+        elif args.client_command == "export":
+            cmd_client_export(args)
         elif args.client_command == "show":
             cmd_client_show(args)
+        elif args.client_command == "status":
+            cmd_client_status(args, parsers["client status"])
         elif args.client_command == "generate":
             cmd_client_generate(args)
         elif args.client_command == "generate-all":
             cmd_client_generate_all(args)
+        elif args.client_command == "render":
+            cmd_client_render(args)
+        else:
+            parsers["client"].print_help()
+    elif args.command == "asset":
+        if args.asset_command == "add":
+            cmd_asset_add(args)
+        elif args.asset_command == "list":
+            cmd_asset_list(args)
+        elif args.asset_command == "remove":
+            cmd_asset_remove(args)
+        elif args.asset_command == "gc":
+            cmd_asset_gc(args)
+        else:
+            parsers["asset"].print_help()
+    elif args.command == "archive":
+        if args.archive_command == "run":
+            cmd_archive_run(args)
+        elif args.archive_command == "restore":
+            cmd_archive_restore(args)
+        elif args.archive_command == "status":
+            cmd_archive_status(args)
         else:
-            client_parser.print_help()
+            parsers["archive"].print_help()
+    elif args.command == "catalog":
+        if args.catalog_command == "check":
+            cmd_catalog_check(args)
+        elif args.catalog_command == "recommend":
+            cmd_catalog_recommend(args)
+        else:
+            parsers["catalog"].print_help()
+    elif args.command == "backup":
+        if args.backup_command == "create":
+            cmd_backup_create(args)
+        elif args.backup_command == "verify":
+            cmd_backup_verify(args)
+        elif args.backup_command == "list":
+            cmd_backup_list(args)
+        else:
+            parsers["backup"].print_help()
+    elif args.command == "bench":
+        cmd_bench(args)
+    elif args.command == "sync":
+        cmd_sync(args)
+    elif args.command == "stats":
+        cmd_stats(args)
+    elif args.command == "shell":
+        cmd_shell(args, parsers)
+    elif args.command == "serve":
+        cmd_serve(args, parsers)
     else:
-        parser.print_help()
+        parsers["main"].print_help()
+
+
+
+def main(argv=None):
+    parsers = build_parser()
+    args = parsers["main"].parse_args(argv)
+    run(args, parsers)
 
 
 if __name__ == "__main__":
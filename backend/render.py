@@ -0,0 +1,183 @@
+"""
+Static HTML pre-render of client previews from generation/templates.
+
+The templates are finished design mockups rather than placeholder files,
+so compiling one means finding the demo content a client config replaces:
+the page title, the :root color variables, the hero <h1>, phone numbers,
+mailto links and the template's brand name (read from its copyright
+line). The template is split once into literal text and slots; rendering
+a client is then a single join of the literals with the client's values.
+
+Compiled templates are cached per process and keyed on the file's
+mtime and size, so a long-running worker picks up edited templates.
+"""
+
+import hashlib
+import html
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import files
+
+TEMPLATES_PATH = Path(__file__).parent.parent / "generation" / "templates"
+
+# Preview page per client slug, served by Next.js at /previews/<slug>.html
+PREVIEWS_PATH = Path(__file__).parent.parent / "public" / "previews"
+
+# Tracks what each preview was rendered from, for incremental rendering
+RENDER_MANIFEST_PATH = Path(__file__).parent / ".render-manifest.json"
+
+# Config "template" names that aren't template file names
+TEMPLATE_ALIASES = {
+    "service-business": "03-clean-minimal-service",
+}
+
+# Bump when the slot patterns or values change, so every preview re-renders
+RENDERER_VERSION = 1
+
+# (slot key, pattern); the "value" group is the text the slot replaces
+SLOT_PATTERNS = [
+    ("title", r"<title>(?P<value>.*?)</title>"),
+    ("primary", r"--primary:\s*(?P<value>#[0-9a-fA-F]{3,8})"),
+    ("secondary", r"--secondary:\s*(?P<value>#[0-9a-fA-F]{3,8})"),
+    ("accent", r"--accent:\s*(?P<value>#[0-9a-fA-F]{3,8})"),
+    ("headline", r"<h1[^>]*>(?P<value>.*?)</h1>"),
+    ("tel", r'href="tel:(?P<value>[^"]*)"'),
+    ("email", r'href="mailto:(?P<value>[^"]*)"'),
+    ("email", r'href="mailto:[^"]*"[^>]*>(?P<value>[^<]*)</a>'),
+    ("phone", r"(?P<value>\(\d{3}\) \d{3}-\d{4})"),
+]
+BRAND_PATTERN = re.compile(r"&copy;\s*\d{4}\s+(?P<value>[^.<]+?)\.")
+
+
+class Template:
+    """A template split into literal text and the slot keys between them.
+
+    literals has one more item than keys: the output is literals[0],
+    value of keys[0], literals[1], value of keys[1], ...
+    """
+
+    def __init__(self, name, literals, keys):
+        self.name = name
+        self.literals = literals
+        self.keys = keys
+
+    def render(self, values):
+        parts = [self.literals[0]]
+        for key, literal in zip(self.keys, self.literals[1:]):
+            parts.append(values[key])
+            parts.append(literal)
+        return "".join(parts)
+
+
+def compile_template(name, source):
+    """Find the slots in a template's source and split it around them."""
+    spans = []
+    for key, pattern in SLOT_PATTERNS:
+        for match in re.finditer(pattern, source, re.DOTALL):
+            spans.append((match.start("value"), match.end("value"), key))
+    brand = BRAND_PATTERN.search(source)
+    if brand:
+        for match in re.finditer(re.escape(brand.group("value")), source):
+            # "&copy; 2026 Brand." must not become "Example Co.."
+            key = "name_sentence" if source[match.end():match.end() + 1] == "." else "name"
+            spans.append((match.start(), match.end(), key))
+
+    # Keep the earliest slot where matches overlap (e.g. a phone number in a brand line)
+    spans.sort()
+    literals, keys = [], []
+    position = 0
+    for start, end, key in spans:
+        if start < position:
+            continue
+        literals.append(source[position:start])
+        keys.append(key)
+        position = end
+    literals.append(source[position:])
+    return Template(name, literals, keys)
+
+
+def template_path(name):
+    """Resolve a template name to a file in TEMPLATES_PATH.
+
+    Accepts a file stem ("01-modern-agency"), the part after or before the
+    number ("modern-agency", "01") or an alias from TEMPLATE_ALIASES.
+    """
+    name = TEMPLATE_ALIASES.get(name, name)
+    candidates = (TEMPLATES_PATH / f"{name}.html",
+                  *TEMPLATES_PATH.glob(f"*-{name}.html"), *TEMPLATES_PATH.glob(f"{name}-*.html"))
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    raise ValueError(f"Unknown template: {name}")
+
+
+def template_fingerprint(path):
+    """Hash of a template's contents and the renderer version."""
+    digest = hashlib.sha1(Path(path).read_bytes())
+    digest.update(str(RENDERER_VERSION).encode())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=32)
+def _load_template(path, mtime_ns, size):
+    return compile_template(Path(path).stem, Path(path).read_text(encoding="utf-8"))
+
+
+def load_template(path):
+    """Compiled template for a file, compiled once per process while unchanged."""
+    stat = Path(path).stat()
+    return _load_template(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def template_values(config):
+    """Slot values for a client config, HTML-escaped."""
+    contact = config.get("content", {}).get("contact", {})
+    hero = config.get("content", {}).get("hero", {})
+    colors = config.get("colors", {})
+    name = config.get("name", "")
+    phone = contact.get("phone") or config.get("phone") or ""
+    email = contact.get("email") or config.get("email") or ""
+    headline = hero.get("headline") or name
+    return {
+        "name": html.escape(name),
+        "name_sentence": html.escape(name.rstrip(".")),
+        "title": html.escape(f"{name} | {hero['subheadline']}" if hero.get("subheadline") else name),
+        "headline": html.escape(headline),
+        "primary": colors.get("primary", "#2563eb"),
+        "secondary": colors.get("secondary", "#1e40af"),
+        "accent": colors.get("accent", "#fbbf24"),
+        "phone": html.escape(phone),
+        "tel": html.escape(re.sub(r"[^\d+]", "", phone), quote=True),
+        "email": html.escape(email, quote=True),
+    }
+
+
+def render_client(task):
+    """Render one client's preview; runs in worker processes.
+
+    task is (config path, template path or None, output path). Returns
+    the output path and whether the file changed.
+    """
+    config_path, template_file, output_path = task
+    config = json.loads(Path(config_path).read_bytes())
+    template = load_template(template_file or template_path(config.get("template", "service-business")))
+    data = template.render(template_values(config)).encode("utf-8")
+    return output_path, files.write_file_atomic(output_path, data)
+
+
+def load_render_manifest():
+    """Load the render manifest ({slug: {config, template, template_hash}})."""
+    try:
+        with open(RENDER_MANIFEST_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_render_manifest(manifest):
+    """Atomically write the render manifest."""
+    files.write_file_atomic(RENDER_MANIFEST_PATH,
+                             json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
@@ -0,0 +1,357 @@
+"""
+Incremental sync of leads between the local SQLite database and Supabase.
+
+Local changes are captured by triggers into the sync_log table (see
+db._migration_5_sync_log). push() sends them to Supabase's REST API as
+batched upserts and deletes, and drops each batch from the log only once
+Supabase has accepted it, so an interrupted sync resumes where it left
+off. pull() fetches remote rows changed since a saved updated_at
+watermark and applies them locally.
+
+Every lead gets a UUID (leads.remote_id) the first time it is pushed and
+upserts are keyed on it, so resending a batch after a failure is
+harmless. Each request also carries an Idempotency-Key header for proxies
+or stand-ins that honour one.
+
+The remote side only needs the small part of the PostgREST API used here
+(upsert with on_conflict, DELETE with id=in.(...), filtered and ordered
+GET), so it can be a real Supabase project, a local Postgres behind
+PostgREST, or an HTTP stand-in:
+
+    client = SupabaseClient.from_env()
+    sync.push(client)
+    sync.pull(client)
+
+Remote deletes are not pulled: the schema has no tombstones to read them
+from.
+"""
+
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+import db
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500                # rows per upsert request / pulled page
+RETRIES = 5                     # attempts per request before giving up
+BACKOFF = 0.5                   # seconds before the first retry, doubled each time
+TIMEOUT = 30                    # seconds per HTTP request
+
+REMOTE_TABLE = "leads"
+REMOTE_COLUMNS = ("id",) + db.SYNC_COLUMNS + ("created_at", "updated_at")
+# The CHECK constraint on leads.status in supabase-schema.sql
+REMOTE_STATUSES = ("new", "contacted", "qualified", "converted", "lost")
+
+# Transient failures worth retrying; anything else is a bug or bad data
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class SyncError(Exception):
+    """A request to the remote failed and was not retried (or ran out of retries)."""
+
+
+class SupabaseClient:
+    """Minimal PostgREST client over urllib, with retry and backoff."""
+
+    def __init__(self, url, key, retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT):
+        self.base_url = url.rstrip("/") + "/rest/v1/"
+        self.key = key
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls, url=None):
+        """Build a client from SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY.
+
+        The service role key is needed because RLS blocks the anon key from
+        reading and updating leads. NEXT_PUBLIC_SUPABASE_URL is accepted for
+        the URL, matching the Next.js app's .env.
+        """
+        url = url or os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+        key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+        if not url:
+            raise SyncError("Set SUPABASE_URL (or pass --url)")
+        return cls(url, key)
+
+    def request(self, method, table, params=None, body=None, headers=None):
+        """Send one request, retrying transient failures; returns decoded JSON or None."""
+        url = self.base_url + table
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        all_headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if self.key:
+            all_headers["apikey"] = self.key
+            all_headers["Authorization"] = f"Bearer {self.key}"
+        all_headers.update(headers or {})
+
+        for attempt in range(self.retries):
+            request = urllib.request.Request(url, data=data, method=method, headers=all_headers)
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    payload = response.read()
+                return json.loads(payload) if payload else None
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRY_STATUSES or attempt == self.retries - 1:
+                    detail = e.read().decode("utf-8", "replace")[:500]
+                    raise SyncError(f"{method} {table} failed: HTTP {e.code} {detail}") from e
+                delay = _retry_after(e) or self.backoff * 2 ** attempt
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                if attempt == self.retries - 1:
+                    raise SyncError(f"{method} {table} failed: {e}") from e
+                delay = self.backoff * 2 ** attempt
+            time.sleep(delay)
+
+    def upsert(self, table, rows, idempotency_key):
+        """Insert or update rows by primary key."""
+        self.request("POST", table, {"on_conflict": "id"}, rows, {
+            "Prefer": "resolution=merge-duplicates,return=minimal",
+            "Idempotency-Key": idempotency_key,
+        })
+
+    def delete(self, table, ids, idempotency_key):
+        """Delete rows by primary key; missing rows are not an error."""
+        self.request("DELETE", table, {"id": f"in.({','.join(ids)})"}, None, {
+            "Prefer": "return=minimal",
+            "Idempotency-Key": idempotency_key,
+        })
+
+    def changed_since(self, table, updated_at, after_id, limit):
+        """Rows after (updated_at, id) in that order, oldest first."""
+        params = {
+            "select": ",".join(REMOTE_COLUMNS),
+            "order": "updated_at.asc,id.asc",
+            "limit": limit,
+        }
+        if updated_at:
+            params["or"] = (f'(updated_at.gt."{updated_at}",'
+                            f'and(updated_at.eq."{updated_at}",id.gt.{after_id}))')
+        return self.request("GET", table, params) or []
+
+
+def _retry_after(error):
+    try:
+        return float(error.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def to_remote_time(value):
+    """Convert a local timestamp (UTC, see db.utc_now) to ISO 8601 UTC."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def to_local_time(value):
+    """Convert a remote timestamp to the CURRENT_TIMESTAMP format (UTC)."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Sync state
+def get_state(key, default=None):
+    with db.connection() as conn:
+        row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+
+def _set_state(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def _replica_id():
+    """A UUID naming this database, used to scope idempotency keys."""
+    with db.connection(immediate=True) as conn:
+        row = conn.execute("SELECT value FROM sync_state WHERE key = 'replica_id'").fetchone()
+        if row:
+            return row[0]
+        replica_id = str(uuid.uuid4())
+        _set_state(conn, "replica_id", replica_id)
+        return replica_id
+
+
+def status():
+    """Pending local changes and the saved push/pull checkpoints."""
+    with db.connection() as conn:
+        pending = conn.execute("SELECT COUNT(*), COUNT(DISTINCT lead_id) FROM sync_log").fetchone()
+        state = dict(conn.execute("SELECT key, value FROM sync_state"))
+    return {
+        "pending_changes": pending[0],
+        "pending_leads": pending[1],
+        "last_push": state.get("pushed_at"),
+        "last_pull": state.get("pulled_at"),
+        "pull_watermark": state.get("pull_updated_at"),
+    }
+
+
+# Push
+def _prepare_push(entries):
+    """Assign remote ids to leads that lack one and read the rows to send.
+
+    Returns (upserts, deletes, skipped): leads whose status the remote
+    would reject are left out and their ids returned as skipped, since one
+    bad row fails the whole batch and would block every batch after it.
+    """
+    lead_ids = list(dict.fromkeys(lead_id for _, lead_id, remote_id in entries if remote_id is None))
+    deletes = list(dict.fromkeys(remote_id for _, _, remote_id in entries if remote_id is not None))
+    if not lead_ids:
+        return [], deletes, []
+    marks = ",".join("?" * len(lead_ids))
+    statuses = ",".join("?" * len(REMOTE_STATUSES))
+    with db.connection(immediate=True) as conn:
+        skipped = [lead_id for lead_id, in conn.execute(
+            f"SELECT id FROM leads WHERE id IN ({marks}) AND status NOT IN ({statuses})",
+            (*lead_ids, *REMOTE_STATUSES),
+        )]
+        lead_ids = [lead_id for lead_id in lead_ids if lead_id not in skipped]
+        marks = ",".join("?" * len(lead_ids))
+        missing = conn.execute(
+            f"SELECT id FROM leads WHERE id IN ({marks}) AND remote_id IS NULL", lead_ids
+        ).fetchall()
+        # remote_id isn't a synced column, so this doesn't feed the log
+        conn.executemany("UPDATE leads SET remote_id = ? WHERE id = ?",
+                         ((str(uuid.uuid4()), lead_id) for lead_id, in missing))
+        cursor = conn.execute(f"""
+            SELECT remote_id, {', '.join(db.SYNC_COLUMNS)}, created_at, updated_at
+            FROM leads WHERE id IN ({marks})
+        """, lead_ids)
+        cursor.row_factory = None
+        rows = cursor.fetchall()
+    upserts = []
+    for remote_id, *values, created_at, updated_at in rows:
+        row = dict(zip(REMOTE_COLUMNS, [remote_id] + values))
+        row["created_at"] = to_remote_time(created_at)
+        row["updated_at"] = to_remote_time(updated_at)
+        upserts.append(row)
+    return upserts, deletes, skipped
+
+
+def push(client, batch_size=BATCH_SIZE, progress=None):
+    """Send logged local changes to the remote, oldest first.
+
+    Each batch is removed from sync_log only after the remote accepts it;
+    on failure the remaining log is left for the next run. Leads with a
+    status outside REMOTE_STATUSES are skipped and logged; changing the
+    status queues them again. Returns counts of rows upserted, deleted and
+    skipped.
+    """
+    replica_id = _replica_id()
+    totals = {"upserted": 0, "deleted": 0, "skipped": 0}
+    while True:
+        with db.connection() as conn:
+            entries = conn.execute(
+                "SELECT seq, lead_id, remote_id FROM sync_log ORDER BY seq LIMIT ?", (batch_size,)
+            ).fetchall()
+        if not entries:
+            break
+        first_seq, last_seq = entries[0][0], entries[-1][0]
+        key = f"{replica_id}:{first_seq}-{last_seq}"
+        upserts, deletes, skipped = _prepare_push(entries)
+        if skipped:
+            logger.warning("Not pushing leads %s: status must be one of %s",
+                           ", ".join(map(str, skipped)), ", ".join(REMOTE_STATUSES))
+        if upserts:
+            client.upsert(REMOTE_TABLE, upserts, key + ":upsert")
+        if deletes:
+            client.delete(REMOTE_TABLE, deletes, key + ":delete")
+        with db.connection() as conn:
+            conn.execute("DELETE FROM sync_log WHERE seq <= ?", (last_seq,))
+            _set_state(conn, "pushed_at", datetime.now(timezone.utc).isoformat())
+        totals["upserted"] += len(upserts)
+        totals["deleted"] += len(deletes)
+        totals["skipped"] += len(skipped)
+        if progress:
+            progress("push", totals)
+    return totals
+
+
+# Pull
+def _apply_remote(conn, rows, pending, archived):
+    """Upsert remote rows into leads; returns how many were applied.
+
+    Leads with unpushed local changes are skipped - the local edit wins
+    and will overwrite the remote on the next push. So are rows that match
+    the local copy, such as the echo of our own last push. With archived
+    (the archive is attached), a lead found only in the archive is left
+    there if unchanged, and otherwise restored and then updated.
+    """
+    cols = db.SYNC_COLUMNS
+    applied = 0
+    for row in rows:
+        values = [row.get(c) for c in cols]
+        keys = (db.normalize_email(row.get("email")), db.normalize_phone(row.get("phone")))
+        times = (to_local_time(row.get("created_at")), to_local_time(row.get("updated_at")))
+        local = conn.execute(
+            f"SELECT id, {', '.join(cols)} FROM main.leads WHERE remote_id = ?", (row["id"],)
+        ).fetchone()
+        if local is None and archived:
+            stored = conn.execute(
+                f"SELECT id, {', '.join(cols)} FROM archive.leads WHERE remote_id = ?", (row["id"],)
+            ).fetchone()
+            if stored is not None:
+                if list(stored[1:]) == values:
+                    continue
+                db.restore_leads([stored[0]])
+                local = stored
+        if local is None:
+            conn.execute(f"""
+                INSERT INTO leads ({', '.join(cols)}, email_key, phone_key, created_at, updated_at, remote_id)
+                VALUES ({', '.join('?' * (len(cols) + 5))})
+            """, (*values, *keys, *times, row["id"]))
+        elif local[0] in pending or list(local[1:]) == values:
+            continue
+        else:
+            conn.execute(f"""
+                UPDATE leads SET {', '.join(f'{c} = ?' for c in cols)},
+                    email_key = ?, phone_key = ?, created_at = ?, updated_at = ?
+                WHERE id = ?
+            """, (*values, *keys, *times, local[0]))
+        applied += 1
+    return applied
+
+
+def pull(client, batch_size=BATCH_SIZE, progress=None):
+    """Apply remote rows changed since the saved watermark.
+
+    The watermark (updated_at, id of the last applied row) is saved in the
+    same transaction as each page, so an interrupted pull resumes after the
+    last page it finished. Returns counts of rows fetched and applied.
+    """
+    totals = {"fetched": 0, "applied": 0}
+    archived = db.attach_archive()
+    since = get_state("pull_updated_at")
+    after = get_state("pull_id")
+    while True:
+        rows = client.changed_since(REMOTE_TABLE, since, after, batch_size)
+        if not rows:
+            break
+        with db.connection(immediate=True) as conn:
+            mark = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_log").fetchone()[0]
+            pending = {lead_id for lead_id, in conn.execute("SELECT DISTINCT lead_id FROM sync_log")}
+            totals["applied"] += _apply_remote(conn, rows, pending, archived)
+            # Changes that came from the remote must not be pushed back
+            conn.execute("DELETE FROM sync_log WHERE seq > ?", (mark,))
+            since, after = rows[-1]["updated_at"], rows[-1]["id"]
+            _set_state(conn, "pull_updated_at", since)
+            _set_state(conn, "pull_id", after)
+            _set_state(conn, "pulled_at", datetime.now(timezone.utc).isoformat())
+        totals["fetched"] += len(rows)
+        if progress:
+            progress("pull", totals)
+        if len(rows) < batch_size:
+            break
+    return totals
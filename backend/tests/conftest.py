@@ -0,0 +1,31 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Point db.py at empty database and archive files under tmp_path."""
+    db.close_connection()
+    db.clear_client_cache()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.db")
+    monkeypatch.setattr(db, "ARCHIVE_PATH", tmp_path / "test_archive.db")
+    yield tmp_path / "test.db"
+    db.close_connection()
+    db.clear_client_cache()
+
+
+@pytest.fixture
+def tokyo_time(monkeypatch):
+    """Run with the local timezone set to UTC+9."""
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import adb
+import db
+
+LAG_TICK = 0.005
+
+
+async def max_loop_lag(until):
+    """Longest gap between LAG_TICK sleeps while `until` is pending."""
+    worst = 0.0
+    while not until.done():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_TICK)
+        worst = max(worst, time.perf_counter() - start - LAG_TICK)
+    return worst
+
+
+def test_loop_stays_responsive_under_1k_requests(fresh_db):
+    lead_ids = [db.add_lead("Lead", str(n), f"lead{n}@example.com", f"555-{n:04d}") for n in range(50)]
+
+    async def main():
+        async with adb.Database() as database:
+            requests = [database.get_lead(lead_ids[n % len(lead_ids)]) for n in range(900)]
+            requests += [database.add_lead("New", str(n), f"new{n}@example.com", "555") for n in range(100)]
+            gathered = asyncio.ensure_future(asyncio.gather(*requests))
+            lag = await max_loop_lag(gathered)
+            return await gathered, lag
+
+    results, lag = asyncio.run(main())
+    assert [lead["id"] for lead in results[:900]] == [lead_ids[n % len(lead_ids)] for n in range(900)]
+    assert len(set(results[900:])) == 100
+    assert lag < 0.1
+
+
+def test_cancelled_call_keeps_its_slot_until_the_worker_finishes(fresh_db):
+    release = threading.Event()
+    started = []
+
+    def blocking(name):
+        started.append(name)
+        release.wait(5)
+        return name
+
+    async def main():
+        async with adb.Database(max_pending_reads=2) as database:
+            running = [asyncio.ensure_future(database.read(blocking, n)) for n in range(2)]
+            while len(started) < 2:
+                await asyncio.sleep(0.001)
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+            # Both workers are still busy, so a third call waits for a slot
+            third = asyncio.ensure_future(database.read(blocking, "third"))
+            await asyncio.sleep(0.05)
+            assert sorted(started) == [0, 1]
+            release.set()
+            return await third
+
+    assert asyncio.run(main()) == "third"
+
+
+def test_cancelling_a_queued_call_drops_it(fresh_db):
+    release = threading.Event()
+    started = []
+
+    def blocking(name):
+        started.append(name)
+        release.wait(5)
+        return name
+
+    async def main():
+        async with adb.Database() as database:
+            first = asyncio.ensure_future(database.write(blocking, "first"))
+            queued = asyncio.ensure_future(database.write(blocking, "queued"))
+            while not started:
+                await asyncio.sleep(0.001)
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+            release.set()
+            return await first
+
+    assert asyncio.run(main()) == "first"
+    assert started == ["first"]
+
+
+def test_close_closes_every_reader_connection(fresh_db, monkeypatch):
+    release = threading.Event()
+    opened, closed = set(), set()
+    close_connection = db.close_connection
+
+    def blocking():
+        db.get_connection()
+        opened.add(threading.current_thread().name)
+        release.wait(5)
+
+    def recording_close():
+        closed.add(threading.current_thread().name)
+        close_connection()
+
+    monkeypatch.setattr(db, "close_connection", recording_close)
+
+    async def main():
+        async with adb.Database(read_workers=3) as database:
+            reads = [asyncio.ensure_future(database.read(blocking)) for _ in range(3)]
+            while len(opened) < 3:
+                await asyncio.sleep(0.001)
+            release.set()
+            await asyncio.gather(*reads)
+
+    asyncio.run(main())
+    assert len(opened) == 3
+    assert opened <= closed
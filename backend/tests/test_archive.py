@@ -0,0 +1,33 @@
+import db
+
+
+def add_leads(count, **fields):
+    ids = []
+    for n in range(count):
+        ids.append(db.add_lead("Lead", str(n), f"lead{n}-{fields}@example.com", f"555-{n:04d}"))
+    if fields.get("status"):
+        db.update_leads_status_bulk(fields["status"], ids=ids)
+    return ids
+
+
+def test_archive_run_keeps_stats(fresh_db):
+    converted = add_leads(3, status="converted")
+    lost = add_leads(2, status="lost")
+    add_leads(4)
+    db.add_client("lead-0", "Lead Zero Co", lead_id=converted[0])
+    before = db.get_pipeline_stats()
+
+    assert db.archive_leads(statuses=db.ARCHIVE_STATUSES) == 5
+    assert db.get_pipeline_stats() == before
+    assert db.rebuild_stats() == {"lead_counts": 0, "client_counts": 0, "weekly_counts": 0}
+
+    assert db.restore_leads(converted + lost) == 5
+    assert db.get_pipeline_stats() == before
+    assert db.rebuild_stats() == {"lead_counts": 0, "client_counts": 0, "weekly_counts": 0}
+
+
+def test_deleting_a_lead_still_updates_stats(fresh_db):
+    lead_id = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    with db.connection() as conn:
+        conn.execute("DELETE FROM leads WHERE id = ?", (lead_id,))
+    assert db.get_pipeline_stats()["leads"]["total"] == 0
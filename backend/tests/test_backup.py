@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+import backup
+import db
+
+
+def make_backups(directory, count):
+    directory.mkdir(exist_ok=True)
+    paths = []
+    for n in range(count):
+        path = directory / f"test-2026010{n}-000000.db"
+        path.write_bytes(b"")
+        os.utime(path, ns=(n * 10**9, n * 10**9))
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("keep", [0, -1])
+def test_rotate_keeps_everything_unless_keep_is_positive(tmp_path, keep):
+    paths = make_backups(tmp_path / "backups", 3)
+    assert backup.rotate(tmp_path / "backups", "test", keep=keep) == []
+    assert all(path.exists() for path in paths)
+
+
+def test_rotate_removes_oldest(tmp_path):
+    paths = make_backups(tmp_path / "backups", 3)
+    assert backup.rotate(tmp_path / "backups", "test", keep=2) == paths[:1]
+    assert [path.exists() for path in paths] == [False, True, True]
+
+
+def test_create_and_verify(fresh_db, tmp_path):
+    db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    stats = backup.create(target_dir=tmp_path / "backups", compress=True, verify_copy=True)
+    assert stats["verified"]
+    assert backup.verify(stats["path"]) == []
@@ -0,0 +1,56 @@
+import threading
+
+import db
+
+
+def test_invalidation_waits_for_the_outer_commit(fresh_db):
+    client_id = db.add_client("ann", "Ann's Bakery")
+    assert db.get_client(client_id)["business_name"] == "Ann's Bakery"
+
+    seen = []
+    with db.connection():
+        db.update_client(client_id, business_name="Ann's Cafe")
+        # Another thread reading before the commit sees the old row...
+        reader = threading.Thread(target=lambda: seen.append(db.get_client(client_id)["business_name"]))
+        reader.start()
+        reader.join()
+
+    assert seen == ["Ann's Bakery"]
+    # ...but the committed change is what gets served afterwards
+    assert db.get_client(client_id)["business_name"] == "Ann's Cafe"
+    assert db.get_client_by_slug("ann")["business_name"] == "Ann's Cafe"
+
+
+def test_row_read_before_an_invalidation_is_not_cached(fresh_db):
+    client_id = db.add_client("ann", "Ann's Bakery")
+    conn = db.get_connection()
+    generation = db._client_cache_generation
+    stale = dict(conn.execute("SELECT * FROM clients WHERE id = ?", (client_id,)).fetchone())
+
+    db.update_client(client_id, business_name="Ann's Cafe")
+    db._cache_store(conn, stale, generation)
+
+    assert db.get_client(client_id)["business_name"] == "Ann's Cafe"
+
+
+def test_rolled_back_write_keeps_the_cache(fresh_db):
+    client_id = db.add_client("ann", "Ann's Bakery")
+    db.get_client(client_id)
+    try:
+        with db.connection():
+            db.update_client(client_id, business_name="Ann's Cafe")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert db.client_cache_stats()["size"] == 1
+    assert db.get_client(client_id)["business_name"] == "Ann's Bakery"
+
+
+def test_read_after_write_in_the_same_block_sees_the_write(fresh_db):
+    client_id = db.add_client("ann", "Ann's Bakery")
+    db.get_client(client_id)
+
+    with db.connection():
+        db.update_client(client_id, business_name="Ann's Cafe")
+        assert db.get_client(client_id)["business_name"] == "Ann's Cafe"
+        assert db.get_client_by_slug("ann")["business_name"] == "Ann's Cafe"
@@ -0,0 +1,26 @@
+import json
+import os
+
+import client_index
+import files
+
+
+def write_config(path, name):
+    path.write_text(json.dumps({"slug": path.stem, "name": name}))
+
+
+def test_in_place_edit_is_read_from_the_file(tmp_path, monkeypatch):
+    clients = tmp_path / "clients"
+    clients.mkdir()
+    monkeypatch.setattr(files, "CLIENTS_JSON_PATH", clients)
+    monkeypatch.setattr(client_index, "INDEX_PATH", tmp_path / "client-index")
+    write_config(clients / "ann.json", "Ann's Bakery")
+    client_index.update()
+
+    directory_mtime = clients.stat().st_mtime_ns
+    write_config(clients / "ann.json", "Ann's Bakery & Cafe")
+    os.utime(clients, ns=(directory_mtime, directory_mtime))
+
+    assert client_index.read_config("ann")["name"] == "Ann's Bakery & Cafe"
+    assert client_index.update()["updated"] == 1
+    assert client_index.read_config("ann")["name"] == "Ann's Bakery & Cafe"
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+
+import db
+
+
+def test_since_picks_up_rows_updated_later_in_the_same_second(fresh_db):
+    first = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    second = db.add_lead("Bob", "Ray", "bob@example.com", "555-0101")
+    with db.connection() as conn:
+        conn.execute("UPDATE leads SET updated_at = '2026-01-05T10:00:00.100000' WHERE id = ?", (second,))
+        conn.execute("UPDATE leads SET updated_at = '2026-01-01 00:00:00' WHERE id = ?", (first,))
+
+    names, rows = db.stream_rows("leads", ["id", "updated_at"])
+    watermark = max(rows, key=lambda row: row[1])[1]
+
+    # Updated after that export ran, but within the same second
+    with db.connection() as conn:
+        conn.execute("UPDATE leads SET updated_at = '2026-01-05T10:00:00.900000' WHERE id = ?", (first,))
+
+    _, rows = db.stream_rows("leads", ["id"], since=watermark)
+    assert sorted(row[0] for row in rows) == [first, second]
+
+
+def test_since_compares_local_updates_in_utc(fresh_db, tokyo_time):
+    lead_id = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    now = datetime.now(timezone.utc)
+    db.update_lead_status(lead_id, "contacted")
+
+    later = (now + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+    _, rows = db.stream_rows("leads", ["id"], since=later)
+    assert list(rows) == []
+
+    earlier = (now - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+    _, rows = db.stream_rows("leads", ["id"], since=earlier)
+    assert [row[0] for row in rows] == [lead_id]
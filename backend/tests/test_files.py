@@ -0,0 +1,25 @@
+import os
+import stat
+
+import files
+
+
+def test_new_file_gets_umask_mode(tmp_path):
+    path = tmp_path / "config.json"
+    assert files.write_file_atomic(path, b"{}")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~_umask()
+
+
+def test_unchanged_contents_are_not_rewritten(tmp_path):
+    path = tmp_path / "config.json"
+    files.write_file_atomic(path, b"{}")
+    assert not files.write_file_atomic(path, b"{}")
+    assert files.write_file_atomic(path, b"[]")
+    assert path.read_bytes() == b"[]"
+    assert [p.name for p in tmp_path.iterdir()] == ["config.json"]
+
+
+def _umask():
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
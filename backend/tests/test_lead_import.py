@@ -0,0 +1,31 @@
+import pytest
+
+import db
+import manage
+
+LINES = [
+    '{"name": "Ann Lee", "email": "ann@example.com", "phone": "555-0100"}',
+    '{not json',
+    '{"name": "Bob Ray", "email": "bob@example.com", "phone": "555-0101"}',
+]
+
+
+def test_bad_jsonl_line_is_skipped(fresh_db, tmp_path, capsys):
+    path = tmp_path / "leads.jsonl"
+    path.write_text("\n".join(LINES) + "\n")
+
+    manage.main(["lead", "import", str(path)])
+
+    assert [lead["first_name"] for lead in db.get_all_leads()] == ["Bob", "Ann"]
+    captured = capsys.readouterr()
+    assert "Skipping line 2: invalid JSON" in captured.err
+    assert "Imported 2 leads" in captured.out and "1 skipped" in captured.out
+
+
+def test_unreadable_file_exits_non_zero(fresh_db, tmp_path):
+    path = tmp_path / "leads.csv"
+    path.write_bytes(b"name,email,phone\n\xff\xfe,x,y\n")
+
+    with pytest.raises(SystemExit) as exit_info:
+        manage.main(["lead", "import", str(path)])
+    assert exit_info.value.code == 1
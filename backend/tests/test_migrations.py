@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+
+import pytest
+
+import db
+
+
+def test_concurrent_first_open_migrates_once(fresh_db):
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def open_and_read():
+        barrier.wait()
+        try:
+            db.get_connection().execute("SELECT COUNT(*) FROM leads").fetchone()
+        except sqlite3.Error as e:
+            errors.append(e)
+        finally:
+            db.close_connection()
+
+    threads = [threading.Thread(target=open_and_read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    conn = sqlite3.connect(fresh_db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+    conn.close()
+
+
+def test_failed_upgrade_leaves_file_unchanged(fresh_db, monkeypatch):
+    def broken(cursor):
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(db, "MIGRATIONS", db.MIGRATIONS[:2] + [broken])
+    conn = sqlite3.connect(fresh_db)
+    with pytest.raises(sqlite3.OperationalError):
+        db.migrate(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+    conn.close()
+
+
+def test_migrations_can_be_rerun(fresh_db):
+    lead_id = db.add_lead("Ann", "Lee", "Ann@Example.com", "555-0100")
+    db.add_client("ann-lee", "Ann's Bakery", lead_id=lead_id)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    for upgrade in db.MIGRATIONS:
+        upgrade(cursor)
+    conn.commit()
+
+    assert conn.execute("SELECT COUNT(*) FROM sync_log").fetchone()[0] == 1
+    assert db.get_lead(lead_id)["email_key"] == "ann@example.com"
+    assert db.rebuild_stats() == {"lead_counts": 0, "client_counts": 0, "weekly_counts": 0}
+
+
+def test_local_updated_at_values_are_converted_to_utc(fresh_db, tokyo_time):
+    lead_id = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    with db.connection() as conn:
+        conn.execute("UPDATE leads SET updated_at = '2026-01-05T18:30:00.250000' WHERE id = ?", (lead_id,))
+        db._migration_9_utc_updated_at(conn.cursor())
+    assert db.get_lead(lead_id)["updated_at"] == "2026-01-05 09:30:00"
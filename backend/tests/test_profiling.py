@@ -0,0 +1,22 @@
+import db
+
+
+def test_lazy_queries_are_profiled_as_they_are_iterated(fresh_db):
+    for n in range(5):
+        db.add_lead("Lead", str(n), f"lead{n}@example.com", f"555-{n:04d}")
+    db.enable_profiling()
+    try:
+        db.reset_profile()
+        rows = db.query_leads(("id", "status"))
+        assert "query_leads" not in db.get_profile()["functions"]
+        assert len(list(rows)) == 5
+        stats = db.get_profile()["functions"]["query_leads"]
+        assert (stats["calls"], stats["rows"]) == (1, 5)
+
+        # Abandoned part-way: recorded with the rows actually produced
+        partial = db.query_leads()
+        next(partial)
+        partial.close()
+        assert db.get_profile()["functions"]["query_leads"]["rows"] == 6
+    finally:
+        db.disable_profiling()
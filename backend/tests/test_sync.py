@@ -0,0 +1,178 @@
+import pytest
+
+import db
+import sync
+
+
+class FakeRemote:
+    """In-memory stand-in for the PostgREST leads table.
+
+    Records the idempotency key of every request, rejects statuses the
+    schema's CHECK constraint would, and can be told to fail a request
+    before or after applying it.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.keys = []
+        self.fail = None    # (request number, "before" or "after")
+
+    def _request(self, idempotency_key, apply):
+        self.keys.append(idempotency_key)
+        failing = self.fail and self.fail[0] == len(self.keys)
+        if failing and self.fail[1] == "before":
+            raise sync.SyncError("HTTP 503")
+        apply()
+        if failing:
+            raise sync.SyncError("connection reset")
+
+    def upsert(self, table, rows, idempotency_key):
+        if any(row["status"] not in sync.REMOTE_STATUSES for row in rows):
+            raise sync.SyncError("HTTP 400 violates check constraint")
+
+        def apply():
+            for row in rows:
+                self.rows[row["id"]] = dict(self.rows.get(row["id"], {}), **row)
+        self._request(idempotency_key, apply)
+
+    def delete(self, table, ids, idempotency_key):
+        def apply():
+            for remote_id in ids:
+                self.rows.pop(remote_id, None)
+        self._request(idempotency_key, apply)
+
+    def changed_since(self, table, updated_at, after_id, limit):
+        rows = sorted(self.rows.values(), key=lambda row: (row["updated_at"], row["id"]))
+        if updated_at:
+            rows = [row for row in rows if (row["updated_at"], row["id"]) > (updated_at, after_id)]
+        return [dict(row) for row in rows[:limit]]
+
+
+def add_leads(count):
+    return [db.add_lead("Lead", str(n), f"lead{n}@example.com", f"555-{n:04d}") for n in range(count)]
+
+
+def test_push_sends_inserts_edits_and_deletes(fresh_db):
+    remote = FakeRemote()
+    first, second = add_leads(2)
+    assert sync.push(remote) == {"upserted": 2, "deleted": 0, "skipped": 0}
+    assert sorted(row["last_name"] for row in remote.rows.values()) == ["0", "1"]
+
+    db.update_lead_status(first, "contacted")
+    with db.connection() as conn:
+        conn.execute("DELETE FROM leads WHERE id = ?", (second,))
+    assert sync.push(remote) == {"upserted": 1, "deleted": 1, "skipped": 0}
+    row, = remote.rows.values()
+    assert (row["id"], row["status"]) == (db.get_lead(first)["remote_id"], "contacted")
+    assert sync.status()["pending_changes"] == 0
+
+
+def test_pull_applies_remote_changes_but_not_over_local_edits(fresh_db):
+    remote = FakeRemote()
+    kept, edited = add_leads(2)
+    sync.push(remote)
+    for row in remote.rows.values():
+        row.update(notes="from remote", updated_at="2099-01-01T00:00:00+00:00")
+    remote.rows["new"] = dict(next(iter(remote.rows.values())), id="new", email="new@example.com")
+    db.update_lead_status(edited, "qualified")
+
+    assert sync.pull(remote) == {"fetched": 3, "applied": 2}
+    assert db.get_lead(kept)["notes"] == "from remote"
+    assert db.get_lead(edited)["notes"] is None
+    assert len(db.get_all_leads()) == 3
+    # Only the local edit is left to push
+    assert sync.status()["pending_leads"] == 1
+    assert sync.pull(remote) == {"fetched": 0, "applied": 0}
+
+
+def test_push_resumes_after_a_failed_batch(fresh_db):
+    remote = FakeRemote()
+    add_leads(5)
+    remote.fail = (2, "before")
+    with pytest.raises(sync.SyncError):
+        sync.push(remote, batch_size=2)
+    assert len(remote.rows) == 2
+    assert sync.status()["pending_changes"] == 3
+
+    assert sync.push(remote, batch_size=2) == {"upserted": 3, "deleted": 0, "skipped": 0}
+    assert len(remote.rows) == 5
+    # The first batch was not sent again
+    assert len(remote.keys) == 4
+
+
+def test_batch_accepted_but_unacknowledged_is_resent_with_the_same_key(fresh_db):
+    remote = FakeRemote()
+    add_leads(3)
+    remote.fail = (1, "after")
+    with pytest.raises(sync.SyncError):
+        sync.push(remote)
+    rows = {remote_id: dict(row) for remote_id, row in remote.rows.items()}
+
+    assert sync.push(remote)["upserted"] == 3
+    assert remote.keys[0] == remote.keys[1]
+    assert remote.rows == rows
+
+
+def test_push_skips_statuses_the_remote_rejects(fresh_db):
+    remote = FakeRemote()
+    bad, good = add_leads(2)
+    db.update_lead_status(bad, "on_hold")
+
+    assert sync.push(remote) == {"upserted": 1, "deleted": 0, "skipped": 1}
+    assert [row["last_name"] for row in remote.rows.values()] == ["1"]
+    assert sync.status()["pending_changes"] == 0
+
+    # Fixing the status queues the lead again
+    db.update_lead_status(bad, "lost")
+    assert sync.push(remote)["upserted"] == 1
+    assert len(remote.rows) == 2
+
+
+def test_pull_leaves_archived_leads_in_the_archive(fresh_db):
+    remote = FakeRemote()
+    lead_id = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    db.update_lead_status(lead_id, "lost")
+    sync.push(remote)
+    assert db.archive_leads(statuses=["lost"]) == 1
+
+    assert sync.pull(remote) == {"fetched": 1, "applied": 0}
+    assert db.get_pipeline_stats()["leads"]["total"] == 1
+    assert db.restore_leads([lead_id]) == 1
+    assert [lead["id"] for lead in db.get_all_leads()] == [lead_id]
+
+
+def test_pull_restores_an_archived_lead_changed_remotely(fresh_db):
+    remote = FakeRemote()
+    lead_id = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    db.update_lead_status(lead_id, "lost")
+    sync.push(remote)
+    db.archive_leads(statuses=["lost"])
+
+    remote_id, = remote.rows
+    remote.rows[remote_id].update(status="qualified", updated_at="2099-01-01T00:00:00+00:00")
+    assert sync.pull(remote) == {"fetched": 1, "applied": 1}
+
+    assert [(lead["id"], lead["status"]) for lead in db.get_all_leads()] == [(lead_id, "qualified")]
+    assert db.get_pipeline_stats()["leads"]["total"] == 1
+    assert sync.status()["pending_changes"] == 0
+
+
+def test_restore_folds_in_a_pulled_copy(fresh_db):
+    lead_id = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    with db.connection() as conn:
+        conn.execute("UPDATE leads SET remote_id = 'r1' WHERE id = ?", (lead_id,))
+    db.update_lead_status(lead_id, "lost")
+    db.archive_leads(statuses=["lost"])
+    # A copy pulled before sync knew about the archive
+    copy_id = db.add_lead("Ann", "Lee", "ann@example.com", "555-0100")
+    with db.connection() as conn:
+        conn.execute("UPDATE leads SET remote_id = 'r1', status = 'qualified', "
+                     "updated_at = '2099-01-01 00:00:00' WHERE id = ?", (copy_id,))
+    db.add_client("ann", "Ann's Bakery", lead_id=copy_id)
+
+    assert db.restore_leads([lead_id]) == 1
+    assert [(lead["id"], lead["status"]) for lead in db.get_all_leads()] == [(lead_id, "qualified")]
+    assert db.get_client_by_slug("ann")["lead_id"] == lead_id
+    assert db.rebuild_stats() == {"lead_counts": 0, "client_counts": 0, "weekly_counts": 0}
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sync_log WHERE remote_id IS NOT NULL").fetchone()[0] == 0
@@ -1,11 +1,115 @@
 import fs from "fs";
 import path from "path";
-import type { ClientConfig } from "@/types";
+import type { ClientConfig, ClientStatus, TemplateCategory } from "@/types";
 
 const clientsDir = path.join(process.cwd(), "src/data/clients");
 
+// Packed index written by `manage.py client generate`/`generate-all`
+// (backend/client_index.py): every config in one pack file, plus the slugs
+// with summary fields and each config's byte offset and length
+const indexDir = path.join(process.cwd(), "src/data/client-index");
+const INDEX_VERSION = 1;
+
+export interface ClientSummary {
+  slug: string;
+  name: string;
+  status: ClientStatus;
+  template: TemplateCategory;
+  updatedAt: string;
+}
+
+interface ClientIndexEntry extends ClientSummary {
+  offset: number;
+  length: number;
+  mtimeNs: string;
+  size: number;
+}
+
+interface ClientIndex {
+  version: number;
+  pack: string;
+  directoryMtimeNs: string;
+  clients: ClientIndexEntry[];
+}
+
+let cachedIndex: {
+  mtimeNs: bigint;
+  index: ClientIndex;
+  bySlug: Map<string, ClientIndexEntry>;
+  pack?: Buffer;
+} | null = null;
+
+// Load the packed index; null if there is none or configs were added or
+// removed since it was written (either touches the directory). Edits in
+// place don't, so each entry is also checked with entryIsCurrent.
+function loadClientIndex() {
+  try {
+    const indexPath = path.join(indexDir, "index.json");
+    const mtimeNs = fs.statSync(indexPath, { bigint: true }).mtimeNs;
+    if (!cachedIndex || cachedIndex.mtimeNs !== mtimeNs) {
+      const index = JSON.parse(fs.readFileSync(indexPath, "utf8")) as ClientIndex;
+      const bySlug = new Map(index.clients.map((entry) => [entry.slug, entry]));
+      cachedIndex = { mtimeNs, index, bySlug };
+    }
+    const directoryMtimeNs = fs.statSync(clientsDir, { bigint: true }).mtimeNs;
+    if (
+      cachedIndex.index.version !== INDEX_VERSION ||
+      cachedIndex.index.directoryMtimeNs !== directoryMtimeNs.toString()
+    ) {
+      return null;
+    }
+    return cachedIndex;
+  } catch {
+    return null;
+  }
+}
+
+// True if the config file is unchanged since the entry was packed; an editor
+// saving over a file changes its mtime or size but not the directory's
+function entryIsCurrent(entry: ClientIndexEntry): boolean {
+  try {
+    const stat = fs.statSync(path.join(clientsDir, `${entry.slug}.json`), {
+      bigint: true,
+    });
+    return (
+      stat.mtimeNs.toString() === entry.mtimeNs &&
+      stat.size === BigInt(entry.size)
+    );
+  } catch {
+    return false;
+  }
+}
+
+function readClientFile(slug: string): ClientConfig | null {
+  try {
+    const filePath = path.join(clientsDir, `${slug}.json`);
+    const fileContents = fs.readFileSync(filePath, "utf8");
+    return JSON.parse(fileContents) as ClientConfig;
+  } catch {
+    return null;
+  }
+}
+
+// Read the whole pack once per index version; configs are slices of it
+function readPack(packed: NonNullable<typeof cachedIndex>): Buffer {
+  if (!packed.pack) {
+    packed.pack = fs.readFileSync(path.join(indexDir, packed.index.pack));
+  }
+  return packed.pack;
+}
+
+function parseEntry(pack: Buffer, entry: ClientIndexEntry): ClientConfig {
+  return JSON.parse(
+    pack.toString("utf8", entry.offset, entry.offset + entry.length)
+  ) as ClientConfig;
+}
+
 // Get all client slugs for static generation
 export async function getAllClientSlugs(): Promise<string[]> {
+  const packed = loadClientIndex();
+  if (packed) {
+    return packed.index.clients.map((entry) => entry.slug);
+  }
   try {
     const files = fs.readdirSync(clientsDir);
     return files
@@ -20,17 +124,58 @@ export async function getAllClientSlugs(): Promise<string[]> {
 export async function getClientBySlug(
   slug: string
 ): Promise<ClientConfig | null> {
-  try {
-    const filePath = path.join(clientsDir, `${slug}.json`);
-    const fileContents = fs.readFileSync(filePath, "utf8");
-    return JSON.parse(fileContents) as ClientConfig;
-  } catch {
-    return null;
+  const packed = loadClientIndex();
+  if (packed) {
+    const entry = packed.bySlug.get(slug);
+    if (!entry) return null;
+    if (entryIsCurrent(entry)) {
+      try {
+        return parseEntry(readPack(packed), entry);
+      } catch {
+        // Fall back to the config file
+      }
+    }
   }
+  return readClientFile(slug);
+}
+
+// Get slug, name, status, template and updatedAt of every client, for listing
+export async function getClientSummaries(): Promise<ClientSummary[]> {
+  const packed = loadClientIndex();
+  const clients: ClientSummary[] = packed
+    ? packed.index.clients.flatMap((entry): ClientSummary[] => {
+        if (entryIsCurrent(entry)) return [entry];
+        const client = readClientFile(entry.slug);
+        return client ? [client] : [];
+      })
+    : await getAllClients();
+  return clients.map(({ slug, name, status, template, updatedAt }) => ({
+    slug,
+    name,
+    status,
+    template,
+    updatedAt,
+  }));
 }
 
 // Get all clients
 export async function getAllClients(): Promise<ClientConfig[]> {
+  const packed = loadClientIndex();
+  if (packed) {
+    try {
+      // One sequential read of the pack instead of a file per client; only
+      // configs edited since the index was written are read from their file
+      const pack = readPack(packed);
+      return packed.index.clients.flatMap((entry): ClientConfig[] => {
+        const client = entryIsCurrent(entry)
+          ? parseEntry(pack, entry)
+          : readClientFile(entry.slug);
+        return client ? [client] : [];
+      });
+    } catch {
+      // Fall back to the config files
+    }
+  }
   try {
     const slugs = await getAllClientSlugs();
     const clients = await Promise.all(
@@ -45,7 +190,10 @@ export async function getAllClients(): Promise<ClientConfig[]> {
 // Save a client configuration
 export async function saveClient(client: ClientConfig): Promise<void> {
   const filePath = path.join(clientsDir, `${client.slug}.json`);
-  fs.writeFileSync(filePath, JSON.stringify(client, null, 2));
+  // Write and rename, which also marks the packed index as stale
+  const tmpPath = `${filePath}.${process.pid}.tmp`;
+  fs.writeFileSync(tmpPath, JSON.stringify(client, null, 2));
+  fs.renameSync(tmpPath, filePath);
 }
 
 // Delete a client